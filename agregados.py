@@ -0,0 +1,205 @@
+from decimal import Decimal
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from vendas import Venda
+
+TIPOS_SEM_DETALHE = ("Dinheiro", "PIX", "Troca")
+ZERO = Decimal('0.00')
+
+
+def chave_pagamento(tipo_pagamento: str, detalhes_pagamento: str) -> str:
+    """Chave usada nos resumos por tipo de pagamento, ex.: 'Cartão - Débito'"""
+    if detalhes_pagamento and tipo_pagamento not in TIPOS_SEM_DETALHE:
+        return f"{tipo_pagamento} - {detalhes_pagamento}"
+    return tipo_pagamento
+
+
+def resumir(vendas: Iterable[Venda]) -> dict:
+    """Totais gerais, por tipo de pagamento, bandeira e vendedor (recalculo completo)"""
+    resumo = {
+        'total': ZERO,
+        'quantidade': 0,
+        'por_tipo': {},
+        'por_bandeira': {},
+        'por_vendedor': {},
+        'total_trocas': ZERO,
+        'quantidade_trocas': 0
+    }
+    for venda in vendas:
+        resumo['total'] += venda.valor
+        resumo['quantidade'] += 1
+        chave = chave_pagamento(venda.tipo_pagamento, venda.detalhes_pagamento)
+        resumo['por_tipo'][chave] = resumo['por_tipo'].get(chave, ZERO) + venda.valor
+        if venda.bandeira:
+            resumo['por_bandeira'][venda.bandeira] = resumo['por_bandeira'].get(venda.bandeira, ZERO) + venda.valor
+        resumo['por_vendedor'][venda.vendedor] = resumo['por_vendedor'].get(venda.vendedor, ZERO) + venda.valor
+        if venda.troca:
+            resumo['total_trocas'] += venda.valor
+            resumo['quantidade_trocas'] += 1
+    return resumo
+
+
+class _Totais:
+    """Soma e contagem por chave; a chave some quando a contagem volta a zero"""
+
+    def __init__(self):
+        self.valores: Dict[Hashable, Decimal] = {}
+        self.quantidades: Dict[Hashable, int] = {}
+
+    def somar(self, chave: Hashable, valor: Decimal):
+        self.valores[chave] = self.valores.get(chave, ZERO) + valor
+        self.quantidades[chave] = self.quantidades.get(chave, 0) + 1
+
+    def subtrair(self, chave: Hashable, valor: Decimal):
+        quantidade = self.quantidades[chave] - 1
+        if quantidade:
+            self.quantidades[chave] = quantidade
+            self.valores[chave] -= valor
+        else:
+            del self.quantidades[chave]
+            del self.valores[chave]
+
+
+class ResumoIncremental:
+    """
+    Mantém os totais do resumo atualizados venda a venda.
+
+    `adicionar` e `remover` custam O(1); como os valores são Decimal com duas
+    casas, a subtração na exclusão é exata e o resultado é idêntico ao de
+    `resumir` sobre a lista completa (veja `verificar`).
+
+    Com o catálogo de pagamentos (catalogo.py), as vendas identificadas são
+    somadas pelo id do método (`venda.metodo`) e a chave de texto de cada
+    método só é usada ao ler `por_tipo`; as demais continuam somadas pela
+    chave montada com `chave_pagamento`.
+    """
+
+    def __init__(self, vendas: Iterable[Venda] = (), catalogo=None):
+        self.catalogo = catalogo
+        self.limpar()
+        for venda in vendas:
+            self.adicionar(venda)
+
+    def limpar(self):
+        self.total = ZERO
+        self.quantidade = 0
+        self._por_tipo = _Totais()
+        self._por_bandeira = _Totais()
+        self._por_vendedor = _Totais()
+        # Chave inteira: id do método no catálogo de pagamentos (vendas sem método ficam de fora)
+        self._por_metodo = _Totais()
+        # Parte de `por_tipo` somada pelo id do método (só com catálogo)
+        self._tipo_por_metodo = _Totais()
+        self._por_tipo_combinado: Optional[Dict[str, Decimal]] = None
+        self.total_trocas = ZERO
+        self.quantidade_trocas = 0
+
+    def _metodo_da_chave(self, venda: Venda) -> Optional[int]:
+        """Id do método cuja chave de `por_tipo` é a da venda, ou None"""
+        if self.catalogo is None or venda.metodo is None:
+            return None
+        # O catálogo também reconhece um cartão com observação no lugar da modalidade;
+        # essa venda tem chave própria e continua somada pelo texto
+        if (venda.tipo_pagamento in TIPOS_SEM_DETALHE
+                or venda.detalhes_pagamento == self.catalogo[venda.metodo].detalhes_pagamento):
+            return venda.metodo
+        return None
+
+    def adicionar(self, venda: Venda):
+        self.total += venda.valor
+        self.quantidade += 1
+        metodo = self._metodo_da_chave(venda)
+        if metodo is not None:
+            self._tipo_por_metodo.somar(metodo, venda.valor)
+        else:
+            self._por_tipo.somar(chave_pagamento(venda.tipo_pagamento, venda.detalhes_pagamento), venda.valor)
+        self._por_tipo_combinado = None
+        if venda.bandeira:
+            self._por_bandeira.somar(venda.bandeira, venda.valor)
+        self._por_vendedor.somar(venda.vendedor, venda.valor)
+        if venda.metodo is not None:
+            self._por_metodo.somar(venda.metodo, venda.valor)
+        if venda.troca:
+            self.total_trocas += venda.valor
+            self.quantidade_trocas += 1
+
+    def remover(self, venda: Venda):
+        self.total -= venda.valor
+        self.quantidade -= 1
+        metodo = self._metodo_da_chave(venda)
+        if metodo is not None:
+            self._tipo_por_metodo.subtrair(metodo, venda.valor)
+        else:
+            self._por_tipo.subtrair(chave_pagamento(venda.tipo_pagamento, venda.detalhes_pagamento), venda.valor)
+        self._por_tipo_combinado = None
+        if venda.bandeira:
+            self._por_bandeira.subtrair(venda.bandeira, venda.valor)
+        self._por_vendedor.subtrair(venda.vendedor, venda.valor)
+        if venda.metodo is not None:
+            self._por_metodo.subtrair(venda.metodo, venda.valor)
+        if venda.troca:
+            self.total_trocas -= venda.valor
+            self.quantidade_trocas -= 1
+
+    @property
+    def por_tipo(self) -> Dict[str, Decimal]:
+        if not self._tipo_por_metodo.valores:
+            return self._por_tipo.valores
+        if self._por_tipo_combinado is None:
+            # Uma entrada por método usado no dia, não por venda
+            por_tipo = dict(self._por_tipo.valores)
+            for id_metodo, valor in self._tipo_por_metodo.valores.items():
+                chave = self.catalogo[id_metodo].chave
+                por_tipo[chave] = por_tipo.get(chave, ZERO) + valor
+            self._por_tipo_combinado = por_tipo
+        return self._por_tipo_combinado
+
+    @property
+    def por_bandeira(self) -> Dict[str, Decimal]:
+        return self._por_bandeira.valores
+
+    @property
+    def por_vendedor(self) -> Dict[str, Decimal]:
+        return self._por_vendedor.valores
+
+    @property
+    def por_metodo(self) -> Dict[int, Decimal]:
+        return self._por_metodo.valores
+
+    def como_dict(self) -> dict:
+        """Mesmo formato devolvido por `resumir`"""
+        return {
+            'total': self.total,
+            'quantidade': self.quantidade,
+            'por_tipo': dict(self.por_tipo),
+            'por_bandeira': dict(self.por_bandeira),
+            'por_vendedor': dict(self.por_vendedor),
+            'total_trocas': self.total_trocas,
+            'quantidade_trocas': self.quantidade_trocas
+        }
+
+    def verificar(self, vendas: Iterable[Venda]) -> List[str]:
+        """Compara com um recálculo completo e devolve as divergências encontradas"""
+        esperado = resumir(vendas)
+        atual = self.como_dict()
+        return [
+            f"{campo}: incremental={atual[campo]!r} recalculado={esperado[campo]!r}"
+            for campo in esperado
+            if atual[campo] != esperado[campo]
+        ]
+
+    def linhas(self) -> List[str]:
+        """Linhas do painel 'Resumo Geral', na ordem em que são exibidas"""
+        if not self.quantidade:
+            return ["Nenhuma venda registrada."]
+
+        linhas = [f"Total Geral: R$ {self.total:.2f}", "", "Por Tipo de Pagamento:"]
+        linhas.extend(f"- {tipo}: R$ {valor:.2f}" for tipo, valor in sorted(self.por_tipo.items()))
+
+        if self.por_bandeira:
+            linhas.extend(["", "Por Bandeira:"])
+            linhas.extend(f"- {bandeira}: R$ {valor:.2f}" for bandeira, valor in sorted(self.por_bandeira.items()))
+
+        if self.quantidade_trocas:
+            linhas.extend(["", f"Total de Trocas: R$ {self.total_trocas:.2f}"])
+        return linhas
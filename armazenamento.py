@@ -0,0 +1,1254 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import zlib
+import sqlite3
+import functools
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vendas import ColecaoVendas, Venda, gerar_id
+from agregados import resumir
+
+FORMATO_DATA = "%d/%m/%Y %H:%M:%S"
+PADRAO_ARQUIVO_DIA = re.compile(r'^vendas_(\d{8})\.(json|snapshot\.json|journal)$')
+PADRAO_ARQUIVO_MES = re.compile(r'^vendas_(\d{6})\.jsonl\.gz$')
+EXTENSOES_DIA = ('.json', '.snapshot.json', '.journal')
+VERSAO_ARQUIVO = 1
+_DECODIFICADOR = json.JSONDecoder()
+_ESPACOS = re.compile(r'[ \t\n\r]*')
+
+
+def _fsync_diretorio(caminho: str):
+    """Garante que a renomeação de um arquivo no diretório chegou ao disco"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(caminho)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def gravar_atomico(caminho: str, conteudo: bytes):
+    """Grava em arquivo temporário e substitui o destino de uma só vez"""
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as file:
+        file.write(conteudo)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporario, caminho)
+    _fsync_diretorio(caminho)
+
+
+def exportar_json(vendas: List[Venda], caminho: str):
+    """Exporta as vendas no formato JSON legado (lista de vendas)"""
+    dados = [venda.to_dict() for venda in vendas]
+    gravar_atomico(caminho, json.dumps(dados, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def importar_json(caminho: str) -> List[Venda]:
+    """Lê um arquivo no formato JSON legado"""
+    with open(caminho, 'r', encoding='utf-8') as file:
+        return [Venda.from_dict(venda_dict) for venda_dict in json.load(file)]
+
+
+def ler_snapshot(texto: str) -> dict:
+    """
+    Decodifica um snapshot venda a venda. Um único json.loads de um dia grande
+    segura o GIL por centenas de ms; assim a thread da interface continua
+    rodando enquanto o dia é carregado em segundo plano.
+    """
+    inicio = texto.find('"vendas"')
+    abre = texto.find('[', inicio)
+    if inicio < 0 or abre < 0 or texto[inicio + len('"vendas"'):abre].strip() != ':':
+        return json.loads(texto)
+    snapshot = json.loads(texto[:inicio].rstrip().rstrip(',') + '}')
+    if 'seq' not in snapshot:
+        return json.loads(texto)
+
+    vendas = []
+    posicao = abre + 1
+    try:
+        while True:
+            posicao = _ESPACOS.match(texto, posicao).end()
+            if texto[posicao] == ']':
+                break
+            venda, posicao = _DECODIFICADOR.raw_decode(texto, posicao)
+            vendas.append(venda)
+            posicao = _ESPACOS.match(texto, posicao).end()
+            if texto[posicao] == ',':
+                posicao += 1
+    except IndexError:
+        raise ValueError("Snapshot incompleto") from None
+    snapshot['vendas'] = vendas
+    return snapshot
+
+
+def _sem_id(dados: List[dict]) -> bool:
+    """Indica se algum registro é anterior aos ids estáveis e precisa ser regravado"""
+    return any('id' not in venda_dict for venda_dict in dados)
+
+
+def arquivo_do_dia(pasta: str, dia: date) -> str:
+    return os.path.join(pasta, f"vendas_{dia.strftime('%Y%m%d')}.json")
+
+
+def arquivo_recuperacao(pasta: str, dia: date) -> str:
+    """Vendas que não chegaram ao repositório; fora de PADRAO_ARQUIVO_DIA, nenhum backend o lê como o dia"""
+    return os.path.join(pasta, f"vendas_{dia.strftime('%Y%m%d')}.recuperacao.json")
+
+
+def gravar_recuperacao(pasta: str, dia: date, vendas: Iterable[Venda]) -> str:
+    """Acrescenta as vendas ao arquivo de recuperação do dia (a versão nova de cada id prevalece)"""
+    caminho = arquivo_recuperacao(pasta, dia)
+    por_id = {venda.id: venda for venda in importar_json(caminho)} if os.path.exists(caminho) else {}
+    por_id.update((venda.id, venda) for venda in vendas)
+    exportar_json(list(por_id.values()), caminho)
+    return caminho
+
+
+def dias_com_arquivo(pasta: str, arquivados: bool = True) -> List[date]:
+    """Lista os dias que possuem arquivo de vendas (JSON, snapshot ou journal) ou estão no arquivo mensal"""
+    dias = set()
+    for nome in os.listdir(pasta or '.'):
+        encontrado = PADRAO_ARQUIVO_DIA.match(nome)
+        if encontrado:
+            # Sem strptime: esta listagem roda a cada consulta e a pasta tem centenas de arquivos
+            numeros = encontrado.group(1)
+            dias.add(date(int(numeros[:4]), int(numeros[4:6]), int(numeros[6:])))
+        elif arquivados and PADRAO_ARQUIVO_MES.match(nome):
+            dias.update(ArquivoMensal(os.path.join(pasta, nome)).dias())
+    return sorted(dias)
+
+
+def _filtrar(vendas: Iterable[Venda], filtros: Dict[str, str]) -> Iterator[Venda]:
+    for venda in vendas:
+        if all(getattr(venda, campo) == valor for campo, valor in filtros.items() if valor is not None):
+            yield venda
+
+
+def _sincronizado(metodo):
+    """Executa o método com a trava do repositório (backends usados por mais de uma thread)"""
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        with self._trava:
+            return metodo(self, *args, **kwargs)
+    return envolvido
+
+
+class VendaRepository(ABC):
+    """
+    Interface comum dos backends de armazenamento de vendas.
+
+    O repositório é aberto para um dia (o dia corrente do caixa): `carregar`,
+    `adicionar`, `atualizar` e `excluir` operam sobre as vendas desse dia,
+    identificadas pelo `Venda.id`. `buscar` e `resumo` consultam qualquer
+    período.
+    """
+
+    CAMPOS_FILTRO = ('vendedor', 'tipo_pagamento', 'bandeira', 'numero_boleta')
+
+    def __init__(self, dia: Optional[date] = None):
+        self.dia = dia or date.today()
+
+    @abstractmethod
+    def carregar(self, somente_leitura: bool = False) -> List[Venda]:
+        """
+        Retorna as vendas do dia corrente. Com `somente_leitura` (consultas da
+        linha de comando), nada é gravado e o repositório não aceita alterações.
+        """
+
+    @abstractmethod
+    def adicionar(self, venda: Venda):
+        """Persiste uma nova venda no dia corrente"""
+
+    @abstractmethod
+    def atualizar(self, venda: Venda):
+        """Substitui a venda de mesmo id no dia corrente"""
+
+    @abstractmethod
+    def excluir(self, id_venda: str):
+        """Remove a venda `id_venda` do dia corrente"""
+
+    def excluir_lote(self, ids: Iterable[str]):
+        for id_venda in ids:
+            self.excluir(id_venda)
+
+    @abstractmethod
+    def buscar(self, inicio: date, fim: date, **filtros) -> Iterator[Venda]:
+        """Vendas entre `inicio` e `fim` (inclusive), com filtros por igualdade"""
+
+    @abstractmethod
+    def dias(self, inicio: date, fim: date) -> List[date]:
+        """Dias do período que possuem vendas gravadas"""
+
+    @abstractmethod
+    def assinatura_dia(self, dia: date) -> str:
+        """Valor que muda sempre que as vendas gravadas do dia mudam"""
+
+    def adicionar_lote(self, vendas: Iterable[Venda]):
+        for venda in vendas:
+            self.adicionar(venda)
+
+    def resumo(self, inicio: date, fim: date, **filtros) -> dict:
+        return resumir(self.buscar(inicio, fim, **filtros))
+
+    def arquivar(self, antes_de: date) -> List[date]:
+        """Compacta os dias fechados anteriores a `antes_de`; backends sem arquivos por dia não fazem nada"""
+        return []
+
+    @abstractmethod
+    def fechado_do_dia(self, dia: date):
+        """`DiaFechado` (ou `DiaFechadoSqlite`) de `dia`, para conferir o congelamento e as correções"""
+
+    @property
+    @abstractmethod
+    def dia_fechado(self) -> bool:
+        """O dia corrente já foi congelado: alterações passam por `corrigir`"""
+
+    @abstractmethod
+    def congelar_dia(self, vendas: List[Venda]) -> str:
+        """Congela as vendas do dia corrente e devolve o SHA-256 delas"""
+
+    @abstractmethod
+    def corrigir(self, alteracoes: List[tuple]):
+        """Registra alterações de um dia congelado como correções encadeadas"""
+
+    def fechar(self):
+        pass
+
+
+class _RepositorioArquivos(VendaRepository):
+    """Base dos backends que guardam um conjunto de arquivos por dia"""
+
+    def __init__(self, pasta: str = '.', dia: Optional[date] = None):
+        super().__init__(dia)
+        self.pasta = pasta
+        self.arquivo_json = arquivo_do_dia(pasta, self.dia)
+        self._vendas = ColecaoVendas()
+        self.fechado = DiaFechado(pasta, self.dia)
+        # Só depois de uma carga completa: gravar sobre um dia que não foi lido o apagaria
+        self._lido = False
+        # A gravação em segundo plano altera o dia corrente enquanto outras threads consultam
+        self._trava = threading.RLock()
+
+    def buscar(self, inicio: date, fim: date, **filtros) -> Iterator[Venda]:
+        for dia in self.dias(inicio, fim):
+            if dia == self.dia:
+                with self._trava:
+                    vendas = list(self._vendas)
+            else:
+                vendas = carregar_dia(self.pasta, dia)
+            yield from _filtrar(vendas, filtros)
+
+    def dias(self, inicio: date, fim: date) -> List[date]:
+        return [dia for dia in dias_com_arquivo(self.pasta) if inicio <= dia <= fim]
+
+    def assinatura_dia(self, dia: date) -> str:
+        fechado = DiaFechado(self.pasta, dia)
+        if fechado.existe():
+            return fechado.assinatura()
+        base = os.path.splitext(arquivo_do_dia(self.pasta, dia))[0]
+        partes = []
+        for caminho in (base + extensao for extensao in EXTENSOES_DIA):
+            if os.path.exists(caminho):
+                estado = os.stat(caminho)
+                partes.append(f"{os.path.basename(caminho)}:{estado.st_size}:{estado.st_mtime_ns}")
+        if not partes:
+            return ArquivoMensal(arquivo_do_mes(self.pasta, dia)).assinatura(dia)
+        return "|".join(partes)
+
+    def arquivar(self, antes_de: date) -> List[date]:
+        # O dia aberto neste repositório nunca é arquivado
+        return arquivar_dias(self.pasta, min(antes_de, self.dia))
+
+    def _exigir_leitura(self):
+        if not self._lido:
+            raise OSError(f"As vendas de {self.dia.strftime('%d/%m/%Y')} não foram lidas; "
+                          f"nada é gravado por cima delas.")
+
+    def fechado_do_dia(self, dia: date) -> 'DiaFechado':
+        return self.fechado if dia == self.dia else DiaFechado(self.pasta, dia)
+
+    @property
+    def dia_fechado(self) -> bool:
+        return self.fechado.existe()
+
+    @_sincronizado
+    def congelar_dia(self, vendas: List[Venda]) -> str:
+        self._exigir_leitura()
+        sha256 = self.fechado.congelar(vendas)
+        # Dali em diante o dia é o que está no arquivo congelado
+        self._vendas = ColecaoVendas(self.fechado.carregar())
+        return sha256
+
+    @_sincronizado
+    def corrigir(self, alteracoes: List[tuple]):
+        self.fechado.registrar(alteracoes)
+        for op, valor in alteracoes:
+            _aplicar_alteracao(self._vendas, op, valor)
+
+    def _carregar_fechado(self, somente_leitura: bool = False) -> List[Venda]:
+        self._vendas = ColecaoVendas(self.fechado.carregar())
+        self._lido = not somente_leitura
+        return list(self._vendas)
+
+
+class JsonVendaRepository(_RepositorioArquivos):
+    """Backend original: um JSON por dia, regravado a cada alteração"""
+
+    @_sincronizado
+    def carregar(self, somente_leitura: bool = False) -> List[Venda]:
+        self._lido = False
+        if self.fechado.existe():
+            return self._carregar_fechado(somente_leitura)
+        dados = []
+        if os.path.exists(self.arquivo_json):
+            with open(self.arquivo_json, 'r', encoding='utf-8') as file:
+                dados = json.load(file)
+        else:
+            # Dia já arquivado: volta a ser um arquivo comum na próxima alteração
+            arquivadas = ArquivoMensal(arquivo_do_mes(self.pasta, self.dia)).ler_dia(self.dia) or []
+            dados = [venda.to_dict() for venda in arquivadas]
+        self._vendas = ColecaoVendas(Venda.from_dict(venda_dict) for venda_dict in dados)
+        self._lido = not somente_leitura
+        if _sem_id(dados) and not somente_leitura:
+            exportar_json(list(self._vendas), self.arquivo_json)
+        return list(self._vendas)
+
+    def _gravar(self):
+        self._exigir_leitura()
+        exportar_json(list(self._vendas), self.arquivo_json)
+
+    @_sincronizado
+    def adicionar(self, venda: Venda):
+        self._vendas.adicionar(venda)
+        self._gravar()
+
+    @_sincronizado
+    def adicionar_lote(self, vendas: Iterable[Venda]):
+        for venda in vendas:
+            self._vendas.adicionar(venda)
+        self._gravar()
+
+    @_sincronizado
+    def atualizar(self, venda: Venda):
+        self._vendas.substituir(venda)
+        self._gravar()
+
+    @_sincronizado
+    def excluir(self, id_venda: str):
+        self._vendas.remover(id_venda)
+        self._gravar()
+
+    @_sincronizado
+    def excluir_lote(self, ids: Iterable[str]):
+        for id_venda in ids:
+            self._vendas.remover(id_venda)
+        self._gravar()
+
+
+class JournalVendaRepository(_RepositorioArquivos):
+    """
+    Armazenamento do dia em snapshot + journal append-only.
+
+    Cada adição, alteração ou exclusão vira uma linha no journal, gravada com fsync.
+    Periodicamente o journal é compactado em um snapshot gravado de forma
+    atômica; na carga, o snapshot é lido e o journal é reaplicado por cima.
+    O arquivo JSON legado continua sendo o formato de importação/exportação.
+    """
+
+    def __init__(self, pasta: str = '.', dia: Optional[date] = None, compactar_a_cada: int = 500):
+        super().__init__(pasta, dia)
+        base = os.path.splitext(self.arquivo_json)[0]
+        self.arquivo_snapshot = base + '.snapshot.json'
+        self.arquivo_journal = base + '.journal'
+        self.compactar_a_cada = compactar_a_cada
+
+        self._seq = 0
+        self._registros_pendentes = 0
+        self._ids_provisorios = False
+        self._journal = None
+
+    @_sincronizado
+    def carregar(self, somente_leitura: bool = False) -> List[Venda]:
+        """
+        Reconstrói as vendas a partir do snapshot e do journal.
+        Com `somente_leitura`, nada é importado, compactado ou truncado.
+        """
+        self.fechar()
+        self._lido = False
+        self._vendas = ColecaoVendas()
+        self._seq = 0
+        self._registros_pendentes = 0
+        self._ids_provisorios = False
+        if self.fechado.existe():
+            # Dia fechado: nem o journal nem o snapshot mudam mais
+            return self._carregar_fechado(somente_leitura)
+
+        if os.path.exists(self.arquivo_snapshot):
+            with open(self.arquivo_snapshot, 'r', encoding='utf-8') as file:
+                snapshot = ler_snapshot(file.read())
+            self._seq = snapshot['seq']
+            self._ids_provisorios = _sem_id(snapshot['vendas'])
+            self._vendas = ColecaoVendas(Venda.from_dict(venda_dict) for venda_dict in snapshot['vendas'])
+        elif not os.path.exists(self.arquivo_journal) and os.path.exists(self.arquivo_json):
+            # Primeira execução em modo journal: importa o arquivo legado
+            self._vendas = ColecaoVendas(importar_json(self.arquivo_json))
+            if not somente_leitura:
+                self._gravar_snapshot()
+        elif not os.path.exists(self.arquivo_journal):
+            arquivadas = ArquivoMensal(arquivo_do_mes(self.pasta, self.dia)).ler_dia(self.dia)
+            if arquivadas is not None:
+                # Dia reaberto depois de arquivado: volta a ter snapshot e journal próprios
+                self._vendas = ColecaoVendas(arquivadas)
+                if not somente_leitura:
+                    self._gravar_snapshot()
+
+        self._reaplicar_journal(somente_leitura)
+        # Sem truncar um registro incompleto no fim do journal, anexar depois dele seria perder o que vem em seguida
+        self._lido = not somente_leitura
+        if self._ids_provisorios and not somente_leitura:
+            # Vendas gravadas antes dos ids estáveis: fixa os ids gerados agora
+            self.compactar()
+        return list(self._vendas)
+
+    def _reaplicar_journal(self, somente_leitura: bool = False):
+        if not os.path.exists(self.arquivo_journal):
+            return
+
+        posicao_valida = 0
+        with open(self.arquivo_journal, 'rb') as file:
+            for linha in file:
+                registro = self._decodificar(linha)
+                if registro is None:
+                    # Registro incompleto (queda de energia durante a gravação):
+                    # tudo o que vem depois dele é descartado
+                    break
+                posicao_valida += len(linha)
+                if registro['seq'] <= self._seq:
+                    continue
+                self._aplicar(registro)
+                self._seq = registro['seq']
+                self._registros_pendentes += 1
+
+        if not somente_leitura and posicao_valida < os.path.getsize(self.arquivo_journal):
+            with open(self.arquivo_journal, 'r+b') as file:
+                file.truncate(posicao_valida)
+                os.fsync(file.fileno())
+
+    @staticmethod
+    def _codificar(registro: dict) -> bytes:
+        corpo = json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return b'%08x %s\n' % (zlib.crc32(corpo), corpo)
+
+    @staticmethod
+    def _decodificar(linha: bytes) -> Optional[dict]:
+        if not linha.endswith(b'\n') or len(linha) < 10:
+            return None
+        crc, corpo = linha[:8], linha[9:-1]
+        try:
+            if int(crc, 16) != zlib.crc32(corpo):
+                return None
+            return json.loads(corpo.decode('utf-8'))
+        except ValueError:
+            return None
+
+    def _aplicar(self, registro: dict):
+        if registro['op'] == 'add':
+            self._ids_provisorios = self._ids_provisorios or 'id' not in registro['venda']
+            self._vendas.adicionar(Venda.from_dict(registro['venda']))
+        elif registro['op'] == 'upd':
+            self._vendas.substituir(Venda.from_dict(registro['venda']))
+        elif registro['op'] == 'del':
+            if 'indice' in registro:
+                # Journals anteriores aos ids estáveis excluíam por posição
+                self._vendas.remover(list(self._vendas)[registro['indice']].id)
+            else:
+                self._vendas.remover(registro['id'])
+
+    def _anexar(self, registros: List[dict]):
+        # Com o snapshot ilegível, _seq recomeçaria do zero e a próxima carga ignoraria estes registros
+        self._exigir_leitura()
+        blocos = []
+        for registro in registros:
+            self._seq += 1
+            registro['seq'] = self._seq
+            blocos.append(self._codificar(registro))
+        if self._journal is None:
+            self._journal = open(self.arquivo_journal, 'ab')
+        self._journal.write(b''.join(blocos))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        self._registros_pendentes += len(registros)
+        if self._registros_pendentes >= self.compactar_a_cada:
+            self.compactar()
+
+    @_sincronizado
+    def adicionar(self, venda: Venda):
+        self._vendas.adicionar(venda)
+        self._anexar([{'op': 'add', 'venda': venda.to_dict()}])
+
+    @_sincronizado
+    def adicionar_lote(self, vendas: Iterable[Venda]):
+        vendas = list(vendas)
+        for venda in vendas:
+            self._vendas.adicionar(venda)
+        self._anexar([{'op': 'add', 'venda': venda.to_dict()} for venda in vendas])
+
+    @_sincronizado
+    def atualizar(self, venda: Venda):
+        self._vendas.substituir(venda)
+        self._anexar([{'op': 'upd', 'venda': venda.to_dict()}])
+
+    @_sincronizado
+    def excluir(self, id_venda: str):
+        self._vendas.remover(id_venda)
+        self._anexar([{'op': 'del', 'id': id_venda}])
+
+    @_sincronizado
+    def excluir_lote(self, ids: Iterable[str]):
+        ids = list(ids)
+        for id_venda in ids:
+            self._vendas.remover(id_venda)
+        self._anexar([{'op': 'del', 'id': id_venda} for id_venda in ids])
+
+    def _gravar_snapshot(self):
+        snapshot = {
+            'seq': self._seq,
+            'vendas': [venda.to_dict() for venda in self._vendas]
+        }
+        gravar_atomico(self.arquivo_snapshot, json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+
+    @_sincronizado
+    def compactar(self):
+        """Grava um novo snapshot, descarta o journal e atualiza o JSON exportado"""
+        self._exigir_leitura()
+        self._gravar_snapshot()
+        # Se a energia cair aqui, os registros antigos do journal são
+        # ignorados na carga porque o seq deles já está no snapshot
+        self.fechar()
+        gravar_atomico(self.arquivo_journal, b'')
+        self._registros_pendentes = 0
+        self._ids_provisorios = False
+        exportar_json(list(self._vendas), self.arquivo_json)
+
+    @_sincronizado
+    def fechar(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def _linhas_jsonl(vendas: Iterable[Venda]) -> bytes:
+    return "".join(json.dumps(venda.to_dict(), ensure_ascii=False, separators=(',', ':')) + "\n"
+                   for venda in vendas).encode('utf-8')
+
+
+def _aplicar_alteracao(vendas: ColecaoVendas, op: str, valor):
+    """Aplica ('add', venda), ('upd', venda) ou ('del', id) à coleção"""
+    if op == 'add':
+        vendas.adicionar(valor)
+    elif op == 'upd':
+        vendas.substituir(valor)
+    else:
+        vendas.remover(valor)
+
+
+def arquivo_do_mes(pasta: str, dia: date) -> str:
+    return os.path.join(pasta, f"vendas_{dia.strftime('%Y%m')}.jsonl.gz")
+
+
+# Índices dos arquivos mensais já lidos: caminho -> (mtime, tamanho, início dos dados, dias)
+_INDICES_MENSAIS: Dict[str, tuple] = {}
+
+
+class ArquivoMensal:
+    """
+    Dias fechados de um mês em um único arquivo gzip.
+
+    O arquivo é uma sequência de membros gzip: o primeiro tem o índice
+    ({'versao', 'dias': {'AAAAMMDD': [posição, tamanho, quantidade]}}) e cada
+    dia é um membro com as vendas em JSON Lines. A posição é contada a partir
+    do fim do índice, então um dia é lido descomprimindo só o seu membro; o
+    arquivo inteiro continua legível com `zcat`. Toda gravação substitui o
+    arquivo de forma atômica.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+
+    def _indice(self) -> Tuple[int, Dict[str, list]]:
+        """(posição do primeiro dia, dias); dias vazios se o arquivo não existe"""
+        try:
+            estado = os.stat(self.caminho)
+        except FileNotFoundError:
+            return 0, {}
+        guardado = _INDICES_MENSAIS.get(self.caminho)
+        if guardado is not None and guardado[:2] == (estado.st_mtime_ns, estado.st_size):
+            return guardado[2], guardado[3]
+
+        descompressor = zlib.decompressobj(wbits=31)
+        lidos, partes = 0, []
+        with open(self.caminho, 'rb') as file:
+            while not descompressor.eof:
+                bloco = file.read(16384)
+                if not bloco:
+                    raise ValueError(f"Arquivo mensal incompleto: {self.caminho}")
+                lidos += len(bloco)
+                partes.append(descompressor.decompress(bloco))
+        indice = json.loads(b''.join(partes))
+        if indice.get('versao') != VERSAO_ARQUIVO:
+            raise ValueError(f"Versão de arquivo mensal não suportada: {self.caminho}")
+        inicio = lidos - len(descompressor.unused_data)
+        _INDICES_MENSAIS[self.caminho] = (estado.st_mtime_ns, estado.st_size, inicio, indice['dias'])
+        return inicio, indice['dias']
+
+    def dias(self) -> List[date]:
+        return [datetime.strptime(chave, '%Y%m%d').date() for chave in sorted(self._indice()[1])]
+
+    def assinatura(self, dia: date) -> str:
+        """Muda quando o dia é arquivado de novo; vazia se o dia não está no arquivo"""
+        entrada = self._indice()[1].get(dia.strftime('%Y%m%d'))
+        if entrada is None:
+            return ""
+        return f"{os.path.basename(self.caminho)}:{entrada[0]}:{entrada[1]}"
+
+    def _ler_membro(self, file, inicio: int, entrada: list) -> bytes:
+        file.seek(inicio + entrada[0])
+        return file.read(entrada[1])
+
+    def ler_dia(self, dia: date) -> Optional[List[Venda]]:
+        """Vendas do dia, ou None se o dia não está arquivado"""
+        inicio, dias = self._indice()
+        entrada = dias.get(dia.strftime('%Y%m%d'))
+        if entrada is None:
+            return None
+        with open(self.caminho, 'rb') as file:
+            conteudo = gzip.decompress(self._ler_membro(file, inicio, entrada))
+        return [Venda.from_dict(json.loads(linha)) for linha in conteudo.splitlines()]
+
+    def gravar(self, novos: Dict[date, List[Venda]]):
+        """Inclui (ou substitui) dias, copiando os já arquivados sem descomprimi-los"""
+        inicio, dias = self._indice()
+        membros: Dict[str, Tuple[bytes, int]] = {}
+        if dias:
+            with open(self.caminho, 'rb') as file:
+                for chave, entrada in dias.items():
+                    membros[chave] = (self._ler_membro(file, inicio, entrada), entrada[2])
+        for dia, vendas in novos.items():
+            membros[dia.strftime('%Y%m%d')] = (gzip.compress(_linhas_jsonl(vendas), 9, mtime=0), len(vendas))
+
+        indice, posicao = {}, 0
+        for chave in sorted(membros):
+            comprimido, quantidade = membros[chave]
+            indice[chave] = [posicao, len(comprimido), quantidade]
+            posicao += len(comprimido)
+        cabecalho = json.dumps({'versao': VERSAO_ARQUIVO, 'dias': indice}, separators=(',', ':'))
+        corpo = [membros[chave][0] for chave in sorted(membros)]
+        gravar_atomico(self.caminho, b''.join([gzip.compress(cabecalho.encode('utf-8'), 9, mtime=0)] + corpo))
+
+
+def arquivar_dias(pasta: str, antes_de: date) -> List[date]:
+    """
+    Move os dias anteriores a `antes_de` para os arquivos mensais e apaga os
+    arquivos do dia (JSON, snapshot e journal). Os arquivos do dia só são
+    apagados depois que o arquivo mensal foi gravado; se a gravação for
+    interrompida, o dia continua sendo lido dos arquivos do dia.
+    """
+    por_mes: Dict[str, Dict[date, List[Venda]]] = {}
+    for dia in dias_com_arquivo(pasta, arquivados=False):
+        if dia < antes_de:
+            por_mes.setdefault(arquivo_do_mes(pasta, dia), {})[dia] = carregar_dia(pasta, dia)
+
+    arquivados = []
+    for caminho, dias in sorted(por_mes.items()):
+        ArquivoMensal(caminho).gravar(dias)
+        for dia in sorted(dias):
+            base = os.path.splitext(arquivo_do_dia(pasta, dia))[0]
+            for extensao in EXTENSOES_DIA:
+                if os.path.exists(base + extensao):
+                    os.remove(base + extensao)
+            arquivados.append(dia)
+    return arquivados
+
+
+def _encadear_correcoes(anterior: str, alteracoes: List[tuple]) -> List[Tuple[str, bytes]]:
+    """(SHA-256, JSON) de cada correção; cada hash cobre o anterior e o JSON da correção"""
+    momento = datetime.now().strftime(FORMATO_DATA)
+    encadeadas = []
+    for op, valor in alteracoes:
+        registro = {'op': op, 'momento': momento}
+        if op == 'del':
+            registro['id'] = valor
+        else:
+            registro['venda'] = valor.to_dict()
+        corpo = json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        anterior = hashlib.sha256(anterior.encode('ascii') + corpo).hexdigest()
+        encadeadas.append((anterior, corpo))
+    return encadeadas
+
+
+def _alteracao_do_registro(registro: dict) -> tuple:
+    return registro['op'], registro['id'] if registro['op'] == 'del' else Venda.from_dict(registro['venda'])
+
+
+def _vendas_corrigidas(corpo: bytes, registros: List[dict]) -> List[Venda]:
+    """Vendas congeladas (JSON Lines) com as correções aplicadas em ordem"""
+    vendas = ColecaoVendas(Venda.from_dict(json.loads(linha)) for linha in corpo.splitlines())
+    for registro in registros:
+        _aplicar_alteracao(vendas, *_alteracao_do_registro(registro))
+    return list(vendas)
+
+
+class DiaFechado:
+    """
+    Dia fechado no caixa: as vendas congeladas em `vendas_AAAAMMDD.fechado.jsonl.gz`
+    e as correções feitas depois do fechamento em `vendas_AAAAMMDD.ajustes.jsonl`.
+
+    O arquivo congelado é gravado uma única vez e fica somente leitura. A
+    primeira linha tem a quantidade de vendas e o SHA-256 das demais, que só
+    `verificar` confere: a leitura confia no arquivo e pula o que a carga
+    normal valida (CRC do journal, ids provisórios, formato legado). Cada
+    correção é uma linha '<sha256> <json>' encadeada à anterior (a primeira,
+    ao SHA-256 das vendas congeladas); mudar ou apagar uma linha quebra a cadeia.
+    """
+
+    def __init__(self, pasta: str, dia: date):
+        base = os.path.splitext(arquivo_do_dia(pasta, dia))[0]
+        self.dia = dia
+        self.arquivo = base + '.fechado.jsonl.gz'
+        self.arquivo_ajustes = base + '.ajustes.jsonl'
+
+    def existe(self) -> bool:
+        return os.path.exists(self.arquivo)
+
+    def cabecalho(self) -> dict:
+        """{'versao', 'dia', 'quantidade', 'sha256'} sem descomprimir as vendas"""
+        with gzip.open(self.arquivo, 'rb') as file:
+            return json.loads(file.readline())
+
+    def _ler(self) -> Tuple[dict, bytes]:
+        with open(self.arquivo, 'rb') as file:
+            conteudo = gzip.decompress(file.read())
+        fim = conteudo.index(b'\n') + 1
+        return json.loads(conteudo[:fim]), conteudo[fim:]
+
+    def congelar(self, vendas: List[Venda]) -> str:
+        """Grava o arquivo congelado e devolve o SHA-256 das vendas; um dia já congelado não é regravado"""
+        if self.existe():
+            return self.cabecalho()['sha256']
+        corpo = _linhas_jsonl(vendas)
+        sha256 = hashlib.sha256(corpo).hexdigest()
+        cabecalho = json.dumps({'versao': VERSAO_ARQUIVO, 'dia': self.dia.isoformat(),
+                                'quantidade': len(vendas), 'sha256': sha256}, separators=(',', ':'))
+        gravar_atomico(self.arquivo, gzip.compress(cabecalho.encode('utf-8') + b'\n' + corpo, 9, mtime=0))
+        os.chmod(self.arquivo, 0o444)
+        return sha256
+
+    def _ler_ajustes(self, anterior: str) -> Tuple[List[dict], str, int, Optional[str]]:
+        """
+        (correções, hash da última, bytes válidos, problema). Uma última linha
+        incompleta (gravação interrompida) não é problema; uma linha que não
+        confere com a cadeia é, e nada depois dela é aplicado.
+        """
+        try:
+            file = open(self.arquivo_ajustes, 'rb')
+        except FileNotFoundError:
+            return [], anterior, 0, None
+        registros, validos = [], 0
+        with file:
+            for numero, linha in enumerate(file, 1):
+                if not linha.endswith(b'\n'):
+                    break
+                corpo = linha[65:-1]
+                if linha[:64] != hashlib.sha256(anterior.encode('ascii') + corpo).hexdigest().encode('ascii'):
+                    return registros, anterior, validos, f"ajustes: cadeia de SHA-256 quebrada na linha {numero}"
+                registros.append(json.loads(corpo.decode('utf-8')))
+                anterior = linha[:64].decode('ascii')
+                validos += len(linha)
+        return registros, anterior, validos, None
+
+    def ajustes(self) -> List[dict]:
+        """Correções feitas depois do fechamento, na ordem em que foram gravadas"""
+        return self._ler_ajustes(self.cabecalho()['sha256'])[0]
+
+    def carregar(self) -> List[Venda]:
+        """Vendas congeladas com as correções aplicadas"""
+        cabecalho, corpo = self._ler()
+        return _vendas_corrigidas(corpo, self._ler_ajustes(cabecalho['sha256'])[0])
+
+    def registrar(self, alteracoes: List[tuple]):
+        """Anexa as alterações ao fim da cadeia de correções, com fsync"""
+        _, anterior, validos, problema = self._ler_ajustes(self.cabecalho()['sha256'])
+        if problema:
+            raise ValueError(f"Registro de correções do dia {self.dia.strftime('%d/%m/%Y')} adulterado ({problema})")
+        blocos = [sha256.encode('ascii') + b' ' + corpo + b'\n'
+                  for sha256, corpo in _encadear_correcoes(anterior, alteracoes)]
+        with open(self.arquivo_ajustes, 'ab') as file:
+            # Descarta a linha incompleta de uma gravação interrompida antes de continuar a cadeia
+            file.truncate(validos)
+            file.write(b''.join(blocos))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def assinatura(self) -> str:
+        partes = []
+        for caminho in (self.arquivo, self.arquivo_ajustes):
+            if os.path.exists(caminho):
+                estado = os.stat(caminho)
+                partes.append(f"{os.path.basename(caminho)}:{estado.st_size}:{estado.st_mtime_ns}")
+        return "|".join(partes)
+
+    def verificar(self) -> List[str]:
+        """Confere o SHA-256 das vendas congeladas e a cadeia de correções; devolve os problemas"""
+        cabecalho, corpo = self._ler()
+        problemas = []
+        if hashlib.sha256(corpo).hexdigest() != cabecalho['sha256']:
+            problemas.append("vendas congeladas: SHA-256 não confere")
+        elif corpo.count(b'\n') != cabecalho['quantidade']:
+            problemas.append("vendas congeladas: quantidade não confere")
+        problema = self._ler_ajustes(cabecalho['sha256'])[3]
+        if problema:
+            problemas.append(problema)
+        return problemas
+
+
+def carregar_dia(pasta: str, dia: date) -> List[Venda]:
+    """Lê as vendas de um dia gravado em arquivos, em qualquer um dos formatos, ou do arquivo mensal"""
+    fechado = DiaFechado(pasta, dia)
+    if fechado.existe():
+        return fechado.carregar()
+    journal = JournalVendaRepository(pasta, dia)
+    if os.path.exists(journal.arquivo_snapshot) or os.path.exists(journal.arquivo_journal):
+        return journal.carregar(somente_leitura=True)
+    if os.path.exists(journal.arquivo_json):
+        return importar_json(journal.arquivo_json)
+    return ArquivoMensal(arquivo_do_mes(pasta, dia)).ler_dia(dia) or []
+
+
+class SqliteVendaRepository(VendaRepository):
+    """Backend SQLite (modo WAL) com índices e agregações feitas no banco"""
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS vendas (
+            id INTEGER PRIMARY KEY,
+            uid TEXT,
+            data TEXT NOT NULL,
+            vendedor TEXT NOT NULL,
+            tipo_pagamento TEXT NOT NULL,
+            detalhes_pagamento TEXT NOT NULL,
+            bandeira TEXT NOT NULL,
+            valor_centavos INTEGER NOT NULL,
+            numero_boleta TEXT NOT NULL,
+            troca INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas (data);
+        CREATE INDEX IF NOT EXISTS idx_vendas_vendedor ON vendas (vendedor);
+        CREATE INDEX IF NOT EXISTS idx_vendas_tipo_pagamento ON vendas (tipo_pagamento);
+        CREATE INDEX IF NOT EXISTS idx_vendas_bandeira ON vendas (bandeira);
+        CREATE INDEX IF NOT EXISTS idx_vendas_numero_boleta ON vendas (numero_boleta);
+    """
+    # Versão 2: cada alteração incrementa a versão do dia em versoes_dia (usada pelos resumos diários)
+    # Versão 3: dias fechados e correções encadeadas (veja DiaFechadoSqlite)
+    VERSAO_ESQUEMA = 3
+    GATILHOS_VERSAO = [
+        "CREATE TABLE IF NOT EXISTS versoes_dia (dia TEXT PRIMARY KEY, versao INTEGER NOT NULL)",
+        """CREATE TRIGGER IF NOT EXISTS trg_vendas_inserir AFTER INSERT ON vendas BEGIN
+               INSERT INTO versoes_dia (dia, versao) VALUES (substr(NEW.data, 1, 10), 1)
+               ON CONFLICT (dia) DO UPDATE SET versao = versao + 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_vendas_excluir AFTER DELETE ON vendas BEGIN
+               INSERT INTO versoes_dia (dia, versao) VALUES (substr(OLD.data, 1, 10), 1)
+               ON CONFLICT (dia) DO UPDATE SET versao = versao + 1;
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_vendas_atualizar AFTER UPDATE ON vendas BEGIN
+               INSERT INTO versoes_dia (dia, versao) VALUES (substr(OLD.data, 1, 10), 1)
+               ON CONFLICT (dia) DO UPDATE SET versao = versao + 1;
+               INSERT INTO versoes_dia (dia, versao) VALUES (substr(NEW.data, 1, 10), 1)
+               ON CONFLICT (dia) DO UPDATE SET versao = versao + 1;
+           END""",
+        "INSERT OR IGNORE INTO versoes_dia (dia, versao) SELECT DISTINCT substr(data, 1, 10), 1 FROM vendas"
+    ]
+    TABELAS_FECHAMENTO = [
+        """CREATE TABLE IF NOT EXISTS dias_fechados (
+               dia TEXT PRIMARY KEY,
+               quantidade INTEGER NOT NULL,
+               sha256 TEXT NOT NULL,
+               vendas BLOB NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS ajustes (
+               seq INTEGER PRIMARY KEY,
+               dia TEXT NOT NULL,
+               sha256 TEXT NOT NULL,
+               registro TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_ajustes_dia ON ajustes (dia, seq)",
+        # Como o chmod 0o444 dos arquivos: o que foi congelado ou corrigido não muda mais
+        """CREATE TRIGGER IF NOT EXISTS trg_dias_fechados_imutaveis BEFORE UPDATE ON dias_fechados BEGIN
+               SELECT RAISE(ABORT, 'dia fechado não pode ser alterado');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_dias_fechados_permanentes BEFORE DELETE ON dias_fechados BEGIN
+               SELECT RAISE(ABORT, 'dia fechado não pode ser apagado');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_ajustes_imutaveis BEFORE UPDATE ON ajustes BEGIN
+               SELECT RAISE(ABORT, 'correção não pode ser alterada');
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_ajustes_permanentes BEFORE DELETE ON ajustes BEGIN
+               SELECT RAISE(ABORT, 'correção não pode ser apagada');
+           END"""
+    ]
+    INSERIR = """
+        INSERT INTO vendas (data, vendedor, tipo_pagamento, detalhes_pagamento,
+                            bandeira, valor_centavos, numero_boleta, troca, uid)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    ATUALIZAR = """
+        UPDATE vendas SET data = ?, vendedor = ?, tipo_pagamento = ?, detalhes_pagamento = ?,
+                          bandeira = ?, valor_centavos = ?, numero_boleta = ?, troca = ?
+        WHERE uid = ?
+    """
+    COLUNAS = "data, vendedor, tipo_pagamento, detalhes_pagamento, bandeira, valor_centavos, numero_boleta, troca, uid"
+    # Mesma regra de agregados.chave_pagamento(), avaliada no banco
+    EXPRESSAO_CHAVE_PAGAMENTO = """
+        CASE WHEN detalhes_pagamento <> '' AND tipo_pagamento NOT IN ('Dinheiro', 'PIX', 'Troca')
+             THEN tipo_pagamento || ' - ' || detalhes_pagamento
+             ELSE tipo_pagamento END
+    """
+
+    def __init__(self, caminho: str, dia: Optional[date] = None):
+        super().__init__(dia)
+        self.caminho = caminho
+        # A conexão é compartilhada com threads de fundo (relatórios); o acesso é serializado pela trava
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.RLock()
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=FULL")
+        self.conexao.executescript(self.ESQUEMA)
+        self._migrar_esquema()
+        self.fechado = DiaFechadoSqlite(self, self.dia)
+
+    def _migrar_esquema(self):
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao >= self.VERSAO_ESQUEMA:
+            return
+        with self.conexao:
+            if versao < 1:
+                colunas = {linha[1] for linha in self.conexao.execute("PRAGMA table_info(vendas)")}
+                if 'uid' not in colunas:
+                    self.conexao.execute("ALTER TABLE vendas ADD COLUMN uid TEXT")
+                # Bancos criados antes dos ids estáveis: cada venda recebe o seu
+                sem_uid = [linha[0] for linha in self.conexao.execute("SELECT id FROM vendas WHERE uid IS NULL ORDER BY id")]
+                self.conexao.executemany("UPDATE vendas SET uid = ? WHERE id = ?", [(gerar_id(), id_linha) for id_linha in sem_uid])
+                self.conexao.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vendas_uid ON vendas (uid)")
+            if versao < 2:
+                for comando in self.GATILHOS_VERSAO:
+                    self.conexao.execute(comando)
+            if versao < 3:
+                for comando in self.TABELAS_FECHAMENTO:
+                    self.conexao.execute(comando)
+            self.conexao.execute(f"PRAGMA user_version = {self.VERSAO_ESQUEMA}")
+
+    @staticmethod
+    def _data_iso(data: str) -> str:
+        return datetime.strptime(data, FORMATO_DATA).strftime("%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    def _linha(cls, venda: Venda) -> tuple:
+        return (
+            cls._data_iso(venda.data),
+            venda.vendedor,
+            venda.tipo_pagamento,
+            venda.detalhes_pagamento,
+            venda.bandeira,
+            int(venda.valor * 100),
+            venda.numero_boleta,
+            int(venda.troca),
+            venda.id
+        )
+
+    @staticmethod
+    def _venda(linha: tuple) -> Venda:
+        data, vendedor, tipo, detalhes, bandeira, centavos, boleta, troca, uid = linha
+        return Venda(
+            vendedor=vendedor,
+            tipo_pagamento=tipo,
+            detalhes_pagamento=detalhes,
+            bandeira=bandeira,
+            valor=Decimal(centavos).scaleb(-2),
+            numero_boleta=boleta,
+            troca=bool(troca),
+            data=datetime.strptime(data, "%Y-%m-%d %H:%M:%S").strftime(FORMATO_DATA),
+            id=uid
+        )
+
+    @staticmethod
+    def _intervalo(inicio: date, fim: date) -> tuple:
+        return inicio.isoformat(), (fim + timedelta(days=1)).isoformat()
+
+    def _where(self, inicio: date, fim: date, filtros: dict) -> tuple:
+        condicoes = ["data >= ?", "data < ?"]
+        parametros = list(self._intervalo(inicio, fim))
+        for campo, valor in filtros.items():
+            if campo not in self.CAMPOS_FILTRO:
+                raise ValueError(f"Filtro inválido: {campo}")
+            if valor is not None:
+                condicoes.append(f"{campo} = ?")
+                parametros.append(valor)
+        return " AND ".join(condicoes), parametros
+
+    def _consultar(self, sql: str, parametros=()) -> list:
+        with self._trava:
+            return self.conexao.execute(sql, parametros).fetchall()
+
+    def carregar(self, somente_leitura: bool = False) -> List[Venda]:
+        # Cada venda é uma linha: ler não grava nada, e não há o que proteger com `somente_leitura`
+        linhas = self._consultar(
+            f"SELECT {self.COLUNAS} FROM vendas WHERE data >= ? AND data < ? ORDER BY id",
+            self._intervalo(self.dia, self.dia)
+        )
+        return [self._venda(linha) for linha in linhas]
+
+    @_sincronizado
+    def adicionar(self, venda: Venda):
+        with self.conexao:
+            self.conexao.execute(self.INSERIR, self._linha(venda))
+
+    @_sincronizado
+    def adicionar_lote(self, vendas: Iterable[Venda]):
+        with self.conexao:
+            self.conexao.executemany(self.INSERIR, [self._linha(venda) for venda in vendas])
+
+    @_sincronizado
+    def atualizar(self, venda: Venda):
+        with self.conexao:
+            self.conexao.execute(self.ATUALIZAR, self._linha(venda))
+
+    def excluir(self, id_venda: str):
+        self.excluir_lote([id_venda])
+
+    @_sincronizado
+    def excluir_lote(self, ids: Iterable[str]):
+        with self.conexao:
+            self.conexao.executemany("DELETE FROM vendas WHERE uid = ?", [(id_venda,) for id_venda in ids])
+
+    def buscar(self, inicio: date, fim: date, **filtros) -> Iterator[Venda]:
+        where, parametros = self._where(inicio, fim, filtros)
+        linhas = self._consultar(f"SELECT {self.COLUNAS} FROM vendas WHERE {where} ORDER BY data, id", parametros)
+        for linha in linhas:
+            yield self._venda(linha)
+
+    def dias(self, inicio: date, fim: date) -> List[date]:
+        linhas = self._consultar(
+            "SELECT DISTINCT substr(data, 1, 10) AS dia FROM vendas WHERE data >= ? AND data < ? ORDER BY dia",
+            self._intervalo(inicio, fim)
+        )
+        return [date.fromisoformat(dia) for dia, in linhas]
+
+    def assinatura_dia(self, dia: date) -> str:
+        linhas = self._consultar("SELECT versao FROM versoes_dia WHERE dia = ?", (dia.isoformat(),))
+        return f"sqlite:{linhas[0][0]}" if linhas else ""
+
+    def _somar_por(self, expressao: str, where: str, parametros: list) -> Dict[str, Decimal]:
+        linhas = self._consultar(
+            f"SELECT {expressao} AS chave, SUM(valor_centavos) FROM vendas WHERE {where} GROUP BY chave",
+            parametros
+        )
+        return {chave: Decimal(centavos).scaleb(-2) for chave, centavos in linhas if chave}
+
+    def resumo(self, inicio: date, fim: date, **filtros) -> dict:
+        where, parametros = self._where(inicio, fim, filtros)
+        quantidade, total, trocas, quantidade_trocas = self._consultar(
+            f"SELECT COUNT(*), COALESCE(SUM(valor_centavos), 0), "
+            f"COALESCE(SUM(CASE WHEN troca THEN valor_centavos ELSE 0 END), 0), "
+            f"COALESCE(SUM(troca), 0) FROM vendas WHERE {where}",
+            parametros
+        )[0]
+        return {
+            'total': Decimal(total).scaleb(-2),
+            'quantidade': quantidade,
+            'por_tipo': self._somar_por(self.EXPRESSAO_CHAVE_PAGAMENTO, where, parametros),
+            'por_bandeira': self._somar_por("bandeira", where, parametros),
+            'por_vendedor': self._somar_por("vendedor", where, parametros),
+            'total_trocas': Decimal(trocas).scaleb(-2),
+            'quantidade_trocas': quantidade_trocas
+        }
+
+    def fechado_do_dia(self, dia: date) -> 'DiaFechadoSqlite':
+        return self.fechado if dia == self.dia else DiaFechadoSqlite(self, dia)
+
+    @property
+    def dia_fechado(self) -> bool:
+        return self.fechado.existe()
+
+    def congelar_dia(self, vendas: List[Venda]) -> str:
+        return self.fechado.congelar(vendas)
+
+    def corrigir(self, alteracoes: List[tuple]):
+        self.fechado.registrar(alteracoes)
+
+    def _aplicar_na_tabela(self, op: str, valor):
+        """Mesma operação de `adicionar`/`atualizar`/`excluir`, dentro da transação aberta"""
+        if op == 'add':
+            self.conexao.execute(self.INSERIR, self._linha(valor))
+        elif op == 'upd':
+            self.conexao.execute(self.ATUALIZAR, self._linha(valor))
+        else:
+            self.conexao.execute("DELETE FROM vendas WHERE uid = ?", (valor,))
+
+    @_sincronizado
+    def substituir_dia(self, dia: date, vendas: List[Venda]):
+        """Troca todas as vendas de um dia em uma única transação (usado na migração)"""
+        if self.fechado_do_dia(dia).existe():
+            raise ValueError(f"O dia {dia.strftime('%d/%m/%Y')} já foi fechado: as vendas só mudam por correções")
+        with self.conexao:
+            self.conexao.execute("DELETE FROM vendas WHERE data >= ? AND data < ?", self._intervalo(dia, dia))
+            self.conexao.executemany(self.INSERIR, [self._linha(venda) for venda in vendas])
+
+    @_sincronizado
+    def fechar(self):
+        self.conexao.close()
+
+
+class DiaFechadoSqlite:
+    """
+    `DiaFechado` no banco. As vendas congeladas ficam em `dias_fechados`
+    (JSON Lines, com quantidade e SHA-256, como no arquivo) e as correções em
+    `ajustes`, encadeadas pelo SHA-256 da mesma forma. Gatilhos recusam
+    UPDATE e DELETE nas duas tabelas. A tabela `vendas` continua sendo a
+    leitura do dia: cada correção é gravada nela na mesma transação do ajuste,
+    e `verificar` confere que ela ainda é o congelado mais as correções.
+    """
+
+    def __init__(self, repositorio: 'SqliteVendaRepository', dia: date):
+        self.repositorio = repositorio
+        self.dia = dia
+        self._chave = dia.isoformat()
+        self._existe = False
+
+    def existe(self) -> bool:
+        # Um dia fechado nunca reabre: depois da primeira resposta positiva não consulta mais
+        if not self._existe:
+            self._existe = bool(self.repositorio._consultar(
+                "SELECT 1 FROM dias_fechados WHERE dia = ?", (self._chave,)))
+        return self._existe
+
+    def cabecalho(self) -> dict:
+        quantidade, sha256 = self.repositorio._consultar(
+            "SELECT quantidade, sha256 FROM dias_fechados WHERE dia = ?", (self._chave,))[0]
+        return {'versao': VERSAO_ARQUIVO, 'dia': self._chave, 'quantidade': quantidade, 'sha256': sha256}
+
+    def _ler(self) -> Tuple[dict, bytes]:
+        corpo = self.repositorio._consultar("SELECT vendas FROM dias_fechados WHERE dia = ?", (self._chave,))[0][0]
+        return self.cabecalho(), bytes(corpo)
+
+    def congelar(self, vendas: List[Venda]) -> str:
+        """Grava as vendas congeladas e devolve o SHA-256; um dia já congelado não é regravado"""
+        with self.repositorio._trava:
+            if self.existe():
+                return self.cabecalho()['sha256']
+            corpo = _linhas_jsonl(vendas)
+            sha256 = hashlib.sha256(corpo).hexdigest()
+            with self.repositorio.conexao:
+                self.repositorio.conexao.execute(
+                    "INSERT INTO dias_fechados (dia, quantidade, sha256, vendas) VALUES (?, ?, ?, ?)",
+                    (self._chave, len(vendas), sha256, corpo))
+            self._existe = True
+            return sha256
+
+    def _ler_ajustes(self, anterior: str) -> Tuple[List[dict], str, Optional[str]]:
+        """(correções, hash da última, problema); nada depois de um elo quebrado é aplicado"""
+        registros = []
+        linhas = self.repositorio._consultar(
+            "SELECT sha256, registro FROM ajustes WHERE dia = ? ORDER BY seq", (self._chave,))
+        for numero, (sha256, registro) in enumerate(linhas, 1):
+            corpo = registro.encode('utf-8')
+            if sha256 != hashlib.sha256(anterior.encode('ascii') + corpo).hexdigest():
+                return registros, anterior, f"ajustes: cadeia de SHA-256 quebrada na correção {numero}"
+            registros.append(json.loads(registro))
+            anterior = sha256
+        return registros, anterior, None
+
+    def ajustes(self) -> List[dict]:
+        return self._ler_ajustes(self.cabecalho()['sha256'])[0]
+
+    def carregar(self) -> List[Venda]:
+        cabecalho, corpo = self._ler()
+        return _vendas_corrigidas(corpo, self._ler_ajustes(cabecalho['sha256'])[0])
+
+    def registrar(self, alteracoes: List[tuple]):
+        """Grava as correções e aplica-as à tabela `vendas` numa única transação"""
+        repositorio = self.repositorio
+        with repositorio._trava:
+            _, anterior, problema = self._ler_ajustes(self.cabecalho()['sha256'])
+            if problema:
+                raise ValueError(f"Registro de correções do dia {self.dia.strftime('%d/%m/%Y')} adulterado ({problema})")
+            with repositorio.conexao:
+                repositorio.conexao.executemany(
+                    "INSERT INTO ajustes (dia, sha256, registro) VALUES (?, ?, ?)",
+                    [(self._chave, sha256, corpo.decode('utf-8'))
+                     for sha256, corpo in _encadear_correcoes(anterior, alteracoes)])
+                for op, valor in alteracoes:
+                    repositorio._aplicar_na_tabela(op, valor)
+
+    def assinatura(self) -> str:
+        return self.repositorio.assinatura_dia(self.dia)
+
+    def verificar(self) -> List[str]:
+        """Confere o SHA-256, a cadeia de correções e se a tabela `vendas` bate com elas"""
+        cabecalho, corpo = self._ler()
+        problemas = []
+        if hashlib.sha256(corpo).hexdigest() != cabecalho['sha256']:
+            problemas.append("vendas congeladas: SHA-256 não confere")
+        elif corpo.count(b'\n') != cabecalho['quantidade']:
+            problemas.append("vendas congeladas: quantidade não confere")
+        registros, _, problema = self._ler_ajustes(cabecalho['sha256'])
+        if problema:
+            problemas.append(problema)
+        esperadas = sorted(_linhas_jsonl(_vendas_corrigidas(corpo, registros)).splitlines())
+        gravadas = sorted(_linhas_jsonl(self.repositorio.buscar(self.dia, self.dia)).splitlines())
+        if not problemas and esperadas != gravadas:
+            problemas.append("vendas: a tabela não é o dia congelado com as correções")
+        return problemas
+
+
+def criar_repositorio(config, pasta: str = '.', dia: Optional[date] = None) -> VendaRepository:
+    """Escolhe o backend de acordo com 'vendas.armazenamento' na configuração"""
+    backend = config.get('vendas.armazenamento', 'journal')
+    if backend == 'sqlite':
+        return SqliteVendaRepository(os.path.join(pasta, config.get('database.path', 'austral.db')), dia)
+    if backend == 'journal':
+        return JournalVendaRepository(pasta, dia, config.get('vendas.compactar_a_cada', 500))
+    if backend == 'json':
+        return JsonVendaRepository(pasta, dia)
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+
+
+def migrar_para_sqlite(pasta: str, caminho_db: str) -> Tuple[int, List[date]]:
+    """
+    Carrega no SQLite todos os dias gravados em arquivos. Pode ser repetida sem duplicar vendas.
+    Dias já fechados no banco não são regravados (as correções deles só entram pelos ajustes):
+    devolve a quantidade de vendas migradas e os dias deixados de fora.
+    """
+    repositorio = SqliteVendaRepository(caminho_db)
+    total = 0
+    fechados = []
+    try:
+        for dia in dias_com_arquivo(pasta):
+            if repositorio.fechado_do_dia(dia).existe():
+                fechados.append(dia)
+                continue
+            vendas = carregar_dia(pasta, dia)
+            repositorio.substituir_dia(dia, vendas)
+            total += len(vendas)
+    finally:
+        repositorio.fechar()
+    return total, fechados
+
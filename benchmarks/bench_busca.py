@@ -0,0 +1,98 @@
+"""
+Busca em um ano de vendas: montagem dos índices, leitura dos índices gravados
+e consultas com os índices em memória.
+
+    python benchmarks/bench_busca.py [--dias 365] [--vendas 300]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caixa import Caixa
+from vendas import Venda
+from armazenamento import arquivo_do_dia, exportar_json
+
+OBSERVACOES = ["", "", "", "PDV", "Cliente pediu nota", "Troca de numeração", "Presente"]
+
+
+def gerar_dia(dia: date, quantidade: int, aleatorio: random.Random) -> list:
+    vendas = []
+    for i in range(quantidade):
+        tipo = aleatorio.choice(["Dinheiro", "PIX", "Cartão", "Cartão", "Troca"])
+        cartao = tipo == "Cartão"
+        vendas.append(Venda(
+            vendedor=aleatorio.choice(["João", "Maria", "Pedro", "Ana"]),
+            tipo_pagamento=tipo,
+            detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]) if cartao else aleatorio.choice(OBSERVACOES),
+            bandeira=aleatorio.choice(["Visa", "Mastercard", "Elo"]) if cartao else "",
+            valor=f"{aleatorio.randint(100, 99999) / 100:.2f}",
+            numero_boleta=f"{dia.strftime('%y%m%d')}{i:04d}",
+            troca=tipo == "Troca",
+            data=f"{dia.strftime('%d/%m/%Y')} {aleatorio.randint(8, 21):02d}:{aleatorio.randint(0, 59):02d}:00"
+        ))
+    return vendas
+
+
+def medir(caixa: Caixa, **consulta) -> tuple:
+    inicio = time.perf_counter()
+    vendas = caixa.busca.buscar(**consulta)
+    return len(vendas), (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--vendas', type=int, default=300, help="vendas por dia")
+    args = parser.parse_args()
+
+    aleatorio = random.Random(42)
+    hoje = date.today()
+    consultas = {
+        'boleta': {'texto': f"{(hoje - timedelta(days=30)).strftime('%y%m%d')}0042"},
+        'observação': {'texto': "nota"},
+        'prefixo + faceta': {'texto': "cred", 'vendedor': "Ana"},
+        'valor ± 0,10': {'valor': Decimal('99.90'), 'tolerancia': Decimal('0.10')},
+    }
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for atras in range(1, args.dias + 1):
+            dia = hoje - timedelta(days=atras)
+            exportar_json(gerar_dia(dia, args.vendas, aleatorio), arquivo_do_dia(pasta, dia))
+        print(f"{args.dias} dias, {args.dias * args.vendas} vendas")
+
+        for rotulo in ("montagem dos índices", "leitura dos índices gravados"):
+            caixa = Caixa(pasta=pasta)
+            caixa.carregar()
+            quantidade, duracao = medir(caixa, texto="nota")
+            print(f"{rotulo:32s} {duracao:8.0f} ms")
+            caixa.fechar()
+
+        caixa = Caixa(pasta=pasta)
+        caixa.carregar()
+        medir(caixa)
+        for rotulo, consulta in consultas.items():
+            quantidade, duracao = min((medir(caixa, **consulta) for _ in range(5)), key=lambda item: item[1])
+            print(f"{rotulo:32s} {duracao:8.1f} ms  ({quantidade} vendas)")
+
+        # Manutenção incremental: a venda nova aparece na busca seguinte sem reindexar o ano
+        venda = gerar_dia(hoje, 1, aleatorio)[0]
+        venda.numero_boleta = "ZZ-0001"
+        inicio = time.perf_counter()
+        caixa.adicionar(venda)
+        encontrada = caixa.busca.buscar("zz 0001")
+        print(f"{'inclusão + busca':32s} {(time.perf_counter() - inicio) * 1000:8.1f} ms")
+        assert encontrada == [venda]
+        caixa.excluir([venda.id])
+        assert not caixa.busca.buscar("zz 0001")
+        caixa.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Benchmarks dos caminhos mais usados do caixa, sem display.
+
+A janela é montada com uma raiz Tk falsa: `SistemaCaixa` roda o próprio
+`__init__`, mas `_criar_interface` só cria uma caixa de texto e uma grade
+de mentira e as caixas de mensagem são substituídas. A carga do dia é a
+mesma da janela (`_ler_dia` e `_assumir_carga`), só que sem a thread; a
+gravação é a do `GravadorAssincrono`. Medimos o código Python do caixa,
+não o desenho do Tk.
+
+Resultados em JSON (menor é melhor em todas as métricas):
+
+    python benchmarks/bench_caixa.py --saida base.json
+    python benchmarks/bench_caixa.py --comparar base.json [--tolerancia 0.3]
+
+Com --comparar, sai com código 1 se alguma métrica piorar além da tolerância.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendas import Venda
+from armazenamento import arquivo_do_dia, exportar_json
+from relatorio import ProdutorEmSegundoPlano, em_blocos
+
+try:
+    import sistema_jessica
+except ImportError as e:  # customtkinter ausente: só os benchmarks sem janela rodam
+    sistema_jessica = None
+    MOTIVO_SEM_JANELA = str(e)
+
+VERSAO_FORMATO = 2
+# Vendas alteradas de uma vez na medida de salvar_vendas
+RAJADA = 100
+TAMANHOS_PADRAO = (1000, 10000, 100000)
+
+
+def vendas_sinteticas(quantidade: int, semente: int = 42) -> list:
+    aleatorio = random.Random(semente)
+    data = datetime.now().strftime("%d/%m/%Y")
+    vendas = []
+    for i in range(quantidade):
+        tipo = aleatorio.choice(["Dinheiro", "PIX", "Cartão", "Cartão", "Troca"])
+        cartao = tipo == "Cartão"
+        vendas.append(Venda(
+            vendedor=aleatorio.choice(["João", "Maria", "Pedro", "Ana"]),
+            tipo_pagamento=tipo,
+            detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]) if cartao else "PDV",
+            bandeira=aleatorio.choice(["Visa", "Mastercard", "Elo", "American Express"]) if cartao else "",
+            valor=f"{aleatorio.randint(100, 99999) / 100:.2f}",
+            numero_boleta=str(100000 + i),
+            troca=tipo == "Troca",
+            data=f"{data} {aleatorio.randint(8, 21):02d}:{aleatorio.randint(0, 59):02d}:00"
+        ))
+    return vendas
+
+
+def cronometrar(funcao, repeticoes: int = 5) -> float:
+    """Melhor tempo, em segundos, entre `repeticoes` execuções"""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def resultado(valor: float, unidade: str, **extras) -> dict:
+    return {'valor': round(valor, 3), 'unidade': unidade, **extras}
+
+
+# Raiz e widgets falsos
+
+class _RaizFalsa:
+    def title(self, *args):
+        pass
+
+    def geometry(self, *args):
+        pass
+
+    def after(self, *args):
+        pass
+
+    def protocol(self, *args):
+        pass
+
+
+class _GradeFalsa:
+    def __init__(self):
+        self.itens = []
+
+    def definir_itens(self, itens):
+        self.itens = itens
+
+    def adicionar(self, venda):
+        pass
+
+
+class _TextoFalso:
+    """Guarda as linhas como a CTkTextbox guardaria, sem desenhar nada"""
+
+    def __init__(self):
+        self.linhas = [""]
+
+    def configure(self, **kwargs):
+        pass
+
+    def _posicao(self, indice: str) -> int:
+        return int(indice.split('.')[0]) - 1
+
+    def delete(self, inicio: str, fim: str):
+        del self.linhas[self._posicao(inicio):self._posicao(fim)]
+
+    def insert(self, indice: str, texto: str):
+        if indice == 'end':
+            self.linhas[-1] += texto
+            return
+        posicao = self._posicao(indice)
+        self.linhas[posicao:posicao] = texto.split("\n")[:-1]
+
+
+if sistema_jessica is not None:
+    class SistemaSemJanela(sistema_jessica.SistemaCaixa):
+        def _criar_interface(self):
+            self.resumo_text = _TextoFalso()
+            self.grade = _GradeFalsa()
+
+        def _configurar_atalhos(self):
+            pass
+
+        def _atualizar_status_gravacao(self):
+            pass
+
+        def _iniciar_carga(self):
+            # Sem loop de eventos: a leitura da thread de carga e a conclusão rodam em sequência
+            self._carregando = True
+            resultado = {}
+            inicio = time.perf_counter()
+            self._ler_dia(resultado)
+            self._assumir_carga(resultado, inicio)
+
+        def _abrir_janela_relatorio(self, titulo, gerar_linhas, operacao, gerar_lotes=None):
+            # Mesmo caminho da janela: produtor em thread + coleta em blocos
+            texto = _TextoFalso()
+            produtor = ProdutorEmSegundoPlano(em_blocos(gerar_linhas()))
+            terminou = False
+            while not terminou:
+                blocos, terminou = produtor.coletar()
+                for bloco in blocos:
+                    texto.insert('end', bloco)
+                if not blocos and not terminou:
+                    time.sleep(0.001)
+            self.ultimo_relatorio = texto
+
+
+def abrir_caixa(pasta: str, vendas: list):
+    """Grava `vendas` como arquivo do dia e abre a janela falsa sobre ele"""
+    if vendas:
+        exportar_json(vendas, arquivo_do_dia(pasta, datetime.now().date()))
+    anterior = os.getcwd()
+    os.chdir(pasta)
+    try:
+        # A primeira carga importa o JSON legado para o snapshot; as medidas usam as seguintes
+        app = SistemaSemJanela(_RaizFalsa())
+    finally:
+        os.chdir(anterior)
+    return app
+
+
+# Benchmarks
+
+def bench_construcao(quantidade: int = 100000) -> dict:
+    dicts = [venda.to_dict() for venda in vendas_sinteticas(min(quantidade, 20000))]
+    dicts = (dicts * (quantidade // len(dicts) + 1))[:quantidade]
+    argumentos = [(d['vendedor'], d['tipo_pagamento'], d['detalhes_pagamento'], d['bandeira'], d['valor'],
+                   d['numero_boleta'], d['troca'], d['data']) for d in dicts]
+
+    construir = cronometrar(lambda: [Venda(*args) for args in argumentos])
+    from_dict = cronometrar(lambda: [Venda.from_dict(d) for d in dicts])
+    return {
+        'venda.construir': resultado(construir / quantidade * 1e6, 'us', quantidade=quantidade),
+        'venda.from_dict': resultado(from_dict / quantidade * 1e6, 'us', quantidade=quantidade),
+    }
+
+
+def bench_janela(tamanhos) -> dict:
+    resultados = {}
+    for tamanho in tamanhos:
+        vendas = vendas_sinteticas(tamanho)
+        with tempfile.TemporaryDirectory() as pasta, mock.patch.object(sistema_jessica, 'messagebox'):
+            app = abrir_caixa(pasta, vendas)
+            anterior = os.getcwd()
+            os.chdir(pasta)
+            try:
+                carregar = cronometrar(app._iniciar_carga)
+                resultados[f'carregar_vendas.{tamanho}'] = resultado(carregar * 1000, 'ms', vendas=tamanho)
+
+                # Uma rajada de edições gravada pela thread de gravação: mede até chegar ao disco
+                # (o journal é compactado a cada tantos registros, e o snapshot cresce com o dia)
+                rajada = list(app.vendas)[:RAJADA]
+
+                def salvar_rajada():
+                    for venda in rajada:
+                        app.caixa.atualizar(venda)
+                    app.caixa.aguardar_gravacao()
+
+                salvar = cronometrar(salvar_rajada)
+                resultados[f'salvar_vendas.{tamanho}'] = resultado(salvar * 1000, 'ms', vendas=len(rajada))
+                resultados[f'salvar_vendas.por_venda.{tamanho}'] = resultado(salvar / len(rajada) * 1e6, 'us')
+
+                relatorio = cronometrar(app.gerar_relatorio, repeticoes=1 if tamanho >= 100000 else 5)
+                resultados[f'gerar_relatorio.{tamanho}'] = resultado(relatorio * 1000, 'ms', vendas=tamanho)
+
+                latencias = []
+                for venda in vendas_sinteticas(500, semente=tamanho):
+                    app.caixa.vendas.adicionar(venda)
+                    app.caixa.resumo.adicionar(venda)
+                    inicio = time.perf_counter()
+                    app.atualizar_resumo()
+                    latencias.append(time.perf_counter() - inicio)
+                latencias.sort()
+                resultados[f'atualizar_resumo.p50.{tamanho}'] = resultado(latencias[len(latencias) // 2] * 1e6, 'us')
+                resultados[f'atualizar_resumo.p95.{tamanho}'] = resultado(
+                    latencias[int(len(latencias) * 0.95)] * 1e6, 'us')
+            finally:
+                app.caixa.fechar()
+                os.chdir(anterior)
+    return resultados
+
+
+def bench_registro(quantidade: int = 200) -> dict:
+    """
+    Custo de uma venda nova para a janela (a gravação vai para a fila) e até
+    todas chegarem ao disco (journal com fsync, rajadas gravadas juntas)
+    """
+    with tempfile.TemporaryDirectory() as pasta, mock.patch.object(sistema_jessica, 'messagebox'):
+        app = abrir_caixa(pasta, [])
+        anterior = os.getcwd()
+        # O repositório usa caminhos relativos: grava na pasta temporária, não na atual
+        os.chdir(pasta)
+        try:
+            vendas = vendas_sinteticas(quantidade, semente=7)
+            inicio = time.perf_counter()
+            for venda in vendas:
+                app.caixa.adicionar(venda)
+            duracao = time.perf_counter() - inicio
+            app.caixa.aguardar_gravacao()
+            gravada = time.perf_counter() - inicio
+        finally:
+            app.caixa.fechar()
+            os.chdir(anterior)
+    return {
+        'registrar_venda': resultado(duracao / quantidade * 1e6, 'us', quantidade=quantidade),
+        'registrar_venda.gravada': resultado(gravada / quantidade * 1e6, 'us', quantidade=quantidade),
+    }
+
+
+def commit_atual() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Métricas que pioraram mais que `tolerancia` (fração) em relação à base"""
+    regressoes = []
+    for nome, medida in sorted(atual['resultados'].items()):
+        anterior = base['resultados'].get(nome)
+        if anterior is None or not anterior['valor']:
+            print(f"{nome:40s} {medida['valor']:12.3f} {medida['unidade']:3s} (sem base)")
+            continue
+        variacao = medida['valor'] / anterior['valor'] - 1
+        marca = " <- REGRESSÃO" if variacao > tolerancia else ""
+        print(f"{nome:40s} {medida['valor']:12.3f} {medida['unidade']:3s} {variacao:+8.1%}{marca}")
+        if marca:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', default=",".join(map(str, TAMANHOS_PADRAO)),
+                        help="quantidades de vendas do dia, separadas por vírgula")
+    parser.add_argument('--saida', help="grava o JSON neste arquivo (padrão: saída padrão)")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    parser.add_argument('--tolerancia', type=float, default=0.3,
+                        help="piora relativa aceita antes de acusar regressão (padrão: %(default)s)")
+    args = parser.parse_args()
+    tamanhos = [int(tamanho) for tamanho in args.tamanhos.split(",")]
+
+    resultados = bench_construcao()
+    sem_janela = None
+    if sistema_jessica is not None:
+        resultados.update(bench_registro())
+        resultados.update(bench_janela(tamanhos))
+    else:
+        sem_janela = MOTIVO_SEM_JANELA
+
+    relatorio = {
+        'versao': VERSAO_FORMATO,
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'ignorados': sem_janela,
+        'resultados': resultados,
+    }
+    conteudo = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as file:
+            file.write(conteudo + "\n")
+    elif not args.comparar:
+        print(conteudo)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as file:
+            base = json.load(file)
+        print(f"base: {base.get('commit') or '?'} ({base.get('data')})  atual: {relatorio['commit'] or '?'}")
+        if base.get('versao') != VERSAO_FORMATO:
+            print(f"aviso: base no formato {base.get('versao')}, atual no {VERSAO_FORMATO}; "
+                  f"métricas de mesmo nome podem medir coisas diferentes")
+        regressoes = comparar(relatorio, base, args.tolerancia)
+        if regressoes:
+            sys.exit(f"{len(regressoes)} métrica(s) pioraram mais de {args.tolerancia:.0%}")
+
+
+if __name__ == "__main__":
+    main()
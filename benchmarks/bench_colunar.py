@@ -0,0 +1,113 @@
+"""
+Benchmark do armazenamento colunar contra a lista de `Venda`.
+
+Mede a memória (tracemalloc) das duas representações e o tempo das
+agregações por bandeira e do resumo completo, com e sem NumPy.
+
+    python benchmarks/bench_colunar.py [--quantidade 1000000]
+"""
+import os
+import sys
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import colunar
+from vendas import Venda
+from agregados import resumir
+from colunar import VendasColunares
+
+VENDEDORES = ["João", "Maria", "Pedro", "Ana"]
+BANDEIRAS = ["Visa", "Mastercard", "Elo", "American Express", "Hipercard"]
+
+
+def gerar_vendas(quantidade: int, semente: int = 42):
+    """Vendas sintéticas distribuídas por três meses"""
+    aleatorio = random.Random(semente)
+    for i in range(quantidade):
+        tipo = aleatorio.choice(["Dinheiro", "PIX", "Cartão", "Cartão", "Troca"])
+        cartao = tipo == "Cartão"
+        yield Venda(
+            vendedor=aleatorio.choice(VENDEDORES),
+            tipo_pagamento=tipo,
+            detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]) if cartao else "PDV",
+            bandeira=aleatorio.choice(BANDEIRAS) if cartao else "",
+            valor=f"{aleatorio.randint(100, 99999) / 100:.2f}",
+            numero_boleta=str(100000 + i),
+            troca=tipo == "Troca",
+            data=f"{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 3):02d}/2026 "
+                 f"{aleatorio.randint(8, 21):02d}:{aleatorio.randint(0, 59):02d}:00"
+        )
+
+
+def medir_memoria(construir):
+    gc.collect()
+    tracemalloc.start()
+    objeto = construir()
+    gc.collect()
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, memoria
+
+
+def cronometrar(funcao, repeticoes: int = 3) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def por_bandeira_lista(vendas) -> dict:
+    totais = {}
+    for venda in vendas:
+        if venda.bandeira:
+            totais[venda.bandeira] = totais.get(venda.bandeira, 0) + venda.valor
+    return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quantidade', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    vendas, memoria_lista = medir_memoria(lambda: list(gerar_vendas(args.quantidade)))
+    colunas, memoria_colunas = medir_memoria(lambda: VendasColunares(gerar_vendas(args.quantidade)))
+    # As duas representações guardam as mesmas strings de boleta e id; o ganho está no resto
+    strings = sum(sys.getsizeof(boleta) + sys.getsizeof(id_venda)
+                  for boleta, id_venda in zip(colunas.boletas, colunas.ids))
+
+    print(f"{args.quantidade} vendas")
+    print(f"memória lista de Venda:  {memoria_lista / 2**20:8.1f} MiB")
+    print(f"memória colunar:         {memoria_colunas / 2**20:8.1f} MiB "
+          f"(colunas {colunas.tamanho_em_bytes() / 2**20:.1f} MiB, boletas e ids {strings / 2**20:.1f} MiB)")
+
+    esperado = resumir(vendas)
+    assert colunas.resumir() == esperado, "resumo colunar diferente do recálculo sobre a lista"
+
+    tempos = {
+        'por bandeira, lista de Venda': cronometrar(lambda: por_bandeira_lista(vendas)),
+        'resumo completo, lista de Venda': cronometrar(lambda: resumir(vendas)),
+    }
+    numpy = colunar.np
+    for rotulo, modulo in (('NumPy', numpy), ('sem NumPy', None)):
+        if rotulo == 'NumPy' and numpy is None:
+            continue
+        colunar.np = modulo
+        tempos[f'por bandeira, colunar ({rotulo})'] = cronometrar(lambda: colunas.soma_por('bandeira'))
+        tempos[f'resumo completo, colunar ({rotulo})'] = cronometrar(lambda: colunas.resumir())
+    colunar.np = numpy
+
+    for rotulo, segundos in tempos.items():
+        print(f"{rotulo:40s} {segundos * 1000:9.1f} ms")
+    if numpy is None:
+        print("NumPy não instalado: apenas o caminho em Python puro foi medido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark da conciliação com arquivos de liquidação sintéticos.
+
+Gera N vendas em cartão e os CSVs das adquirentes correspondentes, com
+algumas anomalias conhecidas (valor trocado, venda lançada em dobro, venda
+sem liquidação e liquidação sem venda), mede leitura + conciliação e
+confere se as anomalias foram encontradas.
+
+    python benchmarks/bench_conciliacao.py [--quantidade 50000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendas import Venda
+from conciliacao import IndiceLiquidacoes, conciliar
+
+BANDEIRAS = ["Visa", "Mastercard", "Elo", "American Express", "Hipercard"]
+# Como cada adquirente escreve bandeira e modalidade
+GRAFIAS = {
+    "POS Rede": ({"Mastercard": "MASTER", "American Express": "AMEX"}, {"Débito": "Débito", "Crédito": "Crédito à vista"}),
+    "POS PagSeguro": ({"Mastercard": "MASTERCARD", "American Express": "AMERICAN EXPRESS"}, {"Débito": "DEBITO", "Crédito": "CREDITO"}),
+    "POS Getnet": ({}, {"Débito": "DEBITO", "Crédito": "CREDITO A VISTA"}),
+}
+CABECALHOS = {
+    "POS Rede": "data da venda;hora da venda;bandeira;modalidade;valor da venda;NSU",
+    "POS PagSeguro": "Data_Transacao,Hora_Transacao,Bandeira,Meio_Pagamento,Valor_Bruto,Codigo_Transacao",
+    "POS Getnet": "DATA DA VENDA\tHORA DA VENDA\tBANDEIRA\tPRODUTO\tVALOR DA VENDA\tNSU",
+}
+ESPACAMENTO = 300  # vendas entre duas anomalias (300 x 7 s, mais que a janela de 15 min)
+SEPARADORES = {"POS Rede": ";", "POS PagSeguro": ",", "POS Getnet": "\t"}
+
+
+def gerar(quantidade: int, pasta: str, semente: int = 42):
+    aleatorio = random.Random(semente)
+    inicio = datetime(2026, 1, 5, 8, 0, 0)
+    vendas = []
+    linhas = {adquirente: [] for adquirente in GRAFIAS}
+    esperado = {'valor_divergente': 0, 'duplicadas': 0, 'sem_liquidacao': 0, 'liquidacoes_sem_venda': 0}
+
+    for i in range(quantidade):
+        momento = inicio + timedelta(seconds=i * 7)
+        bandeira = aleatorio.choice(BANDEIRAS)
+        modalidade = aleatorio.choice(["Débito", "Crédito"])
+        centavos = aleatorio.randint(500, 99999)
+        venda = Venda("João", "Cartão", modalidade, bandeira, f"{centavos / 100:.2f}", str(100000 + i), False,
+                      data=momento.strftime("%d/%m/%Y %H:%M:%S"))
+        vendas.append(venda)
+
+        # Anomalias espaçadas bem além da janela, para que uma não "case" com a outra
+        anomalia = (i // ESPACAMENTO) % 4 if i % ESPACAMENTO == ESPACAMENTO - 1 else None
+        if anomalia == 0:
+            esperado['sem_liquidacao'] += 1
+            continue
+        if anomalia == 1:
+            # Lançada duas vezes no caixa, uma vez só na adquirente
+            vendas.append(Venda(venda.vendedor, "Cartão", modalidade, bandeira, venda.valor, str(900000 + i), False,
+                                data=venda.data))
+            esperado['duplicadas'] += 1
+        elif anomalia == 2:
+            centavos += aleatorio.choice([-100, 100, 1000])
+            esperado['valor_divergente'] += 1
+        elif anomalia == 3:
+            esperado['liquidacoes_sem_venda'] += 1
+            _linha(linhas, aleatorio, momento + timedelta(seconds=3), bandeira, modalidade, centavos + 7, i + quantidade)
+
+        # A adquirente registra a transação alguns segundos ou minutos depois
+        atraso = timedelta(seconds=aleatorio.randint(0, 240))
+        _linha(linhas, aleatorio, momento + atraso, bandeira, modalidade, centavos, i)
+
+    arquivos = []
+    for adquirente, conteudo in linhas.items():
+        caminho = os.path.join(pasta, f"{adquirente.replace(' ', '_')}.csv")
+        with open(caminho, 'w', encoding='utf-8') as file:
+            file.write(CABECALHOS[adquirente] + "\n")
+            file.write("\n".join(conteudo) + "\n")
+        arquivos.append((adquirente, caminho))
+    return vendas, arquivos, esperado
+
+
+def _linha(linhas: dict, aleatorio: random.Random, momento: datetime, bandeira: str, modalidade: str,
+           centavos: int, nsu: int):
+    adquirente = aleatorio.choice(list(GRAFIAS))
+    bandeiras, modalidades = GRAFIAS[adquirente]
+    valor = f"{centavos / 100:.2f}"
+    if adquirente == "POS Rede":
+        data, valor = momento.strftime("%d/%m/%Y"), f"R$ {valor.replace('.', ',')}"
+    else:
+        data = momento.strftime("%Y-%m-%d") if adquirente == "POS PagSeguro" else momento.strftime("%d/%m/%Y")
+    campos = [data, momento.strftime("%H:%M:%S"), bandeiras.get(bandeira, bandeira.upper()),
+              modalidades[modalidade], valor, str(nsu)]
+    linhas[adquirente].append(SEPARADORES[adquirente].join(campos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quantidade', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        vendas, arquivos, esperado = gerar(args.quantidade, pasta)
+        linhas = sum(sum(1 for _ in open(caminho, encoding='utf-8')) - 1 for _, caminho in arquivos)
+
+        inicio = time.perf_counter()
+        indice = IndiceLiquidacoes()
+        for adquirente, caminho in arquivos:
+            indice.carregar(caminho, adquirente)
+        carregado = time.perf_counter()
+        resultado = conciliar(vendas, indice)
+        fim = time.perf_counter()
+
+    print(f"{len(vendas)} vendas, {linhas} linhas de liquidação em {len(arquivos)} arquivos")
+    print(f"leitura e indexação: {(carregado - inicio) * 1000:.0f} ms")
+    print(f"conciliação:         {(fim - carregado) * 1000:.0f} ms")
+    print(f"total:               {(fim - inicio) * 1000:.0f} ms")
+
+    erros = sum(len(linhas) for linhas in indice.erros.values())
+    encontrado = {campo: len(getattr(resultado, campo)) for campo in esperado}
+    print(f"conciliadas: {len(resultado.conciliadas)}  linhas com erro: {erros}")
+    for campo, quantidade in esperado.items():
+        print(f"{campo}: esperado {quantidade}, encontrado {encontrado[campo]}")
+    if encontrado != esperado or erros:
+        sys.exit("Resultado da conciliação diferente do esperado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Exportação de um período para CSV, XLSX e PDF: tempo, tamanho do arquivo e
+pico de memória (tracemalloc), que deve ficar perto do de um dia de vendas.
+
+    python benchmarks/bench_exportacao.py [--dias 365] [--vendas 300]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from caixa import Caixa
+from armazenamento import arquivo_do_dia, exportar_json
+from exportacao import FORMATOS, exportar, lotes_do_periodo
+from bench_busca import gerar_dia
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dias', type=int, default=365)
+    parser.add_argument('--vendas', type=int, default=300, help="vendas por dia")
+    args = parser.parse_args()
+
+    aleatorio = random.Random(42)
+    hoje = date.today()
+    inicio = hoje - timedelta(days=args.dias)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for atras in range(1, args.dias + 1):
+            dia = hoje - timedelta(days=atras)
+            exportar_json(gerar_dia(dia, args.vendas, aleatorio), arquivo_do_dia(pasta, dia))
+        print(f"{args.dias} dias, {args.dias * args.vendas} vendas")
+
+        caixa = Caixa(pasta=pasta)
+        caixa.carregar()
+        lotes, _ = lotes_do_periodo(caixa.repositorio, inicio, hoje, caixa.vendas)
+        tempo = time.perf_counter()
+        for _ in lotes:
+            pass
+        print(f"{'só leitura':12s} {time.perf_counter() - tempo:8.2f} s")
+
+        for formato in FORMATOS:
+            caminho = os.path.join(pasta, f"relatorio{formato}")
+            lotes, total = lotes_do_periodo(caixa.repositorio, inicio, hoje, caixa.vendas)
+            tracemalloc.start()
+            tempo = time.perf_counter()
+            exportar(caminho, lotes, total, "Benchmark")
+            duracao = time.perf_counter() - tempo
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{formato:12s} {duracao:8.2f} s {os.path.getsize(caminho) / 1e6:8.1f} MB "
+                  f"pico {pico / 1e6:6.1f} MB")
+        caixa.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark da grade virtualizada com 100 mil vendas sintéticas.
+
+Mede o tempo até a primeira pintura e a latência de rolagem, e compara com
+a Treeview tradicional (um item Tk por venda). Precisa de um display.
+
+    python benchmarks/bench_grade.py [--quantidade 100000] [--sem-treeview]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vendas import Venda
+from grade import GradeVirtual
+
+COLUNAS = [
+    ("Vendedor", 100), ("Tipo", 100), ("Detalhes", 150),
+    ("Bandeira", 100), ("Valor", 100), ("Boleta", 100),
+    ("Troca", 60), ("Data", 150)
+]
+
+
+def vendas_sinteticas(quantidade: int, semente: int = 42):
+    aleatorio = random.Random(semente)
+    vendedores = ["João", "Maria", "Pedro", "Ana"]
+    bandeiras = ["Visa", "Mastercard", "Elo", "American Express", "Hipercard"]
+    vendas = []
+    for i in range(quantidade):
+        tipo = aleatorio.choice(["Dinheiro", "PIX", "Cartão", "Cartão", "Troca"])
+        cartao = tipo == "Cartão"
+        vendas.append(Venda(
+            vendedor=aleatorio.choice(vendedores),
+            tipo_pagamento=tipo,
+            detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]) if cartao else "PDV",
+            bandeira=aleatorio.choice(bandeiras) if cartao else "",
+            valor=f"{aleatorio.randint(100, 99999) / 100:.2f}",
+            numero_boleta=str(100000 + i),
+            troca=tipo == "Troca",
+            data=f"{aleatorio.randint(1, 28):02d}/01/2026 {aleatorio.randint(8, 21):02d}:{aleatorio.randint(0, 59):02d}:00"
+        ))
+    return vendas
+
+
+def formatar(venda: Venda) -> tuple:
+    return (venda.vendedor, venda.tipo_pagamento, venda.detalhes_pagamento, venda.bandeira,
+            f"R$ {venda.valor:.2f}", venda.numero_boleta, "Sim" if venda.troca else "Não", venda.data)
+
+
+def medir_rolagem(root, rolar, passos: int = 200) -> list:
+    aleatorio = random.Random(7)
+    tempos = []
+    for _ in range(passos):
+        inicio = time.perf_counter()
+        rolar(aleatorio.random())
+        root.update_idletasks()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def resumo_tempos(nome: str, primeira_pintura: float, rolagem: list):
+    rolagem.sort()
+    print(f"{nome}:")
+    print(f"  primeira pintura: {primeira_pintura:.1f} ms")
+    print(f"  rolagem: mediana {statistics.median(rolagem):.2f} ms, "
+          f"p95 {rolagem[int(len(rolagem) * 0.95)]:.2f} ms, máx {rolagem[-1]:.2f} ms")
+
+
+def bench_grade_virtual(root, vendas):
+    frame = ttk.Frame(root)
+    frame.pack(fill=tk.BOTH, expand=True)
+    inicio = time.perf_counter()
+    grade = GradeVirtual(frame, COLUNAS, formatar, {"Valor": lambda v: v.valor})
+    grade.pack(fill=tk.BOTH, expand=True)
+    grade.definir_itens(vendas)
+    root.update()
+    primeira_pintura = (time.perf_counter() - inicio) * 1000
+
+    rolagem = medir_rolagem(root, lambda fracao: grade._rolar('moveto', fracao))
+    resumo_tempos("Grade virtual", primeira_pintura, rolagem)
+
+    inicio = time.perf_counter()
+    grade.ordenar("Valor")
+    root.update_idletasks()
+    print(f"  ordenar por valor: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    inicio = time.perf_counter()
+    grade.filtrar(lambda venda: venda.vendedor == "Ana")
+    root.update_idletasks()
+    print(f"  filtrar por vendedor: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    frame.destroy()
+
+
+def bench_treeview(root, vendas):
+    frame = ttk.Frame(root)
+    frame.pack(fill=tk.BOTH, expand=True)
+    inicio = time.perf_counter()
+    tree = ttk.Treeview(frame, columns=[coluna for coluna, _ in COLUNAS], show='headings')
+    tree.pack(fill=tk.BOTH, expand=True)
+    for venda in vendas:
+        tree.insert('', tk.END, values=formatar(venda))
+    root.update()
+    primeira_pintura = (time.perf_counter() - inicio) * 1000
+
+    rolagem = medir_rolagem(root, lambda fracao: tree.yview_moveto(fracao))
+    resumo_tempos("Treeview tradicional", primeira_pintura, rolagem)
+    frame.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quantidade', type=int, default=100_000)
+    parser.add_argument('--sem-treeview', action='store_true', help="Não mede a Treeview tradicional")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    vendas = vendas_sinteticas(args.quantidade)
+    print(f"{args.quantidade} vendas geradas em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    root = tk.Tk()
+    root.geometry("900x600")
+    bench_grade_virtual(root, vendas)
+    if not args.sem_treeview:
+        bench_treeview(root, vendas)
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Teste de carga do servidor de sincronização: 20 caixas enviando ao mesmo tempo.
+
+Cada caixa registra parte das vendas com o servidor fora do ar (ficam no
+arquivo de pendências), depois o servidor sobe e todos os caixas vendem e
+enviam em paralelo, incluindo reenvio de lotes já confirmados. No fim,
+confere que o servidor tem exatamente as vendas de todos os caixas e que
+todos enxergam o mesmo resumo e o mesmo histórico.
+
+    python benchmarks/bench_sincronizacao.py [--caixas 20] [--vendas 250]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from caixa import Caixa, ConfigManager
+from vendas import Venda
+from agregados import resumir
+from sincronizacao import ClienteSincronizacao, ServidorSincronizacao, separar_endereco
+
+DIA = date.today()
+ENVIAR_A_CADA = 25
+
+
+def iniciar_servidor(pasta: str):
+    """Servidor em uma thread com seu próprio loop; devolve (endereço, parar)"""
+    servidor = ServidorSincronizacao(pasta)
+    loop = asyncio.new_event_loop()
+    pronto = threading.Event()
+    endereco = []
+
+    def executar():
+        asyncio.set_event_loop(loop)
+        endereco.extend(loop.run_until_complete(servidor.iniciar('127.0.0.1', 0)))
+        pronto.set()
+        loop.run_forever()
+
+    threading.Thread(target=executar, daemon=True).start()
+    pronto.wait()
+
+    def parar():
+        asyncio.run_coroutine_threadsafe(servidor.encerrar(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return f"{endereco[0]}:{endereco[1]}", parar
+
+
+def nova_venda(aleatorio: random.Random, terminal: int, numero: int) -> Venda:
+    return Venda(
+        vendedor=aleatorio.choice(["João", "Maria", "Pedro", "Ana"]),
+        tipo_pagamento="Cartão",
+        detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]),
+        bandeira=aleatorio.choice(["Visa", "Mastercard", "Elo"]),
+        valor=f"{aleatorio.randint(100, 99999) / 100:.2f}",
+        numero_boleta=f"{terminal:02d}-{numero:05d}",
+        troca=False
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--caixas', type=int, default=20)
+    parser.add_argument('--vendas', type=int, default=250, help="vendas por caixa")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as raiz:
+        pasta_servidor = os.path.join(raiz, 'loja')
+        os.mkdir(pasta_servidor)
+        config = ConfigManager()
+        caixas = []
+        for terminal in range(args.caixas):
+            pasta = os.path.join(raiz, f'caixa{terminal:02d}')
+            os.mkdir(pasta)
+            # Endereço provisório: nada escuta nessa porta, o caixa está "offline"
+            cliente = ClienteSincronizacao('127.0.0.1:9', f'caixa{terminal:02d}', pasta, timeout=2)
+            caixa = Caixa(config, pasta, DIA, sincronizacao=cliente)
+            caixa.carregar()
+            caixas.append(caixa)
+
+        offline = args.vendas // 5
+        for terminal, caixa in enumerate(caixas):
+            aleatorio = random.Random(terminal)
+            for numero in range(offline):
+                caixa.adicionar(nova_venda(aleatorio, terminal, numero))
+            caixa.sincronizacao.sincronizar(DIA)
+            assert not caixa.sincronizacao.online
+
+        endereco, parar = iniciar_servidor(pasta_servidor)
+        latencias = []
+        trava = threading.Lock()
+
+        def operar(terminal: int, caixa: Caixa):
+            cliente = caixa.sincronizacao
+            cliente.endereco = separar_endereco(endereco)
+            aleatorio = random.Random(1000 + terminal)
+            for numero in range(offline, args.vendas):
+                venda = nova_venda(aleatorio, terminal, numero)
+                caixa.adicionar(venda)
+                if numero % 10 == 0:
+                    caixa.atualizar(Venda(**{**venda.to_dict(), 'valor': venda.valor + 1}))
+                if numero % ENVIAR_A_CADA == 0:
+                    if numero % (ENVIAR_A_CADA * 4) == 0:
+                        # Resposta "perdida": a mesma inclusão é enviada de novo
+                        cliente.registrar(DIA, [{'op': 'add', 'venda': venda.to_dict()}])
+                    inicio = time.perf_counter()
+                    cliente.enviar_pendentes()
+                    with trava:
+                        latencias.append(time.perf_counter() - inicio)
+            cliente.enviar_pendentes()
+
+        inicio = time.perf_counter()
+        threads = [threading.Thread(target=operar, args=item) for item in enumerate(caixas)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        todas = [venda for caixa in caixas for venda in caixa.vendas]
+        esperado = resumir(todas)
+        resumos = [caixa.sincronizacao.resumo(DIA) for caixa in caixas]
+        historicos = [caixa.sincronizacao.alteracoes(DIA)[1] for caixa in caixas]
+        parar()
+        for caixa in caixas:
+            caixa.fechar()
+
+        # O servidor grava na própria pasta: reabrir o dia confirma a persistência
+        reaberto = Caixa(config, pasta_servidor, DIA)
+        reaberto.carregar()
+        persistido = resumir(reaberto.vendas)
+        reaberto.fechar()
+
+    print(f"{args.caixas} caixas, {args.vendas} vendas cada ({offline} registradas offline)")
+    print(f"tempo total: {duracao:.2f} s, {len(todas) / duracao:.0f} vendas/s")
+    print(f"envios: {len(latencias)}, latência p50 {statistics.median(latencias) * 1000:.1f} ms, "
+          f"p95 {statistics.quantiles(latencias, n=20)[18] * 1000:.1f} ms")
+    print(f"vendas no servidor: {persistido['quantidade']} (esperado {len(todas)})")
+
+    assert all(resumo == esperado for resumo in resumos), "caixas com resumos diferentes"
+    assert persistido == esperado, "vendas persistidas diferentes das registradas"
+    assert all(historico == historicos[0] for historico in historicos), "históricos diferentes"
+    print("todos os caixas veem o mesmo resumo e o mesmo histórico")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Busca textual e por valor em todas as vendas gravadas.
+
+Cada dia tem um `IndiceDia`: índice invertido dos termos de `numero_boleta`,
+`detalhes_pagamento`, `vendedor` e `bandeira` (sem acentos, em minúsculas;
+um termo da consulta casa com qualquer termo que comece por ele) e uma
+lista ordenada de (valor em centavos, id) para faixas como "99,90 ± 0,10".
+
+`IndiceBusca` guarda os índices dos dias fechados em `busca_AAAAMMDD.json`,
+com a assinatura do dia no repositório (como os resumos diários): um dia
+só é reindexado se suas vendas mudaram. O dia aberto no caixa é indexado
+na primeira consulta e depois acompanha cada inclusão, alteração e exclusão.
+"""
+import os
+import re
+import json
+import bisect
+import threading
+import unicodedata
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from vendas import Venda
+from armazenamento import VendaRepository, gravar_atomico
+
+VERSAO_BUSCA = 1
+CAMPOS_TEXTO = ('numero_boleta', 'detalhes_pagamento', 'vendedor', 'bandeira')
+CAMPOS_FACETA = ('vendedor', 'tipo_pagamento', 'bandeira')
+PALAVRA = re.compile(r'\w+')
+# Período das buscas sem datas (o SQLite soma um dia ao fim, então date.max não serve)
+SEM_LIMITE = (date.min, date.max - timedelta(days=1))
+
+
+@lru_cache(maxsize=4096)
+def termos_do_texto(texto: str) -> Tuple[str, ...]:
+    """'Cartão Crédito' -> ('cartao', 'credito')"""
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return tuple(PALAVRA.findall(sem_acentos))
+
+
+def termos_da_venda(venda: Venda) -> Set[str]:
+    termos = set()
+    for campo in CAMPOS_TEXTO:
+        termos.update(termos_do_texto(getattr(venda, campo)))
+    return termos
+
+
+def centavos(valor: Decimal) -> int:
+    return int(valor.scaleb(2))
+
+
+def interpretar_valor(texto: str) -> Tuple[Optional[Decimal], Decimal]:
+    """'99,90 ± 0,10' (ou '+-', '+/-') -> (valor, tolerância); vazio -> (None, 0)"""
+    texto = (texto or "").strip()
+    if not texto:
+        return None, Decimal('0.00')
+    partes = re.split(r'±|\+/?-', texto)
+    try:
+        numeros = [Decimal(parte.strip().replace(',', '.')) for parte in partes]
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto!r}. Use, por exemplo, 99,90 ou 99,90 ± 0,10.") from None
+    if len(numeros) > 2 or any(not numero.is_finite() or numero < 0 for numero in numeros):
+        raise ValueError(f"Valor inválido: {texto!r}. Use, por exemplo, 99,90 ou 99,90 ± 0,10.")
+    return numeros[0], (numeros[1] if len(numeros) == 2 else Decimal('0.00'))
+
+
+class IndiceDia:
+    """Índice invertido e de valores das vendas de um dia"""
+
+    def __init__(self, vendas: Iterable[Venda] = (), assinatura: str = ""):
+        self.assinatura = assinatura
+        self.vendas: Dict[str, Venda] = {}
+        self.termos: Dict[str, Set[str]] = {}
+        self.valores: List[Tuple[int, str]] = []
+        self._ordenados: Optional[List[str]] = None
+        for venda in vendas:
+            self.adicionar(venda)
+
+    def adicionar(self, venda: Venda):
+        """Inclui ou substitui (mesmo id) uma venda"""
+        if venda.id in self.vendas:
+            self.remover(venda.id)
+        self.vendas[venda.id] = venda
+        for termo in termos_da_venda(venda):
+            ids = self.termos.get(termo)
+            if ids is None:
+                ids = self.termos[termo] = set()
+                self._ordenados = None
+            ids.add(venda.id)
+        bisect.insort(self.valores, (centavos(venda.valor), venda.id))
+
+    def remover(self, id_venda: str):
+        """Retira a venda; ids desconhecidos são ignorados"""
+        venda = self.vendas.pop(id_venda, None)
+        if venda is None:
+            return
+        for termo in termos_da_venda(venda):
+            ids = self.termos[termo]
+            ids.discard(id_venda)
+            if not ids:
+                del self.termos[termo]
+                self._ordenados = None
+        posicao = bisect.bisect_left(self.valores, (centavos(venda.valor), id_venda))
+        del self.valores[posicao]
+
+    def _com_prefixo(self, prefixo: str) -> Set[str]:
+        if self._ordenados is None:
+            self._ordenados = sorted(self.termos)
+        ids = set()
+        posicao = bisect.bisect_left(self._ordenados, prefixo)
+        while posicao < len(self._ordenados) and self._ordenados[posicao].startswith(prefixo):
+            ids |= self.termos[self._ordenados[posicao]]
+            posicao += 1
+        return ids
+
+    def buscar(self, termos: Tuple[str, ...], faixa: Optional[Tuple[int, int]], facetas: Dict[str, str]) -> List[Venda]:
+        """Vendas com todos os `termos` (como prefixo), valor em `faixa` (centavos, inclusiva) e as facetas"""
+        candidatos: Optional[Set[str]] = None
+        for termo in termos:
+            ids = self._com_prefixo(termo)
+            candidatos = ids if candidatos is None else candidatos & ids
+            if not candidatos:
+                return []
+        if faixa is not None:
+            inicio = bisect.bisect_left(self.valores, (faixa[0], ""))
+            fim = bisect.bisect_left(self.valores, (faixa[1] + 1, ""))
+            ids = {id_venda for _, id_venda in self.valores[inicio:fim]}
+            candidatos = ids if candidatos is None else candidatos & ids
+
+        vendas = self.vendas.values() if candidatos is None else (self.vendas[i] for i in candidatos)
+        encontradas = [venda for venda in vendas
+                       if all(getattr(venda, campo) == valor for campo, valor in facetas.items())]
+        encontradas.sort(key=lambda venda: venda.data[11:])
+        return encontradas
+
+    def serializar(self, dia: date) -> dict:
+        ids = list(self.vendas)
+        posicoes = {id_venda: posicao for posicao, id_venda in enumerate(ids)}
+        return {
+            'versao': VERSAO_BUSCA,
+            'dia': dia.isoformat(),
+            'assinatura': self.assinatura,
+            'vendas': [self.vendas[id_venda].to_dict() for id_venda in ids],
+            'termos': {termo: sorted(posicoes[i] for i in conjunto) for termo, conjunto in self.termos.items()},
+            'valores': [[valor, posicoes[id_venda]] for valor, id_venda in self.valores]
+        }
+
+    @classmethod
+    def desserializar(cls, dados: dict) -> 'IndiceDia':
+        indice = cls(assinatura=dados['assinatura'])
+        vendas = [Venda.from_dict(venda_dict) for venda_dict in dados['vendas']]
+        indice.vendas = {venda.id: venda for venda in vendas}
+        indice.termos = {termo: {vendas[p].id for p in posicoes} for termo, posicoes in dados['termos'].items()}
+        indice.valores = [(valor, vendas[posicao].id) for valor, posicao in dados['valores']]
+        return indice
+
+
+class IndiceBusca:
+    """
+    Índices de todos os dias do repositório. Pode ser consultado de uma
+    thread enquanto o caixa registra vendas em outra: `_trava` protege só o
+    dia aberto (o caixa a toma a cada venda) e `_trava_dias` o cache dos dias
+    fechados, montados sem segurar o caixa.
+    """
+
+    def __init__(self, repositorio: VendaRepository, pasta: str = '.'):
+        self.repositorio = repositorio
+        self.pasta = pasta
+        self._dias: Dict[date, IndiceDia] = {}
+        self._trava = threading.RLock()
+        self._trava_dias = threading.Lock()
+        self._vendas_abertas: Iterable[Venda] = ()
+        self._aberto: Optional[IndiceDia] = None
+
+    def arquivo_busca(self, dia: date) -> str:
+        return os.path.join(self.pasta, f"busca_{dia.strftime('%Y%m%d')}.json")
+
+    # Dia aberto no caixa
+
+    def abrir_dia(self, vendas: Iterable[Venda]):
+        """Associa as vendas do dia aberto; o índice delas é montado na primeira consulta"""
+        with self._trava:
+            self._vendas_abertas = vendas
+            self._aberto = None
+
+    def _indice_aberto(self) -> IndiceDia:
+        if self._aberto is None:
+            # As alterações feitas durante a cópia chegam depois por adicionar/remover,
+            # que aceitam repetir uma venda já indexada ou remover uma ausente
+            self._aberto = IndiceDia(list(self._vendas_abertas))
+        return self._aberto
+
+    def adicionar(self, vendas: Iterable[Venda]):
+        with self._trava:
+            if self._aberto is not None:
+                for venda in vendas:
+                    self._aberto.adicionar(venda)
+
+    def remover(self, ids: Iterable[str]):
+        with self._trava:
+            if self._aberto is not None:
+                for id_venda in ids:
+                    self._aberto.remover(id_venda)
+
+    def fechar(self):
+        """Grava o índice do dia aberto, se foi montado, para a próxima consulta não refazê-lo"""
+        with self._trava:
+            if self._aberto is not None:
+                self._aberto.assinatura = self.repositorio.assinatura_dia(self.repositorio.dia)
+                self._gravar(self.repositorio.dia, self._aberto)
+
+    # Dias fechados
+
+    def _gravar(self, dia: date, indice: IndiceDia):
+        conteudo = json.dumps(indice.serializar(dia), ensure_ascii=False, separators=(',', ':'))
+        gravar_atomico(self.arquivo_busca(dia), conteudo.encode('utf-8'))
+
+    def _ler(self, dia: date, assinatura: str) -> Optional[IndiceDia]:
+        try:
+            with open(self.arquivo_busca(dia), 'r', encoding='utf-8') as file:
+                dados = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if dados.get('versao') != VERSAO_BUSCA or dados.get('assinatura') != assinatura:
+            return None
+        return IndiceDia.desserializar(dados)
+
+    def indice_dia(self, dia: date) -> IndiceDia:
+        """
+        Índice de um dia fechado, relido ou refeito somente se as vendas
+        mudaram desde a última vez. Não é alterado depois de pronto, então
+        pode ser consultado fora das travas.
+        """
+        with self._trava_dias:
+            assinatura = self.repositorio.assinatura_dia(dia)
+            indice = self._dias.get(dia)
+            if indice is None or indice.assinatura != assinatura:
+                indice = self._ler(dia, assinatura)
+                if indice is None:
+                    indice = IndiceDia(self.repositorio.buscar(dia, dia), assinatura)
+                    self._gravar(dia, indice)
+                self._dias[dia] = indice
+            return indice
+
+    def buscar(self, texto: str = "", valor: Optional[Decimal] = None, tolerancia: Decimal = Decimal('0.00'),
+               inicio: Optional[date] = None, fim: Optional[date] = None, **facetas) -> List[Venda]:
+        """
+        Vendas que contêm todos os termos de `texto` e, com `valor`, custam
+        valor ± tolerancia. Facetas filtram por igualdade (vendedor,
+        tipo_pagamento, bandeira). Sem período, busca em todos os dias.
+        """
+        termos = termos_do_texto(texto)
+        faixa = None
+        if valor is not None:
+            faixa = (centavos(valor - tolerancia), centavos(valor + tolerancia))
+        facetas = {campo: valor for campo, valor in facetas.items() if valor}
+        inicio, fim = inicio or SEM_LIMITE[0], fim or SEM_LIMITE[1]
+
+        aberto = self.repositorio.dia
+        dias = set(self.repositorio.dias(inicio, fim))
+        if inicio <= aberto <= fim:
+            dias.add(aberto)
+        encontradas = []
+        for dia in sorted(dias):
+            if dia == aberto:
+                # O índice do dia aberto muda a cada venda: consultado com a trava do caixa
+                with self._trava:
+                    encontradas.extend(self._indice_aberto().buscar(termos, faixa, facetas))
+            else:
+                # Montar o histórico pode levar segundos; o caixa segue registrando enquanto isso
+                encontradas.extend(self.indice_dia(dia).buscar(termos, faixa, facetas))
+        return encontradas
+
+
+def contar_facetas(vendas: Iterable[Venda]) -> Dict[str, Dict[str, int]]:
+    """Quantidade de resultados por vendedor, tipo de pagamento e bandeira"""
+    contagens = {campo: {} for campo in CAMPOS_FACETA}
+    for venda in vendas:
+        for campo in CAMPOS_FACETA:
+            chave = getattr(venda, campo)
+            if chave:
+                contagens[campo][chave] = contagens[campo].get(chave, 0) + 1
+    return contagens
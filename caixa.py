@@ -0,0 +1,320 @@
+"""
+Regras do caixa sem interface gráfica: validação das vendas, interpretação
+do pagamento escolhido, totais e persistência. Usado pela janela
+(sistema_jessica.py) e pela linha de comando (caixa_cli.py); não pode
+importar tkinter/customtkinter.
+"""
+import os
+import platform
+import sqlite3
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+
+from vendas import ColecaoVendas, Venda
+from agregados import ResumoIncremental
+from armazenamento import (FORMATO_DATA, VendaRepository, arquivo_recuperacao, criar_repositorio,
+                          gravar_recuperacao, importar_json)
+from resumo_diario import ResumosDiarios
+from busca import IndiceBusca
+from catalogo import METODOS_PADRAO, CatalogoPagamentos, carregar_catalogo
+from gravacao import TEMPO_ENCERRAR_S, GravadorAssincrono, aplicar_alteracoes
+from fechamento import (Conferencia, Fechamento, conferir, esperado_por_conta, gravar_fechamento,
+                        ler_fechamento)
+
+VENDEDORES = ["João", "Maria", "Pedro", "Ana"]
+CATALOGO_PADRAO = CatalogoPagamentos(METODOS_PADRAO)
+# Rótulos do catálogo padrão; a janela usa os do catálogo carregado pelo caixa
+PAGAMENTOS_COMPLETOS = CATALOGO_PADRAO.rotulos
+OBSERVACOES_OPCOES = [
+    "PDV", "POS Rede", "POS PagSeguro",
+    "POS Getnet", "Link Rede", "Outro"
+]
+
+
+class ConfigManager:
+    def __init__(self):
+        self.config = {
+            'database.path': 'austral.db',
+            # 'journal' grava cada venda de forma incremental; 'json' regrava o arquivo do dia;
+            # 'sqlite' usa o banco em 'database.path'
+            'vendas.armazenamento': 'journal',
+            'vendas.compactar_a_cada': 500,
+            # Dias mais antigos que isso vão para os arquivos mensais comprimidos; None desliga
+            'vendas.arquivar_apos_dias': 7,
+            # 'host:porta' do servidor de sincronização da loja; None desliga
+            'sincronizacao.servidor': None,
+            'sincronizacao.terminal': platform.node() or 'caixa',
+            # Operações acima do limiar vão para o log rotativo de lentidão
+            'instrumentacao.log_lento': 'operacoes_lentas.log',
+            'instrumentacao.limiar_ms': 200,
+            # Formas de pagamento (veja catalogo.py); o arquivo, se existir na pasta, substitui a lista
+            'pagamentos.catalogo': METODOS_PADRAO,
+            'pagamentos.arquivo': 'pagamentos.json'
+        }
+    def get(self, key, default=None):
+        return self.config.get(key, default)
+
+
+class ErroPersistencia(Exception):
+    """A venda foi aplicada em memória, mas não pôde ser gravada"""
+
+
+def _publicavel(alteracao: tuple) -> dict:
+    op, valor = alteracao
+    return {'op': op, 'id': valor} if op == 'del' else {'op': op, 'venda': valor.to_dict()}
+
+
+def processar_pagamento(pagamento_escolhido: str, catalogo: Optional[CatalogoPagamentos] = None) -> tuple:
+    """Converte o rótulo escolhido em (tipo_pagamento, bandeira, detalhes_pagamento, troca)"""
+    metodo = (catalogo or CATALOGO_PADRAO).por_rotulo(pagamento_escolhido)
+    if metodo is not None:
+        return metodo.tipo_pagamento, metodo.bandeira, metodo.detalhes_pagamento, metodo.troca
+    # Rótulos fora do catálogo (arquivos importados) seguem a regra antiga
+    if pagamento_escolhido == "Dinheiro":
+        return "Dinheiro", "", "", False
+    elif pagamento_escolhido == "PIX":
+        return "PIX", "", "", False
+    elif pagamento_escolhido == "Troca":
+        return "Troca", "", "", True
+    else:
+        partes = pagamento_escolhido.split(" - ")
+        if len(partes) == 2:
+            return "Cartão", partes[0], partes[1], False
+        else:
+            return pagamento_escolhido, "", "", False
+
+
+def rotulo_pagamento(venda: Venda, catalogo: Optional[CatalogoPagamentos] = None) -> str:
+    """Operação inversa de `processar_pagamento`"""
+    if catalogo is not None and venda.metodo is not None:
+        return catalogo[venda.metodo].rotulo
+    if venda.tipo_pagamento == "Cartão":
+        return f"{venda.bandeira} - {venda.detalhes_pagamento}"
+    return venda.tipo_pagamento
+
+
+def converter_valor(texto: str, pagamento_escolhido: str) -> Decimal:
+    try:
+        valor = Decimal(str(texto).strip().replace(',', '.'))
+        # Permitir valor zero para "Troca"
+        if pagamento_escolhido != "Troca" and not valor > 0:
+            raise ValueError
+        return valor
+    except (InvalidOperation, ValueError):
+        if pagamento_escolhido == "Troca":
+            # Para "Troca", se houver erro na conversão, assumimos valor zero
+            return Decimal('0.00')
+        raise ValueError("Valor inválido. Digite um número válido maior que zero.")
+
+
+def validar_dados_venda(vendedor: str, pagamento_escolhido: str, valor: str,
+                       numero_boleta: str, observacao: str = "",
+                       catalogo: Optional[CatalogoPagamentos] = None) -> dict:
+    """Valida os campos de uma venda e devolve os argumentos para `Venda`"""
+    if not vendedor or not pagamento_escolhido:
+        raise ValueError("Selecione o vendedor e o tipo de pagamento.")
+
+    valor = converter_valor(valor, pagamento_escolhido)
+    tipo_pagamento, bandeira, detalhes_pagamento, troca = processar_pagamento(pagamento_escolhido, catalogo)
+
+    numero_boleta = (numero_boleta or "").strip()
+    if not numero_boleta:
+        raise ValueError("Número da Boleta/Recibo é obrigatório.")
+
+    return {
+        'vendedor': vendedor,
+        'tipo_pagamento': tipo_pagamento,
+        'detalhes_pagamento': detalhes_pagamento or observacao,
+        'bandeira': bandeira,
+        'valor': valor,
+        'numero_boleta': numero_boleta,
+        'troca': troca
+    }
+
+
+class Caixa:
+    """
+    Vendas de um dia com seus totais incrementais e o backend de armazenamento.
+
+    Com `sincronizacao` (um `sincronizacao.ClienteSincronizacao`), cada
+    alteração gravada também é registrada para envio ao servidor da loja.
+
+    Com `gravacao_assincrona`, as alterações são gravadas por um
+    `gravacao.GravadorAssincrono`: os métodos voltam assim que a memória
+    foi atualizada e as falhas aparecem em `gravador.erro`, não como
+    `ErroPersistencia`. `aguardar_gravacao` e `fechar` esperam o disco.
+
+    Depois de `fechar_dia`, o dia fica congelado e as alterações seguintes
+    são gravadas como correções auditadas (veja fechamento.py).
+    """
+
+    def __init__(self, config=None, pasta: str = '.', dia: Optional[date] = None, sincronizacao=None,
+                 gravacao_assincrona: bool = False):
+        self.config = config or ConfigManager()
+        self.pasta = pasta
+        self.repositorio: VendaRepository = criar_repositorio(self.config, pasta, dia)
+        self.resumos_diarios = ResumosDiarios(self.repositorio, pasta)
+        self.busca = IndiceBusca(self.repositorio, pasta)
+        self.catalogo = carregar_catalogo(self.config, pasta)
+        self.fechamento: Optional[Fechamento] = ler_fechamento(pasta, self.repositorio.dia)
+        self.sincronizacao = sincronizacao
+        self.vendas = ColecaoVendas()
+        self.resumo = ResumoIncremental(catalogo=self.catalogo)
+        self.gravador: Optional[GravadorAssincrono] = None
+        if gravacao_assincrona:
+            self.gravador = GravadorAssincrono(self.gravar_alteracoes)
+
+    @property
+    def dia(self) -> date:
+        return self.repositorio.dia
+
+    def ler(self, somente_leitura: bool = False) -> ColecaoVendas:
+        """
+        Lê as vendas do dia sem tocar no estado em memória; pode rodar em outra thread.
+        O que ficou no arquivo de recuperação é gravado no repositório antes, exceto
+        com `somente_leitura`: aí nada é gravado e o caixa não aceita alterações.
+        """
+        vendas = self.repositorio.carregar(somente_leitura)
+        if not somente_leitura and self._recuperar(vendas):
+            vendas = self.repositorio.carregar()
+        return ColecaoVendas(self.catalogo.identificar_todas(vendas))
+
+    def _recuperar(self, vendas: List[Venda]) -> bool:
+        """Grava as vendas do arquivo de recuperação que faltam ou mudaram e apaga o arquivo"""
+        caminho = arquivo_recuperacao(self.pasta, self.dia)
+        if not os.path.exists(caminho):
+            return False
+        atuais = {venda.id: venda.to_dict() for venda in vendas}
+        alteracoes = [('add' if venda.id not in atuais else 'upd', venda) for venda in importar_json(caminho)
+                      if atuais.get(venda.id) != venda.to_dict()]
+        if alteracoes:
+            self.gravar_alteracoes(alteracoes)
+        # Só depois de gravadas: se a gravação falhar, o arquivo continua para a próxima carga
+        os.remove(caminho)
+        return bool(alteracoes)
+
+    def salvar_recuperacao(self, vendas: Iterable[Venda]) -> str:
+        """Guarda vendas que não chegaram ao repositório; a próxima carga as grava. Devolve o caminho"""
+        return gravar_recuperacao(self.pasta, self.dia, vendas)
+
+    def carregar(self, vendas: Optional[ColecaoVendas] = None, resumo: Optional[ResumoIncremental] = None,
+                 somente_leitura: bool = False):
+        """Assume as vendas já lidas com `ler` (e seus totais) ou lê agora do repositório"""
+        self.vendas = vendas if vendas is not None else self.ler(somente_leitura)
+        self.resumo = resumo if resumo is not None else ResumoIncremental(self.vendas, self.catalogo)
+        self.busca.abrir_dia(self.vendas)
+
+    def gravar_alteracoes(self, alteracoes: List[tuple]):
+        """Grava no repositório e registra para a sincronização; roda na thread do gravador, se houver"""
+        try:
+            aplicar_alteracoes(self.repositorio, alteracoes)
+        except Exception as e:
+            raise ErroPersistencia(str(e)) from e
+        if self.sincronizacao is None:
+            return
+        try:
+            self.sincronizacao.registrar(self.dia, [_publicavel(alteracao) for alteracao in alteracoes])
+        except OSError as e:
+            raise ErroPersistencia(f"pendências de sincronização: {e}") from e
+
+    def _gravar(self, alteracoes: List[tuple]):
+        if self.gravador is not None:
+            self.gravador.enfileirar(alteracoes)
+        else:
+            self.gravar_alteracoes(alteracoes)
+
+    def aguardar_gravacao(self, timeout: Optional[float] = None) -> bool:
+        """Espera as alterações enfileiradas chegarem ao disco; False se o tempo acabou"""
+        return self.gravador is None or self.gravador.aguardar(timeout)
+
+    def adicionar(self, venda: Venda):
+        venda.metodo = self.catalogo.identificar(venda)
+        self.vendas.adicionar(venda)
+        self.resumo.adicionar(venda)
+        self.busca.adicionar([venda])
+        self._gravar([('add', venda)])
+
+    def adicionar_lote(self, vendas: Iterable[Venda]):
+        vendas = list(self.catalogo.identificar_todas(vendas))
+        for venda in vendas:
+            self.vendas.adicionar(venda)
+            self.resumo.adicionar(venda)
+        self.busca.adicionar(vendas)
+        self._gravar([('add', venda) for venda in vendas])
+
+    def atualizar(self, venda: Venda) -> Venda:
+        """Substitui a venda de mesmo id; devolve a versão anterior"""
+        venda.metodo = self.catalogo.identificar(venda)
+        anterior = self.vendas.substituir(venda)
+        self.resumo.remover(anterior)
+        self.resumo.adicionar(venda)
+        self.busca.adicionar([venda])
+        self._gravar([('upd', venda)])
+        return anterior
+
+    def excluir(self, ids: List[str]) -> List[Venda]:
+        removidas = [self.vendas.remover(id_venda) for id_venda in ids]
+        for venda in removidas:
+            self.resumo.remover(venda)
+        self.busca.remover(ids)
+        self._gravar([('del', id_venda) for id_venda in ids])
+        return removidas
+
+    def arquivar_fechados(self) -> List[date]:
+        """Move para os arquivos mensais os dias mais antigos que 'vendas.arquivar_apos_dias'"""
+        dias = self.config.get('vendas.arquivar_apos_dias')
+        if dias is None:
+            return []
+        return self.repositorio.arquivar(date.today() - timedelta(days=dias))
+
+    def linhas_liquido(self) -> List[str]:
+        """Totais líquidos de taxas por adquirente, conforme o catálogo"""
+        return self.catalogo.linhas_liquido(self.resumo.por_metodo)
+
+    def conferir(self, contado: Dict[str, Decimal], terminais: Optional[Dict[str, Decimal]] = None
+                 ) -> List[Conferencia]:
+        """Diferenças entre os valores contados e os totais incrementais do dia"""
+        return conferir(esperado_por_conta(self.resumo), contado, terminais)
+
+    def fechar_dia(self, contado: Dict[str, Decimal], terminais: Optional[Dict[str, Decimal]] = None) -> Fechamento:
+        """Confere, congela as vendas do dia e grava o fechamento; levanta ValueError se já foi fechado"""
+        if self.fechamento is not None:
+            raise ValueError(f"O caixa de {self.dia.strftime('%d/%m/%Y')} já foi fechado.")
+        if not self.aguardar_gravacao(TEMPO_ENCERRAR_S):
+            raise ErroPersistencia("Ainda há vendas sendo gravadas; tente fechar de novo.")
+        conferencias = self.conferir(contado, terminais)
+        try:
+            sha256 = self.repositorio.congelar_dia(list(self.vendas))
+        except (OSError, sqlite3.Error) as e:
+            raise ErroPersistencia(str(e)) from e
+        fechamento = Fechamento(
+            dia=self.dia,
+            fechado_em=datetime.now().strftime(FORMATO_DATA),
+            conferencias=conferencias,
+            terminais=dict(terminais or {}),
+            quantidade=self.resumo.quantidade,
+            total=self.resumo.total,
+            sha256=sha256
+        )
+        gravar_fechamento(self.pasta, fechamento)
+        self.fechamento = fechamento
+        return fechamento
+
+    def linhas_fechamento(self) -> List[str]:
+        """Aviso do painel de resumo depois que o dia foi fechado"""
+        if self.fechamento is None:
+            return []
+        return ["", f"Caixa fechado em {self.fechamento.fechado_em} "
+                    f"(diferença R$ {self.fechamento.diferenca:+.2f})",
+                "Alterações agora são registradas como correções."]
+
+    def fechar(self, timeout: Optional[float] = TEMPO_ENCERRAR_S):
+        """Grava o que está na fila (esperando até `timeout` segundos) e fecha o repositório"""
+        if self.gravador is not None:
+            self.gravador.encerrar(timeout)
+        try:
+            self.busca.fechar()
+        except OSError:
+            pass  # o índice de busca é refeito na próxima consulta
+        self.repositorio.fechar()
@@ -0,0 +1,533 @@
+"""
+Linha de comando do caixa, para rotinas sem interface gráfica (cron de fim de dia).
+
+    python -m caixa_cli importar vendas.csv
+    python -m caixa_cli resumo --de 01/03/2024 --ate 31/03/2024 [--verificar]
+    python -m caixa_cli relatorio --de 15/03/2024 --saida relatorio.txt
+    python -m caixa_cli exportar marco.xlsx --de 01/03/2024 --ate 31/03/2024
+    python -m caixa_cli migrar --pasta . --db austral.db
+    python -m caixa_cli conciliar --de 15/03/2024 --arquivo "POS Rede" rede.csv
+    python -m caixa_cli buscar 12345 --valor "99,90 ± 0,10"
+    python -m caixa_cli arquivar --antes-de 01/03/2024
+    python -m caixa_cli fechar --contado Dinheiro 1234,50 --contado PIX 800 --terminal "POS Rede" 2100
+    python -m caixa_cli auditar --dia 15/03/2024
+    python -m caixa_cli --pasta loja servidor --porta 8765
+
+Não importa tkinter/customtkinter: só os módulos de domínio. Os módulos de
+um único subcomando (servidor, exportação, conciliação, busca, fechamento)
+são importados dentro dele, para que as demais chamadas iniciem rápido.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from caixa import Caixa, ConfigManager, ErroPersistencia, validar_dados_venda
+from catalogo import CatalogoPagamentos, carregar_catalogo
+from vendas import Venda
+from agregados import ResumoIncremental, resumir
+from armazenamento import FORMATO_DATA, criar_repositorio, migrar_para_sqlite
+from relatorio import em_blocos, linhas_relatorio, salvar_relatorio
+from resumo_diario import relatorio_periodo
+
+FORMATO_DIA = "%d/%m/%Y"
+# Formatos aceitos na coluna 'data' dos arquivos importados
+FORMATOS_IMPORTACAO = (FORMATO_DATA, "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
+def _dia(texto: str) -> date:
+    try:
+        return datetime.strptime(texto, FORMATO_DIA).date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {texto!r} (use dd/mm/aaaa)")
+
+
+def _registros_csv(caminho: str) -> Iterator[Tuple[int, dict]]:
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as file:
+        amostra = file.read(4096)
+        file.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(file, dialect=dialeto)
+        leitor.fieldnames = [(nome or '').strip().lower() for nome in leitor.fieldnames or []]
+        for registro in leitor:
+            yield leitor.line_num, registro
+
+
+def _registros_jsonl(caminho: str) -> Iterator[Tuple[int, dict]]:
+    with open(caminho, 'r', encoding='utf-8') as file:
+        for numero, linha in enumerate(file, 1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError as e:
+                registro = e
+            yield numero, registro
+
+
+def _converter_data(texto: Optional[str]) -> str:
+    if not texto:
+        return datetime.now().strftime(FORMATO_DATA)
+    for formato in FORMATOS_IMPORTACAO:
+        try:
+            return datetime.strptime(texto.strip(), formato).strftime(FORMATO_DATA)
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {texto!r}")
+
+
+def venda_do_registro(registro: dict, catalogo: Optional[CatalogoPagamentos] = None) -> Venda:
+    """
+    Converte uma linha importada em `Venda`, com as mesmas validações da
+    tela. O pagamento pode vir como na tela ('pagamento': 'Visa - Débito')
+    ou separado, como em `Venda.to_dict` (tipo_pagamento, bandeira, detalhes_pagamento).
+    """
+    if not isinstance(registro, dict):
+        raise ValueError(f"Registro inválido: {registro}")
+    registro = {chave: ('' if valor is None else str(valor)) for chave, valor in registro.items()}
+
+    pagamento = registro.get('pagamento', '').strip()
+    observacao = registro.get('observacoes', '').strip()
+    if not pagamento:
+        pagamento = registro.get('tipo_pagamento', '').strip()
+        if pagamento == "Cartão":
+            pagamento = f"{registro.get('bandeira', '').strip()} - {registro.get('detalhes_pagamento', '').strip()}"
+        else:
+            observacao = observacao or registro.get('detalhes_pagamento', '').strip()
+
+    dados = validar_dados_venda(
+        registro.get('vendedor', '').strip(),
+        pagamento,
+        registro.get('valor', ''),
+        registro.get('numero_boleta') or registro.get('boleta', ''),
+        observacao,
+        catalogo
+    )
+    return Venda(**dados, data=_converter_data(registro.get('data')), id=registro.get('id') or None)
+
+
+def importar(caminho: str, config, pasta: str) -> int:
+    if caminho.lower().endswith(('.jsonl', '.ndjson')):
+        registros = _registros_jsonl(caminho)
+    else:
+        registros = _registros_csv(caminho)
+
+    catalogo = carregar_catalogo(config, pasta)
+    _avisar_catalogo(catalogo)
+    por_dia: Dict[date, List[Venda]] = {}
+    erros = 0
+    for numero, registro in registros:
+        try:
+            venda = venda_do_registro(registro, catalogo)
+        except (ValueError, KeyError) as e:
+            erros += 1
+            print(f"{caminho}:{numero}: {e}", file=sys.stderr)
+            continue
+        dia = datetime.strptime(venda.data, FORMATO_DATA).date()
+        por_dia.setdefault(dia, []).append(venda)
+
+    importadas = existentes = 0
+    for dia, vendas in sorted(por_dia.items()):
+        caixa = Caixa(config, pasta, dia)
+        try:
+            caixa.carregar()
+            # Reimportar o mesmo arquivo não duplica vendas que já têm id
+            novas = {}
+            for venda in vendas:
+                if venda.id in caixa.vendas or venda.id in novas:
+                    existentes += 1
+                else:
+                    novas[venda.id] = venda
+            caixa.adicionar_lote(novas.values())
+            importadas += len(novas)
+        finally:
+            caixa.fechar()
+
+    print(f"{importadas} vendas importadas em {len(por_dia)} dia(s)"
+          f"; {existentes} já existentes; {erros} linha(s) com erro")
+    return 1 if erros else 0
+
+
+def _abrir(config, pasta: str, dia: date, somente_leitura: bool = True) -> Caixa:
+    """
+    Caixa do dia para os subcomandos. Só o fechamento grava: os demais leem
+    sem truncar nem compactar o journal em que a janela pode estar gravando.
+    """
+    caixa = Caixa(config, pasta, dia)
+    _avisar_catalogo(caixa.catalogo)
+    caixa.carregar(somente_leitura=somente_leitura)
+    return caixa
+
+
+def _avisar_catalogo(catalogo: CatalogoPagamentos):
+    if catalogo.aviso:
+        print(f"Aviso: {catalogo.aviso}", file=sys.stderr)
+
+
+def _emitir(linhas: Iterator[str], saida: Optional[str]):
+    """Grava o relatório em `saida` ou, sem arquivo, na saída padrão"""
+    if saida:
+        salvar_relatorio(linhas, saida)
+        print(f"Relatório salvo como '{saida}'")
+    else:
+        for bloco in em_blocos(linhas):
+            sys.stdout.write(bloco)
+
+
+def resumo(inicio: date, fim: date, config, pasta: str, verificar: bool = False) -> int:
+    """Totais do período; com `verificar`, confere os totais incrementais (veja `_conferir_incremental`)"""
+    caixa = _abrir(config, pasta, fim)
+    try:
+        vendas = list(caixa.catalogo.identificar_todas(caixa.repositorio.buscar(inicio, fim)))
+        resumo = ResumoIncremental(vendas, caixa.catalogo)
+        liquido = caixa.catalogo.linhas_liquido(resumo.por_metodo)
+    finally:
+        caixa.fechar()
+    divergencias = _conferir_incremental(vendas, config, fim) if verificar else []
+    print(f"Período: {inicio.strftime(FORMATO_DIA)} a {fim.strftime(FORMATO_DIA)}")
+    print(f"Quantidade de vendas: {resumo.quantidade}")
+    for linha in resumo.linhas():
+        print(linha)
+    if resumo.por_vendedor:
+        print()
+        print("Por Vendedor:")
+        for vendedor, valor in sorted(resumo.por_vendedor.items()):
+            print(f"- {vendedor}: R$ {valor:.2f}")
+    for linha in liquido:
+        print(linha)
+    if verificar:
+        print()
+        for divergencia in divergencias:
+            print(f"DIVERGÊNCIA: {divergencia}")
+        if not divergencias:
+            print("Totais incrementais conferidos com o recálculo completo.")
+    return 1 if divergencias else 0
+
+
+def _conferir_incremental(vendas: List[Venda], config, dia: date) -> List[str]:
+    """
+    Repete as vendas do período num caixa descartável (pasta temporária) com as
+    operações da janela: inclusão, edição de cada venda para os dados de outra e
+    de volta, exclusão de metade e reinclusão. Depois de cada etapa os totais
+    mantidos pelo caixa são comparados com um recálculo completo.
+    """
+    copias = [Venda.from_dict(venda.to_dict()) for venda in vendas]
+    divergencias = []
+    with tempfile.TemporaryDirectory() as pasta_teste:
+        caixa = Caixa(config, pasta_teste, dia)
+        caixa.carregar()
+        try:
+            def conferir(etapa: str):
+                divergencias.extend(f"{etapa}: {divergencia}" for divergencia in caixa.resumo.verificar(caixa.vendas))
+
+            caixa.adicionar_lote([Venda.from_dict(venda.to_dict()) for venda in copias])
+            conferir("inclusão")
+            for venda, outra in zip(copias, copias[1:] + copias[:1]):
+                caixa.atualizar(Venda.from_dict({**outra.to_dict(), 'id': venda.id}))
+            conferir("edição")
+            for venda in copias:
+                caixa.atualizar(Venda.from_dict(venda.to_dict()))
+            conferir("edição desfeita")
+            metade = copias[::2]
+            caixa.excluir([venda.id for venda in metade])
+            conferir("exclusão")
+            caixa.adicionar_lote([Venda.from_dict(venda.to_dict()) for venda in metade])
+            conferir("reinclusão")
+        finally:
+            caixa.fechar()
+        atual, esperado = caixa.resumo.como_dict(), resumir(vendas)
+        divergencias.extend(f"{campo}: incremental={atual[campo]!r} gravado={esperado[campo]!r}"
+                            for campo in esperado if atual[campo] != esperado[campo])
+    return divergencias
+
+
+def relatorio(inicio: date, fim: date, saida: Optional[str], config, pasta: str) -> int:
+    """Um dia: relatório detalhado. Período: relatório consolidado pelos resumos diários."""
+    caixa = _abrir(config, pasta, fim)
+    try:
+        if inicio == fim:
+            linhas = linhas_relatorio(caixa.vendas)
+        else:
+            linhas = relatorio_periodo(caixa.resumos_diarios, inicio, fim, caixa.vendas)
+        _emitir(linhas, saida)
+    finally:
+        caixa.fechar()
+    return 0
+
+
+def conciliar_cartoes(inicio: date, fim: date, arquivos: List[Tuple[str, str]], janela: Optional[int],
+                      saida: Optional[str], config, pasta: str) -> int:
+    from conciliacao import JANELA_PADRAO, IndiceLiquidacoes, conciliar, linhas_conciliacao
+    indice = IndiceLiquidacoes(janela or JANELA_PADRAO)
+    for adquirente, caminho in arquivos:
+        try:
+            indice.carregar(caminho, adquirente)
+        except (OSError, ValueError) as e:
+            print(f"{caminho}: {e}", file=sys.stderr)
+            return 2
+
+    caixa = _abrir(config, pasta, fim)
+    try:
+        resultado = conciliar(caixa.repositorio.buscar(inicio, fim, tipo_pagamento="Cartão"), indice)
+    finally:
+        caixa.fechar()
+
+    _emitir(linhas_conciliacao(resultado, indice.erros), saida)
+    pendencias = (resultado.valor_divergente or resultado.duplicadas
+                  or resultado.sem_liquidacao or resultado.liquidacoes_sem_venda)
+    return 1 if pendencias else 0
+
+
+def buscar(texto: str, valor: str, inicio: Optional[date], fim: Optional[date], facetas: Dict[str, str],
+           config, pasta: str) -> int:
+    from busca import contar_facetas, interpretar_valor
+    try:
+        valor, tolerancia = interpretar_valor(valor)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    caixa = _abrir(config, pasta, date.today())
+    try:
+        comeco = time.perf_counter()
+        vendas = caixa.busca.buscar(texto, valor, tolerancia, inicio, fim, **facetas)
+        duracao = time.perf_counter() - comeco
+    finally:
+        caixa.fechar()
+
+    for venda in vendas:
+        pagamento = " ".join(filter(None, (venda.tipo_pagamento, venda.bandeira, venda.detalhes_pagamento)))
+        troca = " (troca)" if venda.troca else ""
+        print(f"{venda.data}  {venda.vendedor:10s} R$ {venda.valor:>10.2f}  boleta {venda.numero_boleta:10s} "
+              f"{pagamento}{troca}")
+    print(f"{len(vendas)} venda(s) encontrada(s) em {duracao * 1000:.1f} ms")
+    for campo, contagens in contar_facetas(vendas).items():
+        if contagens:
+            print(f"{campo}: " + ", ".join(f"{chave} ({quantidade})" for chave, quantidade in
+                                          sorted(contagens.items(), key=lambda item: -item[1])))
+    return 0 if vendas else 1
+
+
+def exportar_periodo(inicio: date, fim: date, arquivo: str, config, pasta: str) -> int:
+    """Vendas e totais do período em CSV, XLSX ou PDF, lendo um dia de cada vez"""
+    from exportacao import FORMATOS, exportar, lotes_do_periodo
+    if os.path.splitext(arquivo)[1].lower() not in FORMATOS:
+        print(f"Formato não suportado; use {', '.join(FORMATOS)}", file=sys.stderr)
+        return 2
+    mostrar_progresso = sys.stderr.isatty()
+
+    def progresso(feitos: int, total: Optional[int]):
+        if mostrar_progresso:
+            sys.stderr.write(f"\r{feitos}/{total} dia(s)")
+            sys.stderr.flush()
+
+    caixa = _abrir(config, pasta, fim)
+    try:
+        lotes, total = lotes_do_periodo(caixa.repositorio, inicio, fim, caixa.vendas)
+        titulo = f"Vendas de {inicio.strftime(FORMATO_DIA)} a {fim.strftime(FORMATO_DIA)}"
+        quantidade = exportar(arquivo, lotes, total, titulo, progresso)
+    finally:
+        caixa.fechar()
+    if mostrar_progresso:
+        sys.stderr.write("\n")
+    print(f"{quantidade} venda(s) exportada(s) para '{arquivo}'")
+    return 0
+
+
+def arquivar(antes_de: Optional[date], config, pasta: str) -> int:
+    """Move os dias fechados para os arquivos mensais (padrão: 'vendas.arquivar_apos_dias')"""
+    caixa = Caixa(config, pasta)
+    try:
+        dias = caixa.repositorio.arquivar(antes_de) if antes_de else caixa.arquivar_fechados()
+    finally:
+        caixa.fechar()
+    por_mes: Dict[str, int] = {}
+    for dia in dias:
+        por_mes[dia.strftime('%Y%m')] = por_mes.get(dia.strftime('%Y%m'), 0) + 1
+    for mes, quantidade in sorted(por_mes.items()):
+        print(f"{mes[4:]}/{mes[:4]}: {quantidade} dia(s) em vendas_{mes}.jsonl.gz")
+    print(f"{len(dias)} dia(s) arquivado(s)")
+    return 0
+
+
+def fechar_caixa(dia: date, contado: Dict[str, Decimal], terminais: Dict[str, Decimal], simular: bool,
+                 config, pasta: str) -> int:
+    """Confere os valores contados com os totais do dia e, sem `simular`, fecha o caixa"""
+    from fechamento import linhas_conferencia
+    caixa = _abrir(config, pasta, dia, somente_leitura=simular)
+    try:
+        if simular:
+            for linha in linhas_conferencia(caixa.conferir(contado, terminais)):
+                print(linha)
+            return 0
+        try:
+            fechamento = caixa.fechar_dia(contado, terminais)
+        except (ValueError, ErroPersistencia) as e:
+            print(e, file=sys.stderr)
+            return 1
+    finally:
+        caixa.fechar()
+    for linha in fechamento.linhas():
+        print(linha)
+    return 0
+
+
+def auditar(dia: date, config, pasta: str) -> int:
+    """Mostra o fechamento, confere o dia congelado e lista as correções; 1 se algo não confere"""
+    from fechamento import ler_fechamento
+    fechamento = ler_fechamento(pasta, dia)
+    repositorio = criar_repositorio(config, pasta, dia)
+    try:
+        fechado = repositorio.fechado_do_dia(dia)
+        if fechamento is None or not fechado.existe():
+            print(f"O caixa de {dia.strftime(FORMATO_DIA)} não foi fechado.", file=sys.stderr)
+            return 1
+        problemas = fechado.verificar()
+        if fechado.cabecalho()['sha256'] != fechamento.sha256:
+            problemas.append("o SHA-256 do fechamento não é o das vendas congeladas")
+        ajustes = fechado.ajustes()
+    finally:
+        repositorio.fechar()
+    for linha in fechamento.linhas():
+        print(linha)
+    print("", f"Correções depois do fechamento: {len(ajustes)}", sep="\n")
+    for registro in ajustes:
+        if registro['op'] == 'del':
+            descricao = f"exclusão {registro['id']}"
+        else:
+            venda = registro['venda']
+            descricao = (f"{'inclusão' if registro['op'] == 'add' else 'alteração'} {venda['id']}: "
+                         f"{venda['vendedor']} {venda['tipo_pagamento']} R$ {venda['valor']} "
+                         f"boleta {venda['numero_boleta']}")
+        print(f"- {registro['momento']} {descricao}")
+    print("")
+    for problema in problemas:
+        print(f"NÃO CONFERE: {problema}")
+    if not problemas:
+        print("Vendas congeladas e correções conferidas.")
+    return 1 if problemas else 0
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='caixa_cli', description="Sistema de Caixa sem interface gráfica")
+    parser.add_argument('--pasta', default='.', help="Pasta dos arquivos de vendas (padrão: atual)")
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+
+    importar_ = subcomandos.add_parser('importar', help="Importa vendas de um CSV (, ; ou tab) ou JSONL")
+    importar_.add_argument('arquivo')
+
+    hoje = date.today()
+    for nome, ajuda in (('resumo', "Totais do período"), ('relatorio', "Relatório do dia ou do período"),
+                        ('conciliar', "Concilia as vendas em cartão com os arquivos das adquirentes"),
+                        ('exportar', "Exporta as vendas e os totais do período para CSV, XLSX ou PDF")):
+        sub = subcomandos.add_parser(nome, help=ajuda)
+        if nome == 'exportar':
+            sub.add_argument('arquivo', help="Arquivo de saída; o formato vem da extensão (.csv, .xlsx, .pdf)")
+        sub.add_argument('--de', type=_dia, default=None, help="dd/mm/aaaa (padrão: igual a --ate)")
+        sub.add_argument('--ate', type=_dia, default=hoje, help="dd/mm/aaaa (padrão: hoje)")
+        if nome == 'resumo':
+            sub.add_argument('--verificar', action='store_true',
+                             help="Refaz as vendas do período num caixa descartável (incluir, editar, excluir) "
+                                  "e confere os totais incrementais com um recálculo completo (1 se divergirem)")
+        if nome in ('relatorio', 'conciliar'):
+            sub.add_argument('--saida', help="Arquivo de saída (padrão: saída padrão)")
+        if nome == 'conciliar':
+            sub.add_argument('--arquivo', nargs=2, action='append', required=True, metavar=('ADQUIRENTE', 'CSV'),
+                             help="Arquivo de liquidação; ADQUIRENTE é o terminal anotado na venda, "
+                                  "ex.: \"POS Rede\", \"POS PagSeguro\", \"POS Getnet\" ou \"Link Rede\"")
+            sub.add_argument('--janela', type=int, default=None,
+                             help="Tolerância em minutos entre venda e liquidação (padrão: 15)")
+
+    migrar = subcomandos.add_parser('migrar', help="Importa os arquivos vendas_*.json para o SQLite")
+    migrar.add_argument('--db', default='austral.db')
+
+    buscar_ = subcomandos.add_parser('buscar', help="Busca vendas por texto (boleta, observação, vendedor, "
+                                                    "bandeira) e por valor, em todos os dias gravados")
+    buscar_.add_argument('texto', nargs='*', help="Termos (todos precisam aparecer; 'cred' acha 'Crédito')")
+    buscar_.add_argument('--valor', default="", help="Valor ou faixa, ex.: \"99,90\" ou \"99,90 ± 0,10\"")
+    buscar_.add_argument('--de', type=_dia, default=None, help="dd/mm/aaaa (padrão: sem limite)")
+    buscar_.add_argument('--ate', type=_dia, default=None, help="dd/mm/aaaa (padrão: sem limite)")
+    buscar_.add_argument('--vendedor')
+    buscar_.add_argument('--tipo', dest='tipo_pagamento', help="Dinheiro, PIX, Cartão ou Troca")
+    buscar_.add_argument('--bandeira')
+
+    arquivar_ = subcomandos.add_parser('arquivar', help="Compacta os dias fechados em arquivos mensais "
+                                                        "(vendas_AAAAMM.jsonl.gz)")
+    arquivar_.add_argument('--antes-de', type=_dia, default=None,
+                           help="dd/mm/aaaa; arquiva os dias anteriores (padrão: 'vendas.arquivar_apos_dias')")
+
+    fechar = subcomandos.add_parser('fechar', help="Confere os valores contados e fecha o caixa do dia")
+    fechar.add_argument('--dia', type=_dia, default=hoje, help="dd/mm/aaaa (padrão: hoje)")
+    fechar.add_argument('--contado', nargs=2, action='append', default=[], metavar=('CONTA', 'VALOR'),
+                        help="Valor contado de uma forma de pagamento, ex.: Dinheiro 1234,50")
+    fechar.add_argument('--terminal', nargs=2, action='append', default=[], metavar=('TERMINAL', 'VALOR'),
+                        help="Total de cartão de um terminal, ex.: \"POS Rede\" 2100,00")
+    fechar.add_argument('--simular', action='store_true', help="Só mostra a conferência, sem fechar")
+
+    auditar_ = subcomandos.add_parser('auditar', help="Confere um dia fechado e lista as correções posteriores")
+    auditar_.add_argument('--dia', type=_dia, default=hoje, help="dd/mm/aaaa (padrão: hoje)")
+
+    servidor = subcomandos.add_parser('servidor', help="Servidor de sincronização dos caixas da loja")
+    servidor.add_argument('--host', default='127.0.0.1')
+    servidor.add_argument('--porta', type=int, default=None, help="(padrão: 8765)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    config = ConfigManager()
+
+    if args.comando == 'importar':
+        return importar(args.arquivo, config, args.pasta)
+    if args.comando == 'migrar':
+        quantidade, fechados = migrar_para_sqlite(args.pasta, os.path.join(args.pasta, args.db))
+        print(f"{quantidade} vendas migradas para {args.db}")
+        for dia in fechados:
+            print(f"{dia.strftime(FORMATO_DIA)}: dia já fechado em {args.db}, arquivos não migrados", file=sys.stderr)
+        return 0
+    if args.comando == 'servidor':
+        # asyncio e o servidor só são carregados aqui, não a cada chamada do CLI
+        from sincronizacao import PORTA_PADRAO, ServidorSincronizacao
+        ServidorSincronizacao(args.pasta, config).executar(args.host, args.porta or PORTA_PADRAO)
+        return 0
+    if args.comando == 'arquivar':
+        return arquivar(args.antes_de, config, args.pasta)
+    if args.comando == 'fechar':
+        from fechamento import ler_valor_contado
+        try:
+            contado = {conta: ler_valor_contado(valor) for conta, valor in args.contado}
+            terminais = {terminal: ler_valor_contado(valor) for terminal, valor in args.terminal}
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        return fechar_caixa(args.dia, contado, terminais, args.simular, config, args.pasta)
+    if args.comando == 'auditar':
+        return auditar(args.dia, config, args.pasta)
+    if args.comando == 'buscar':
+        facetas = {'vendedor': args.vendedor, 'tipo_pagamento': args.tipo_pagamento, 'bandeira': args.bandeira}
+        return buscar(" ".join(args.texto), args.valor, args.de, args.ate, facetas, config, args.pasta)
+
+    inicio = args.de or args.ate
+    if args.ate < inicio:
+        print("A data final é anterior à inicial.", file=sys.stderr)
+        return 2
+    if args.comando == 'resumo':
+        return resumo(inicio, args.ate, config, args.pasta, args.verificar)
+    if args.comando == 'conciliar':
+        janela = args.janela * 60 if args.janela is not None else None
+        return conciliar_cartoes(inicio, args.ate, args.arquivo, janela, args.saida, config, args.pasta)
+    if args.comando == 'exportar':
+        return exportar_periodo(inicio, args.ate, args.arquivo, config, args.pasta)
+    return relatorio(inicio, args.ate, args.saida, config, args.pasta)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Catálogo das formas de pagamento aceitas no caixa.
+
+Cada entrada da configuração ('pagamentos.catalogo', ou o arquivo
+'pagamentos.arquivo' na pasta do caixa, quando existir) vira um
+`MetodoPagamento` imutável, com o rótulo da tela, os campos gravados na
+venda, a taxa e a adquirente já calculados. A venda guarda em memória o
+índice do seu método (`Venda.metodo`), então os totais por método e o
+líquido por adquirente são somas por inteiro, sem montar chaves de texto.
+
+Exemplo de pagamentos.json (lista de entradas; só 'tipo' é obrigatório):
+
+    [{"tipo": "Dinheiro"},
+     {"tipo": "Cartão", "bandeira": "Visa", "modalidade": "Crédito", "parcelas": 3,
+      "taxa": "0.0459", "adquirente": "Rede"}]
+"""
+import os
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vendas import Venda
+from agregados import chave_pagamento
+
+BANDEIRAS_PADRAO = ("Visa", "Mastercard", "Elo", "American Express", "Hipercard")
+METODOS_PADRAO = [
+    {'tipo': "Dinheiro"}, {'tipo': "PIX"}, {'tipo': "Troca", 'troca': True},
+    *({'tipo': "Cartão", 'bandeira': bandeira, 'modalidade': modalidade}
+      for bandeira in BANDEIRAS_PADRAO for modalidade in ("Débito", "Crédito"))
+]
+CAMPOS_ENTRADA = {'tipo', 'bandeira', 'modalidade', 'parcelas', 'taxa', 'adquirente', 'troca', 'rotulo'}
+SEM_ADQUIRENTE = "Sem adquirente"
+
+
+@dataclass(frozen=True)
+class MetodoPagamento:
+    id: int
+    tipo_pagamento: str
+    bandeira: str = ""
+    modalidade: str = ""
+    parcelas: int = 1
+    taxa: Decimal = Decimal('0')
+    adquirente: str = ""
+    troca: bool = False
+    rotulo: str = ""
+    # Calculados uma vez na montagem do catálogo
+    detalhes_pagamento: str = field(init=False)
+    chave: str = field(init=False)
+
+    def __post_init__(self):
+        detalhes = self.modalidade + (f" {self.parcelas}x" if self.parcelas > 1 else "")
+        object.__setattr__(self, 'detalhes_pagamento', detalhes)
+        object.__setattr__(self, 'chave', chave_pagamento(self.tipo_pagamento, detalhes))
+        if not self.rotulo:
+            rotulo = f"{self.bandeira} - {detalhes}" if self.bandeira else self.tipo_pagamento
+            object.__setattr__(self, 'rotulo', rotulo)
+
+
+def _compilar(indice: int, entrada: dict) -> MetodoPagamento:
+    if not isinstance(entrada, dict) or not entrada.get('tipo'):
+        raise ValueError(f"Catálogo de pagamentos inválido: entrada {indice + 1} sem 'tipo'")
+    desconhecidos = set(entrada) - CAMPOS_ENTRADA
+    if desconhecidos:
+        raise ValueError(f"Catálogo de pagamentos inválido: campos desconhecidos {sorted(desconhecidos)} "
+                         f"na entrada {indice + 1}")
+    try:
+        taxa = Decimal(str(entrada.get('taxa', '0')))
+        parcelas = int(entrada.get('parcelas', 1))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Catálogo de pagamentos inválido: taxa ou parcelas na entrada {indice + 1}") from None
+    if not (0 <= taxa < 1) or parcelas < 1:
+        raise ValueError(f"Catálogo de pagamentos inválido: taxa ou parcelas na entrada {indice + 1}")
+    return MetodoPagamento(
+        id=indice,
+        tipo_pagamento=entrada['tipo'],
+        bandeira=entrada.get('bandeira', ""),
+        modalidade=entrada.get('modalidade', ""),
+        parcelas=parcelas,
+        taxa=taxa,
+        adquirente=entrada.get('adquirente', ""),
+        troca=bool(entrada.get('troca', False)),
+        rotulo=entrada.get('rotulo', "")
+    )
+
+
+class CatalogoPagamentos:
+    """Métodos de pagamento indexados por id, por rótulo da tela e pelos campos da venda"""
+
+    def __init__(self, entradas: Iterable[dict] = METODOS_PADRAO):
+        # Motivo do catálogo padrão estar em uso no lugar do configurado (veja carregar_catalogo)
+        self.aviso: Optional[str] = None
+        self.metodos: List[MetodoPagamento] = []
+        self._por_rotulo: Dict[str, MetodoPagamento] = {}
+        self._por_campos: Dict[Tuple[str, str, str], MetodoPagamento] = {}
+        for indice, entrada in enumerate(entradas):
+            metodo = _compilar(indice, entrada)
+            if metodo.rotulo in self._por_rotulo:
+                raise ValueError(f"Catálogo de pagamentos inválido: rótulo repetido {metodo.rotulo!r}")
+            self.metodos.append(metodo)
+            self._por_rotulo[metodo.rotulo] = metodo
+            self._por_campos.setdefault((metodo.tipo_pagamento, metodo.bandeira, metodo.detalhes_pagamento), metodo)
+        self.rotulos = [metodo.rotulo for metodo in self.metodos]
+
+    def __getitem__(self, id_metodo: int) -> MetodoPagamento:
+        return self.metodos[id_metodo]
+
+    def __len__(self):
+        return len(self.metodos)
+
+    def por_rotulo(self, rotulo: str) -> Optional[MetodoPagamento]:
+        return self._por_rotulo.get(rotulo)
+
+    def identificar(self, venda: Venda) -> Optional[int]:
+        """Id do método da venda; Dinheiro/PIX/Troca guardam a observação em detalhes_pagamento"""
+        metodo = (self._por_campos.get((venda.tipo_pagamento, venda.bandeira, venda.detalhes_pagamento))
+                  or self._por_campos.get((venda.tipo_pagamento, venda.bandeira, "")))
+        return None if metodo is None else metodo.id
+
+    def identificar_todas(self, vendas: Iterable[Venda]) -> Iterable[Venda]:
+        for venda in vendas:
+            venda.metodo = self.identificar(venda)
+            yield venda
+
+    def liquido_por_adquirente(self, por_metodo: Dict[int, Decimal]) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """(bruto, taxas) por adquirente a partir dos totais por método; a taxa é arredondada por método"""
+        resultado: Dict[str, Tuple[Decimal, Decimal]] = {}
+        for id_metodo, valor in por_metodo.items():
+            metodo = self.metodos[id_metodo]
+            if not metodo.adquirente and not metodo.taxa:
+                continue
+            adquirente = metodo.adquirente or SEM_ADQUIRENTE
+            bruto, taxas = resultado.get(adquirente, (Decimal('0.00'), Decimal('0.00')))
+            resultado[adquirente] = (bruto + valor, taxas + (valor * metodo.taxa).quantize(Decimal('0.01')))
+        return resultado
+
+    def linhas_liquido(self, por_metodo: Dict[int, Decimal]) -> List[str]:
+        """Seção 'Líquido por Adquirente' do resumo (vazia se nenhum método tem taxa ou adquirente)"""
+        liquido = self.liquido_por_adquirente(por_metodo)
+        if not liquido:
+            return []
+        linhas = ["", "Líquido por Adquirente:"]
+        for adquirente, (bruto, taxas) in sorted(liquido.items()):
+            linhas.append(f"- {adquirente}: R$ {bruto - taxas:.2f} (bruto R$ {bruto:.2f}, taxas R$ {taxas:.2f})")
+        return linhas
+
+
+def carregar_catalogo(config, pasta: str = '.') -> CatalogoPagamentos:
+    """
+    Catálogo do arquivo 'pagamentos.arquivo' da pasta, se existir; senão o de 'pagamentos.catalogo'.
+    Um catálogo ilegível ou inválido não impede o caixa de abrir: fica o padrão, com `aviso` preenchido.
+    """
+    arquivo = config.get('pagamentos.arquivo')
+    origem = "configuração"
+    try:
+        if arquivo:
+            caminho = os.path.join(pasta, arquivo)
+            if os.path.exists(caminho):
+                origem = caminho
+                with open(caminho, 'r', encoding='utf-8') as file:
+                    return CatalogoPagamentos(json.load(file))
+        return CatalogoPagamentos(config.get('pagamentos.catalogo', METODOS_PADRAO))
+    except (OSError, ValueError, TypeError) as e:
+        catalogo = CatalogoPagamentos(METODOS_PADRAO)
+        catalogo.aviso = (f"Formas de pagamento de {origem} ignoradas ({e}); "
+                          f"usando as formas de pagamento padrão.")
+        return catalogo
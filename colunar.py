@@ -0,0 +1,304 @@
+"""
+Armazenamento colunar das vendas, para análises de vários meses em memória.
+
+Em vez de um objeto `Venda` por venda (com `__dict__`, Decimal e strings
+repetidas), cada campo vira uma coluna compacta:
+
+- valor em centavos e data/hora em segundos desde 1970 em `array('q')`;
+- vendedor, tipo, detalhes e bandeira como códigos em `array('I')`, com a
+  tabela de textos (`Categorias`) guardada uma única vez (os detalhes são
+  texto livre: vários meses passam facilmente de 65535 valores distintos);
+- troca como bitmap (um bit por venda);
+- boleta e id como listas de str.
+
+`VendaLinha` é uma visão com `__slots__` sobre uma linha e expõe os mesmos
+atributos de `Venda`, então relatórios e agregados aceitam as duas. As
+agregações usam NumPy quando disponível e laços sobre os arrays caso
+contrário; o resultado é o mesmo.
+
+É uma biblioteca para análises avulsas de vários meses (veja
+benchmarks/bench_colunar.py); os relatórios de período da janela e do
+caixa_cli continuam lendo os resumos diários de resumo_diario.py, que já
+evitam abrir as vendas.
+"""
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from vendas import Venda
+from agregados import chave_pagamento
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+EPOCA = datetime(1970, 1, 1)
+ORDINAL_EPOCA = EPOCA.toordinal()
+COLUNAS_CATEGORIA = ('vendedor', 'tipo_pagamento', 'detalhes_pagamento', 'bandeira')
+
+
+def segundos_desde_epoca(data: str) -> int:
+    """'dd/mm/aaaa hh:mm:ss' -> segundos desde 01/01/1970 (horário local, sem fuso)"""
+    dia = date(int(data[6:10]), int(data[3:5]), int(data[0:2])).toordinal() - ORDINAL_EPOCA
+    return dia * 86400 + int(data[11:13]) * 3600 + int(data[14:16]) * 60 + int(data[17:19])
+
+
+def formatar_momento(segundos: int) -> str:
+    return (EPOCA + timedelta(seconds=segundos)).strftime("%d/%m/%Y %H:%M:%S")
+
+
+def _segundos_do_dia(dia: date) -> int:
+    return (dia.toordinal() - ORDINAL_EPOCA) * 86400
+
+
+class Categorias:
+    """Tabela de textos de uma coluna: cada texto distinto recebe um código"""
+
+    def __init__(self):
+        self.textos: List[str] = []
+        self._codigos: Dict[str, int] = {}
+
+    def codigo(self, texto: str) -> int:
+        try:
+            return self._codigos[texto]
+        except KeyError:
+            codigo = self._codigos[texto] = len(self.textos)
+            self.textos.append(texto)
+            return codigo
+
+    def __len__(self):
+        return len(self.textos)
+
+
+class VendaLinha:
+    """Visão de uma linha de `VendasColunares` com a interface de leitura de `Venda`"""
+
+    __slots__ = ('_colunas', '_indice')
+
+    def __init__(self, colunas: 'VendasColunares', indice: int):
+        self._colunas = colunas
+        self._indice = indice
+
+    def _categoria(self, coluna: str) -> str:
+        return self._colunas.categorias[coluna].textos[self._colunas.codigos[coluna][self._indice]]
+
+    @property
+    def vendedor(self) -> str:
+        return self._categoria('vendedor')
+
+    @property
+    def tipo_pagamento(self) -> str:
+        return self._categoria('tipo_pagamento')
+
+    @property
+    def detalhes_pagamento(self) -> str:
+        return self._categoria('detalhes_pagamento')
+
+    @property
+    def bandeira(self) -> str:
+        return self._categoria('bandeira')
+
+    @property
+    def valor_centavos(self) -> int:
+        return self._colunas.valores[self._indice]
+
+    @property
+    def valor(self) -> Decimal:
+        return Decimal(self.valor_centavos).scaleb(-2)
+
+    @property
+    def numero_boleta(self) -> str:
+        return self._colunas.boletas[self._indice]
+
+    @property
+    def troca(self) -> bool:
+        return self._colunas.eh_troca(self._indice)
+
+    @property
+    def momento(self) -> int:
+        return self._colunas.momentos[self._indice]
+
+    @property
+    def data(self) -> str:
+        return formatar_momento(self.momento)
+
+    @property
+    def id(self) -> str:
+        return self._colunas.ids[self._indice]
+
+    @property
+    def metodo(self) -> None:
+        # O catálogo de pagamentos não faz parte das colunas
+        return None
+
+    def para_venda(self) -> Venda:
+        return Venda(self.vendedor, self.tipo_pagamento, self.detalhes_pagamento, self.bandeira,
+                     self.valor, self.numero_boleta, self.troca, data=self.data, id=self.id)
+
+    def __repr__(self):
+        return f"VendaLinha({self._indice}, {self.id!r}, R$ {self.valor:.2f})"
+
+
+class VendasColunares:
+    """Vendas (somente inclusão) guardadas coluna a coluna"""
+
+    def __init__(self, vendas: Iterable[Venda] = ()):
+        self.categorias = {coluna: Categorias() for coluna in COLUNAS_CATEGORIA}
+        self.codigos = {coluna: array('I') for coluna in COLUNAS_CATEGORIA}
+        self.valores = array('q')
+        self.momentos = array('q')
+        self.trocas = bytearray()
+        self.boletas: List[str] = []
+        self.ids: List[str] = []
+        self.estender(vendas)
+
+    def adicionar(self, venda: Venda):
+        indice = len(self.valores)
+        for coluna in COLUNAS_CATEGORIA:
+            self.codigos[coluna].append(self.categorias[coluna].codigo(getattr(venda, coluna)))
+        self.valores.append(int(venda.valor.scaleb(2)))
+        self.momentos.append(segundos_desde_epoca(venda.data))
+        if indice % 8 == 0:
+            self.trocas.append(0)
+        if venda.troca:
+            self.trocas[indice >> 3] |= 1 << (indice & 7)
+        self.boletas.append(venda.numero_boleta)
+        self.ids.append(venda.id)
+
+    def estender(self, vendas: Iterable[Venda]):
+        for venda in vendas:
+            self.adicionar(venda)
+
+    def eh_troca(self, indice: int) -> bool:
+        return bool(self.trocas[indice >> 3] & (1 << (indice & 7)))
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __getitem__(self, indice: int) -> VendaLinha:
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return VendaLinha(self, indice)
+
+    def __iter__(self) -> Iterator[VendaLinha]:
+        for indice in range(len(self)):
+            yield VendaLinha(self, indice)
+
+    def tamanho_em_bytes(self) -> int:
+        """Memória ocupada pelas colunas numéricas e de códigos (sem boletas e ids)"""
+        colunas = [self.valores, self.momentos, *self.codigos.values()]
+        return sum(coluna.itemsize * len(coluna) for coluna in colunas) + len(self.trocas)
+
+    # Agregações
+
+    def _faixa(self, inicio: Optional[date], fim: Optional[date]) -> Optional[tuple]:
+        if inicio is None and fim is None:
+            return None
+        return (_segundos_do_dia(inicio) if inicio else None,
+                _segundos_do_dia(fim + timedelta(days=1)) if fim else None)
+
+    def _mascara_np(self, faixa: Optional[tuple]):
+        momentos = np.frombuffer(self.momentos, dtype=np.int64)
+        mascara = np.ones(len(momentos), dtype=bool)
+        if faixa is not None:
+            if faixa[0] is not None:
+                mascara &= momentos >= faixa[0]
+            if faixa[1] is not None:
+                mascara &= momentos < faixa[1]
+        return mascara
+
+    def _trocas_np(self):
+        bits = np.unpackbits(np.frombuffer(bytes(self.trocas), dtype=np.uint8), bitorder='little')
+        return bits[:len(self)].astype(bool)
+
+    def _somar_codigos(self, codigos: array, tamanho: int, faixa: Optional[tuple],
+                       somente_trocas: bool = False) -> List[tuple]:
+        """Soma e contagem por código: lista de (soma em centavos, quantidade)"""
+        if np is not None:
+            codigos_np = np.frombuffer(codigos, dtype=np.uint32) if isinstance(codigos, array) else codigos
+            mascara = self._mascara_np(faixa)
+            if somente_trocas:
+                mascara &= self._trocas_np()
+            selecionados = codigos_np[mascara]
+            valores = np.frombuffer(self.valores, dtype=np.int64)[mascara]
+            # Soma exata em int64 (bincount com pesos usaria float)
+            somas = np.zeros(tamanho, dtype=np.int64)
+            np.add.at(somas, selecionados, valores)
+            quantidades = np.bincount(selecionados, minlength=tamanho)
+            return list(zip(somas.tolist(), quantidades.tolist()))
+
+        somas = [0] * tamanho
+        quantidades = [0] * tamanho
+        if faixa is None and not somente_trocas:
+            for codigo, valor in zip(codigos, self.valores):
+                somas[codigo] += valor
+                quantidades[codigo] += 1
+            return list(zip(somas, quantidades))
+
+        inicio, fim = faixa if faixa is not None else (None, None)
+        for indice in (self._indices_troca() if somente_trocas else range(len(self))):
+            momento = self.momentos[indice]
+            if (inicio is not None and momento < inicio) or (fim is not None and momento >= fim):
+                continue
+            codigo = codigos[indice]
+            somas[codigo] += self.valores[indice]
+            quantidades[codigo] += 1
+        return list(zip(somas, quantidades))
+
+    def _indices_troca(self) -> Iterator[int]:
+        for posicao, byte in enumerate(self.trocas):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield (posicao << 3) | bit
+
+    def soma_por(self, coluna: str, inicio: Optional[date] = None, fim: Optional[date] = None) -> Dict[str, Decimal]:
+        """Total por vendedor, tipo_pagamento, detalhes_pagamento ou bandeira no período (datas inclusivas)"""
+        categorias = self.categorias[coluna]
+        totais = self._somar_codigos(self.codigos[coluna], len(categorias), self._faixa(inicio, fim))
+        return {
+            categorias.textos[codigo]: Decimal(soma).scaleb(-2)
+            for codigo, (soma, quantidade) in enumerate(totais) if quantidade
+        }
+
+    def resumir(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> dict:
+        """Mesmo dicionário de `agregados.resumir`, calculado sobre as colunas"""
+        faixa = self._faixa(inicio, fim)
+        tipos = self.categorias['tipo_pagamento']
+        detalhes = self.categorias['detalhes_pagamento']
+
+        # Tipo e detalhes combinados em um único código para a chave 'Cartão - Débito'
+        largura = max(1, len(detalhes))
+        if np is not None:
+            combinados = (np.frombuffer(self.codigos['tipo_pagamento'], dtype=np.uint32).astype(np.int64) * largura
+                          + np.frombuffer(self.codigos['detalhes_pagamento'], dtype=np.uint32))
+        else:
+            combinados = array('q', (tipo * largura + detalhe for tipo, detalhe in
+                                     zip(self.codigos['tipo_pagamento'], self.codigos['detalhes_pagamento'])))
+        por_tipo = {}
+        for codigo, (soma, quantidade) in enumerate(self._somar_codigos(combinados, len(tipos) * largura, faixa)):
+            if quantidade:
+                chave = chave_pagamento(tipos.textos[codigo // largura], detalhes.textos[codigo % largura])
+                por_tipo[chave] = por_tipo.get(chave, Decimal('0.00')) + Decimal(soma).scaleb(-2)
+
+        vendedores = self.categorias['vendedor']
+        geral = self._somar_codigos(self.codigos['vendedor'], len(vendedores), faixa)
+        trocas = self._somar_codigos(self.codigos['vendedor'], len(vendedores), faixa, somente_trocas=True)
+        por_bandeira = self.soma_por('bandeira', inicio, fim)
+        por_bandeira.pop("", None)
+        return {
+            'total': Decimal(sum(soma for soma, _ in geral)).scaleb(-2),
+            'quantidade': sum(quantidade for _, quantidade in geral),
+            'por_tipo': por_tipo,
+            'por_bandeira': por_bandeira,
+            'por_vendedor': {
+                vendedores.textos[codigo]: Decimal(soma).scaleb(-2)
+                for codigo, (soma, quantidade) in enumerate(geral) if quantidade
+            },
+            'total_trocas': Decimal(sum(soma for soma, _ in trocas)).scaleb(-2),
+            'quantidade_trocas': sum(quantidade for _, quantidade in trocas)
+        }
@@ -0,0 +1,388 @@
+"""
+Conciliação das vendas em cartão com os arquivos de liquidação das adquirentes.
+
+Cada arquivo CSV é lido em streaming e indexado em tabelas hash com chave
+(bandeira, modalidade, valor em centavos, bloco de tempo). A conciliação
+percorre as vendas uma vez só: para cada venda são consultados apenas os
+blocos vizinhos da mesma chave, em vez de comparar com todas as linhas.
+"""
+import re
+import csv
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vendas import Venda
+
+JANELA_PADRAO = 15 * 60  # segundos de tolerância entre o registro no caixa e a adquirente
+
+# Colunas de cada exportação, já normalizadas (minúsculas, sem acento, '_' vira espaço).
+# 'hora' é opcional: algumas adquirentes trazem data e hora na mesma coluna.
+LAYOUTS = {
+    "POS Rede": {
+        'data': ("data da venda", "data"),
+        'hora': ("hora da venda", "hora"),
+        'bandeira': ("bandeira",),
+        'modalidade': ("modalidade", "tipo"),
+        'valor': ("valor da venda", "valor bruto", "valor"),
+        'codigo': ("nsu", "nsu/cv", "numero do cv"),
+    },
+    "POS PagSeguro": {
+        'data': ("data transacao", "data da transacao", "data"),
+        'hora': ("hora transacao", "hora"),
+        'bandeira': ("bandeira", "instituicao financeira"),
+        'modalidade': ("meio pagamento", "forma de pagamento", "tipo pagamento"),
+        'valor': ("valor bruto", "valor original", "valor"),
+        'codigo': ("codigo transacao", "transacao id", "nsu"),
+    },
+    "POS Getnet": {
+        'data': ("data da venda", "data"),
+        'hora': ("hora da venda", "hora"),
+        'bandeira': ("bandeira",),
+        'modalidade': ("produto", "modalidade"),
+        'valor': ("valor da venda", "valor bruto", "valor"),
+        'codigo': ("nsu", "autorizacao"),
+    },
+}
+LAYOUTS["Link Rede"] = LAYOUTS["POS Rede"]
+
+CENTAVO = Decimal('0.01')
+# '1.234', '12.345.678' ou '1,234': só separadores de milhar, sem casas decimais
+_SO_MILHAR = re.compile(r'^-?[1-9]\d{0,2}(?:\.\d{3})+$|^-?[1-9]\d{0,2}(?:,\d{3}){2,}$')
+
+ALIASES_BANDEIRA = {
+    "VISA": "Visa", "VISAELECTRON": "Visa", "ELECTRON": "Visa",
+    "MASTER": "Mastercard", "MASTERCARD": "Mastercard", "MAESTRO": "Mastercard",
+    "ELO": "Elo",
+    "AMEX": "American Express", "AMERICANEXPRESS": "American Express",
+    "HIPER": "Hipercard", "HIPERCARD": "Hipercard",
+}
+
+
+def _sem_acento(texto: str) -> str:
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def _normalizar_coluna(nome: str) -> str:
+    return " ".join(_sem_acento(nome or "").lower().replace('_', ' ').split())
+
+
+_cache_bandeira: Dict[str, str] = {}
+_cache_modalidade: Dict[str, str] = {}
+
+
+def normalizar_bandeira(texto: str) -> str:
+    try:
+        return _cache_bandeira[texto]
+    except KeyError:
+        pass
+    chave = "".join(_sem_acento(texto).upper().split())
+    bandeira = ALIASES_BANDEIRA.get(chave)
+    if bandeira is None:
+        raise ValueError(f"Bandeira desconhecida: {texto!r}")
+    _cache_bandeira[texto] = bandeira
+    return bandeira
+
+
+def normalizar_modalidade(texto: str) -> str:
+    """'DÉBITO', 'Crédito à vista', 'Parcelado loja'... -> 'Débito' ou 'Crédito'"""
+    try:
+        return _cache_modalidade[texto]
+    except KeyError:
+        pass
+    chave = _sem_acento(texto).strip().upper()
+    if chave.startswith("DEB"):
+        modalidade = "Débito"
+    elif chave.startswith(("CRED", "PARC")):
+        modalidade = "Crédito"
+    else:
+        raise ValueError(f"Modalidade desconhecida: {texto!r}")
+    _cache_modalidade[texto] = modalidade
+    return modalidade
+
+
+def centavos(texto: str) -> int:
+    """
+    'R$ 1.234,56', '1234.56', '1,234.56' ou '1.234' (milhar) -> centavos.
+    O último separador é o decimal, a não ser que só separe grupos de
+    milhar; mais de duas casas decimais é valor inválido, não arredondado.
+    """
+    limpo = texto.replace("R$", "").replace("\xa0", "").replace(" ", "")
+    if _SO_MILHAR.match(limpo):
+        limpo = limpo.replace('.', '').replace(',', '')
+    elif limpo.rfind(',') > limpo.rfind('.'):
+        limpo = limpo.replace('.', '').replace(',', '.')
+    else:
+        limpo = limpo.replace(',', '')
+    try:
+        valor = Decimal(limpo)
+        if valor != valor.quantize(CENTAVO):
+            raise InvalidOperation
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {texto.strip()!r}")
+    return int(valor * 100)
+
+
+def segundos(data: str, hora: str = "") -> int:
+    """
+    Converte 'dd/mm/aaaa[ hh:mm[:ss]]' ou 'aaaa-mm-dd[ hh:mm[:ss]]' em segundos
+    (horário local, sem fuso). Fatiar a string é bem mais rápido que strptime.
+    """
+    data = data.strip()
+    if hora:
+        data = f"{data} {hora.strip()}"
+    try:
+        if data[4] == '-':
+            ano, mes, dia = int(data[0:4]), int(data[5:7]), int(data[8:10])
+        else:
+            dia, mes, ano = int(data[0:2]), int(data[3:5]), int(data[6:10])
+        horario = data[11:].split(':') if len(data) > 10 else []
+        h = int(horario[0]) if horario else 0
+        m = int(horario[1]) if len(horario) > 1 else 0
+        s = int(horario[2][:2]) if len(horario) > 2 else 0
+        return date(ano, mes, dia).toordinal() * 86400 + h * 3600 + m * 60 + s
+    except (IndexError, ValueError):
+        raise ValueError(f"Data inválida: {data!r}")
+
+
+@dataclass(eq=False)
+class Liquidacao:
+    """Uma linha do arquivo de liquidação de uma adquirente"""
+    adquirente: str
+    linha: int
+    momento: int
+    bandeira: str
+    modalidade: str
+    valor_centavos: int
+    codigo: str = ""
+    usada: bool = False
+
+    @property
+    def valor(self) -> Decimal:
+        return Decimal(self.valor_centavos) / 100
+
+
+def _colunas_do_layout(cabecalho: List[str], layout: dict) -> Dict[str, Optional[int]]:
+    normalizado = [_normalizar_coluna(nome) for nome in cabecalho]
+    posicoes = {}
+    for campo, nomes in layout.items():
+        posicoes[campo] = next((normalizado.index(nome) for nome in nomes if nome in normalizado), None)
+    faltando = [campo for campo, posicao in posicoes.items()
+                if posicao is None and campo not in ('hora', 'codigo')]
+    if faltando:
+        raise ValueError(f"Colunas não encontradas no arquivo: {', '.join(faltando)}")
+    return posicoes
+
+
+def ler_liquidacoes(caminho: str, adquirente: str,
+                    erros: Optional[List[Tuple[int, str]]] = None) -> Iterator[Liquidacao]:
+    """
+    Lê o CSV da adquirente linha a linha. Linhas inválidas não interrompem a
+    leitura: vão para `erros` como (número da linha, mensagem).
+    """
+    if adquirente not in LAYOUTS:
+        raise ValueError(f"Adquirente sem layout cadastrado: {adquirente}")
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as file:
+        amostra = file.read(4096)
+        file.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+            leitor = csv.reader(file, dialeto)
+        except csv.Error:
+            # Uma linha incompleta na amostra engana o Sniffer; o cabeçalho
+            # só tem nomes de coluna, então o separador mais frequente nele vale
+            cabecalho = amostra.split('\n', 1)[0]
+            leitor = csv.reader(file, csv.excel, delimiter=max(',;\t', key=cabecalho.count))
+        posicoes = _colunas_do_layout(next(leitor, []), LAYOUTS[adquirente])
+        p_data, p_hora = posicoes['data'], posicoes['hora']
+        p_bandeira, p_modalidade = posicoes['bandeira'], posicoes['modalidade']
+        p_valor, p_codigo = posicoes['valor'], posicoes['codigo']
+
+        for linha in leitor:
+            if not linha:
+                continue
+            try:
+                yield Liquidacao(
+                    adquirente=adquirente,
+                    linha=leitor.line_num,
+                    momento=segundos(linha[p_data], linha[p_hora] if p_hora is not None else ""),
+                    bandeira=normalizar_bandeira(linha[p_bandeira]),
+                    modalidade=normalizar_modalidade(linha[p_modalidade]),
+                    valor_centavos=centavos(linha[p_valor]),
+                    codigo=linha[p_codigo].strip() if p_codigo is not None else ""
+                )
+            except (IndexError, ValueError) as e:
+                if erros is not None:
+                    erros.append((leitor.line_num, str(e) if not isinstance(e, IndexError) else "Linha incompleta"))
+
+
+class IndiceLiquidacoes:
+    """
+    Liquidações indexadas por (bandeira, modalidade, valor, bloco de tempo) e,
+    para achar valores divergentes, por (bandeira, modalidade, bloco). Cada
+    bloco cobre `janela` segundos; uma busca olha o bloco do momento e os
+    dois vizinhos, então qualquer liquidação a até `janela` segundos é vista.
+    """
+
+    def __init__(self, janela: int = JANELA_PADRAO):
+        self.janela = janela
+        self.liquidacoes: List[Liquidacao] = []
+        self.erros: Dict[str, List[Tuple[int, str]]] = {}
+        self._por_valor: Dict[tuple, List[Liquidacao]] = {}
+        self._por_bloco: Dict[tuple, List[Liquidacao]] = {}
+
+    def adicionar(self, liquidacao: Liquidacao):
+        bloco = liquidacao.momento // self.janela
+        chave = (liquidacao.bandeira, liquidacao.modalidade)
+        self._por_valor.setdefault(chave + (liquidacao.valor_centavos, bloco), []).append(liquidacao)
+        self._por_bloco.setdefault(chave + (bloco,), []).append(liquidacao)
+        self.liquidacoes.append(liquidacao)
+
+    def carregar(self, caminho: str, adquirente: str) -> int:
+        """Indexa um arquivo; devolve quantas linhas válidas foram lidas"""
+        erros = self.erros.setdefault(caminho, [])
+        antes = len(self.liquidacoes)
+        for liquidacao in ler_liquidacoes(caminho, adquirente, erros):
+            self.adicionar(liquidacao)
+        return len(self.liquidacoes) - antes
+
+    def _mais_proxima(self, tabela: Dict[tuple, List[Liquidacao]], chave: tuple, momento: int,
+                      usadas: bool = False) -> Optional[Liquidacao]:
+        melhor = None
+        menor_distancia = self.janela + 1
+        bloco = momento // self.janela
+        for vizinho in (bloco - 1, bloco, bloco + 1):
+            for liquidacao in tabela.get(chave + (vizinho,), ()):
+                distancia = abs(liquidacao.momento - momento)
+                if liquidacao.usada == usadas and distancia < menor_distancia:
+                    melhor, menor_distancia = liquidacao, distancia
+        return melhor
+
+    def buscar(self, bandeira: str, modalidade: str, valor_centavos: int, momento: int,
+               usadas: bool = False) -> Optional[Liquidacao]:
+        """Liquidação de mesmo valor mais próxima no tempo (livre, ou já usada com `usadas`)"""
+        return self._mais_proxima(self._por_valor, (bandeira, modalidade, valor_centavos), momento, usadas)
+
+    def buscar_divergente(self, bandeira: str, modalidade: str, momento: int) -> Optional[Liquidacao]:
+        """Liquidação livre de qualquer valor mais próxima no tempo"""
+        return self._mais_proxima(self._por_bloco, (bandeira, modalidade), momento)
+
+    def sobras(self) -> List[Liquidacao]:
+        return [liquidacao for liquidacao in self.liquidacoes if not liquidacao.usada]
+
+
+@dataclass
+class ResultadoConciliacao:
+    conciliadas: List[Tuple[Venda, Liquidacao]] = field(default_factory=list)
+    valor_divergente: List[Tuple[Venda, Liquidacao]] = field(default_factory=list)
+    # Venda cuja liquidação já foi casada com outra venda igual (provável lançamento em dobro)
+    duplicadas: List[Tuple[Venda, Liquidacao]] = field(default_factory=list)
+    sem_liquidacao: List[Venda] = field(default_factory=list)
+    liquidacoes_sem_venda: List[Liquidacao] = field(default_factory=list)
+    invalidas: List[Tuple[Venda, str]] = field(default_factory=list)
+
+
+def _chave_venda(venda: Venda) -> Tuple[str, str, int, int]:
+    return (
+        normalizar_bandeira(venda.bandeira),
+        normalizar_modalidade(venda.detalhes_pagamento),
+        int(venda.valor * 100),
+        segundos(venda.data)
+    )
+
+
+def conciliar(vendas: Iterable[Venda], indice: IndiceLiquidacoes) -> ResultadoConciliacao:
+    """
+    Casa as vendas em cartão com as liquidações do índice. Primeiro passo:
+    valor exato dentro da janela; segundo passo, só com as vendas que
+    sobraram: mesma bandeira e modalidade com valor diferente. Os dois passos
+    são lineares no número de vendas.
+    """
+    resultado = ResultadoConciliacao()
+    pendentes = []
+
+    for venda in vendas:
+        if venda.tipo_pagamento != "Cartão":
+            continue
+        try:
+            bandeira, modalidade, valor, momento = _chave_venda(venda)
+        except ValueError as e:
+            resultado.invalidas.append((venda, str(e)))
+            continue
+        liquidacao = indice.buscar(bandeira, modalidade, valor, momento)
+        if liquidacao is not None:
+            liquidacao.usada = True
+            resultado.conciliadas.append((venda, liquidacao))
+            continue
+        ja_usada = indice.buscar(bandeira, modalidade, valor, momento, usadas=True)
+        if ja_usada is not None:
+            resultado.duplicadas.append((venda, ja_usada))
+        else:
+            pendentes.append((venda, bandeira, modalidade, momento))
+
+    for venda, bandeira, modalidade, momento in pendentes:
+        liquidacao = indice.buscar_divergente(bandeira, modalidade, momento)
+        if liquidacao is not None:
+            liquidacao.usada = True
+            resultado.valor_divergente.append((venda, liquidacao))
+        else:
+            resultado.sem_liquidacao.append(venda)
+
+    resultado.liquidacoes_sem_venda = indice.sobras()
+    return resultado
+
+
+def _descrever_venda(venda: Venda) -> str:
+    return (f"{venda.data} | Boleta {venda.numero_boleta} | {venda.vendedor} | "
+            f"{venda.bandeira} {venda.detalhes_pagamento} | R$ {venda.valor:.2f}")
+
+
+def _descrever_liquidacao(liquidacao: Liquidacao) -> str:
+    codigo = f" | NSU {liquidacao.codigo}" if liquidacao.codigo else ""
+    return (f"{liquidacao.adquirente} linha {liquidacao.linha} | {liquidacao.bandeira} "
+            f"{liquidacao.modalidade} | R$ {liquidacao.valor:.2f}{codigo}")
+
+
+def linhas_conciliacao(resultado: ResultadoConciliacao,
+                       erros: Optional[Dict[str, List[Tuple[int, str]]]] = None) -> Iterator[str]:
+    """Texto do relatório de conciliação, no mesmo estilo do relatório detalhado"""
+    yield "CONCILIAÇÃO DE CARTÕES\n"
+    yield "=" * 50 + "\n"
+    yield f"Conciliadas: {len(resultado.conciliadas)}\n"
+    yield f"Valor divergente: {len(resultado.valor_divergente)}\n"
+    yield f"Duplicadas: {len(resultado.duplicadas)}\n"
+    yield f"Sem liquidação: {len(resultado.sem_liquidacao)}\n"
+    yield f"Liquidações sem venda: {len(resultado.liquidacoes_sem_venda)}\n"
+
+    if resultado.valor_divergente:
+        yield "\nVALOR DIVERGENTE:\n"
+        for venda, liquidacao in resultado.valor_divergente:
+            yield f"- {_descrever_venda(venda)}\n  adquirente: {_descrever_liquidacao(liquidacao)}\n"
+
+    if resultado.duplicadas:
+        yield "\nVENDAS DUPLICADAS:\n"
+        for venda, liquidacao in resultado.duplicadas:
+            yield f"- {_descrever_venda(venda)}\n  já conciliada com: {_descrever_liquidacao(liquidacao)}\n"
+
+    if resultado.sem_liquidacao:
+        yield "\nVENDAS SEM LIQUIDAÇÃO:\n"
+        for venda in resultado.sem_liquidacao:
+            yield f"- {_descrever_venda(venda)}\n"
+
+    if resultado.liquidacoes_sem_venda:
+        yield "\nLIQUIDAÇÕES SEM VENDA:\n"
+        for liquidacao in resultado.liquidacoes_sem_venda:
+            yield f"- {_descrever_liquidacao(liquidacao)}\n"
+
+    if resultado.invalidas:
+        yield "\nVENDAS NÃO CONCILIÁVEIS:\n"
+        for venda, motivo in resultado.invalidas:
+            yield f"- {_descrever_venda(venda)}: {motivo}\n"
+
+    for caminho, linhas in (erros or {}).items():
+        if linhas:
+            yield f"\nLINHAS IGNORADAS EM {caminho}:\n"
+            for numero, mensagem in linhas:
+                yield f"- linha {numero}: {mensagem}\n"
@@ -0,0 +1,483 @@
+"""
+Exportação das vendas e dos totais do relatório para CSV, XLSX e PDF.
+
+As vendas chegam em lotes (num período, um dia de cada vez) e cada linha vai
+direto para o arquivo; só os totais por vendedor (`ResumoIncremental`) ficam
+em memória, então um ano inteiro exporta com a memória de um dia. O arquivo
+é gravado com um nome provisório e só recebe o nome final no fim: uma
+exportação cancelada ou com erro não deixa arquivo pela metade.
+
+Duas planilhas, nas seções do relatório detalhado:
+- "Vendas": uma linha por venda;
+- "Resumo": total, por tipo de pagamento, por bandeira e trocas, por vendedor e geral.
+
+No CSV cada planilha é um arquivo (`relatorio.csv` e `relatorio_resumo.csv`),
+separado por ';' e com vírgula decimal, como o Excel em português espera.
+O XLSX é montado com zipfile (sem dependências) e o PDF com um gravador
+mínimo de texto em Courier.
+"""
+import os
+import re
+import csv
+import zlib
+import zipfile
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from vendas import Venda
+from agregados import ResumoIncremental
+from armazenamento import FORMATO_DATA, VendaRepository
+
+FORMATOS = ('.csv', '.xlsx', '.pdf')
+TAMANHO_LOTE = 1000
+COLUNAS_VENDAS = ("Data/Hora", "Vendedor", "Pagamento", "Detalhes", "Bandeira", "Valor", "Boleta", "Troca", "Id")
+# Larguras em caracteres (colunas do XLSX e do PDF; o PDF não mostra o id)
+LARGURAS_VENDAS = (19, 10, 9, 14, 12, 11, 12, 5, 26)
+COLUNAS_RESUMO = ("Vendedor", "Seção", "Item", "Valor")
+LARGURAS_RESUMO = (16, 18, 30, 14)
+# Rótulo da seção com todas as vendas no resumo; não é chave de vendedor, que pode se chamar assim
+TODOS = "Todos"
+
+
+class ExportacaoCancelada(Exception):
+    """A exportação foi interrompida por quem a pediu"""
+
+
+# Fontes de vendas
+
+def lotes_da_lista(vendas: Sequence[Venda], tamanho: int = TAMANHO_LOTE) -> Tuple[Iterator[List[Venda]], int]:
+    """(lotes, quantidade de lotes) de uma lista já em memória"""
+    quantidade = (len(vendas) + tamanho - 1) // tamanho
+    return (list(vendas[inicio:inicio + tamanho]) for inicio in range(0, len(vendas), tamanho)), quantidade
+
+
+def lotes_do_periodo(repositorio: VendaRepository, inicio: date, fim: date,
+                     vendas_do_dia: Optional[Iterable[Venda]] = None) -> Tuple[Iterator[List[Venda]], int]:
+    """
+    (lotes, quantidade de lotes) com um dia por lote, lido só quando o lote é
+    consumido. `vendas_do_dia` substitui o dia aberto no repositório (as vendas
+    em memória da janela).
+    """
+    dias = set(repositorio.dias(inicio, fim))
+    if vendas_do_dia is not None and inicio <= repositorio.dia <= fim:
+        dias.add(repositorio.dia)
+    dias = sorted(dias)
+
+    def lotes():
+        for dia in dias:
+            if vendas_do_dia is not None and dia == repositorio.dia:
+                yield list(vendas_do_dia)
+            else:
+                yield list(repositorio.buscar(dia, dia))
+
+    return lotes(), len(dias)
+
+
+# Gravadores
+
+def _data_hora(data: str) -> datetime:
+    """'dd/mm/aaaa hh:mm:ss' sem strptime, que é o passo mais caro por venda"""
+    return datetime(int(data[6:10]), int(data[3:5]), int(data[0:2]),
+                    int(data[11:13]), int(data[14:16]), int(data[17:19]))
+
+
+def _texto(valor) -> str:
+    if isinstance(valor, Decimal):
+        return f"{valor:.2f}"
+    if isinstance(valor, datetime):
+        return valor.strftime(FORMATO_DATA)
+    return str(valor)
+
+
+class _Provisorio:
+    """Arquivos gravados com sufixo provisório e renomeados só ao confirmar"""
+
+    def __init__(self):
+        self.caminhos: List[str] = []
+
+    def criar(self, caminho: str) -> str:
+        self.caminhos.append(caminho)
+        return caminho + '.parcial'
+
+    def confirmar(self):
+        for caminho in self.caminhos:
+            os.replace(caminho + '.parcial', caminho)
+
+    def descartar(self):
+        for caminho in self.caminhos:
+            if os.path.exists(caminho + '.parcial'):
+                os.remove(caminho + '.parcial')
+
+
+class EscritorCSV:
+    """Uma planilha por arquivo: a primeira no caminho pedido, as outras com o nome dela como sufixo"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._provisorio = _Provisorio()
+        self._arquivo = None
+        self._csv = None
+
+    def planilha(self, nome: str, colunas: Sequence[str], larguras: Sequence[int] = ()):
+        self._fechar_arquivo()
+        caminho = self.caminho
+        if self._provisorio.caminhos:
+            base, extensao = os.path.splitext(self.caminho)
+            sufixo = re.sub(r'\W+', '_', nome.lower())
+            caminho = f"{base}_{sufixo}{extensao}"
+        # BOM para o Excel reconhecer UTF-8 (acentos)
+        self._arquivo = open(self._provisorio.criar(caminho), 'w', newline='', encoding='utf-8-sig')
+        self._csv = csv.writer(self._arquivo, delimiter=';')
+        self._csv.writerow(colunas)
+
+    def linha(self, valores: Sequence):
+        self._csv.writerow([_texto(valor).replace('.', ',') if isinstance(valor, Decimal) else _texto(valor)
+                            for valor in valores])
+
+    def _fechar_arquivo(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def fechar(self):
+        self._fechar_arquivo()
+        self._provisorio.confirmar()
+
+    def descartar(self):
+        self._fechar_arquivo()
+        self._provisorio.descartar()
+
+
+_CONTROLE_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_NOME_PLANILHA_INVALIDO = re.compile(r'[\[\]:*?/\\]')
+# 30/12/1899 é o dia 0 das datas do Excel
+_ORDINAL_EXCEL = date(1899, 12, 30).toordinal()
+
+_ESTILOS_XLSX = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class EscritorXLSX:
+    """
+    Pasta de trabalho gravada enquanto as linhas chegam: cada planilha é uma
+    entrada do zip escrita em sequência, com textos inline (sem a tabela de
+    textos compartilhados, que exigiria todos os textos em memória).
+    """
+
+    LIMITE_LINHAS = 1048576
+    TAMANHO_BUFFER = 256
+
+    def __init__(self, caminho: str):
+        self._provisorio = _Provisorio()
+        self._zip = zipfile.ZipFile(self._provisorio.criar(caminho), 'w', zipfile.ZIP_DEFLATED)
+        self._planilhas: List[str] = []
+        self._entrada = None
+        self._buffer: List[str] = []
+        self._nome = ""
+        self._colunas: Sequence[str] = ()
+        self._larguras: Sequence[int] = ()
+        self._referencias: List[str] = []
+        self._linha = 0
+        self._parte = 1
+
+    def planilha(self, nome: str, colunas: Sequence[str], larguras: Sequence[int] = ()):
+        self._nome, self._colunas, self._larguras, self._parte = nome, colunas, larguras, 1
+        self._referencias = [chr(ord('A') + indice) for indice in range(len(colunas))]
+        self._abrir_planilha(nome)
+
+    def _abrir_planilha(self, nome: str):
+        self._fechar_planilha()
+        nome = _NOME_PLANILHA_INVALIDO.sub('_', nome)[:31]
+        self._planilhas.append(nome)
+        self._entrada = self._zip.open(f"xl/worksheets/sheet{len(self._planilhas)}.xml", 'w', force_zip64=True)
+        self._buffer.append(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+            '</sheetView></sheetViews>')
+        if self._larguras:
+            self._buffer.append("<cols>" + "".join(
+                f'<col min="{indice}" max="{indice}" width="{largura + 2}" customWidth="1"/>'
+                for indice, largura in enumerate(self._larguras, 1)) + "</cols>")
+        self._buffer.append("<sheetData>")
+        self._linha = 0
+        self._escrever_linha(self._colunas, estilo_texto=' s="3"')
+
+    def _escrever_linha(self, valores: Sequence, estilo_texto: str = ""):
+        self._linha += 1
+        celulas = []
+        for referencia, valor in zip(self._referencias, valores):
+            posicao = f'{referencia}{self._linha}'
+            if isinstance(valor, Decimal):
+                celulas.append(f'<c r="{posicao}" s="1"><v>{valor}</v></c>')
+            elif isinstance(valor, datetime):
+                serial = (valor.toordinal() - _ORDINAL_EXCEL
+                          + (valor.hour * 3600 + valor.minute * 60 + valor.second) / 86400)
+                celulas.append(f'<c r="{posicao}" s="2"><v>{serial!r}</v></c>')
+            elif valor != "":
+                texto = escape(_CONTROLE_XML.sub('', str(valor)))
+                celulas.append(f'<c r="{posicao}" t="inlineStr"{estilo_texto}>'
+                               f'<is><t xml:space="preserve">{texto}</t></is></c>')
+        self._buffer.append(f'<row r="{self._linha}">{"".join(celulas)}</row>')
+        if len(self._buffer) >= self.TAMANHO_BUFFER:
+            self._descarregar()
+
+    def linha(self, valores: Sequence):
+        if self._linha >= self.LIMITE_LINHAS:
+            # O Excel não abre planilhas maiores: continua numa nova, com o mesmo cabeçalho
+            self._parte += 1
+            self._abrir_planilha(f"{self._nome} ({self._parte})")
+        self._escrever_linha(valores)
+
+    def _descarregar(self):
+        self._entrada.write("".join(self._buffer).encode('utf-8'))
+        self._buffer = []
+
+    def _fechar_planilha(self):
+        if self._entrada is not None:
+            self._buffer.append("</sheetData></worksheet>")
+            self._descarregar()
+            self._entrada.close()
+            self._entrada = None
+
+    def fechar(self):
+        self._fechar_planilha()
+        planilhas = range(1, len(self._planilhas) + 1)
+        self._zip.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{numero}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for numero in planilhas)
+            + '</Types>'))
+        self._zip.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+        self._zip.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="{escape(nome, {chr(34): "&quot;"})}" sheetId="{numero}" r:id="rId{numero}"/>'
+                      for numero, nome in zip(planilhas, self._planilhas))
+            + '</sheets></workbook>'))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{numero}" Type="http://schemas.openxmlformats.org/officeDocument/'
+                      f'2006/relationships/worksheet" Target="worksheets/sheet{numero}.xml"/>' for numero in planilhas)
+            + f'<Relationship Id="rId{len(self._planilhas) + 1}" Type="http://schemas.openxmlformats.org/'
+              'officeDocument/2006/relationships/styles" Target="styles.xml"/></Relationships>'))
+        self._zip.writestr("xl/styles.xml", _ESTILOS_XLSX)
+        self._zip.close()
+        self._provisorio.confirmar()
+
+    def descartar(self):
+        if self._entrada is not None:
+            self._entrada.close()
+            self._entrada = None
+        self._zip.close()
+        self._provisorio.descartar()
+
+
+class EscritorPDF:
+    """
+    PDF de texto em Courier 8 (A4 retrato, 77 linhas por página). Cada página
+    é gravada assim que enche; só os deslocamentos dos objetos ficam em
+    memória para a tabela xref do fim do arquivo.
+    """
+
+    LARGURA, ALTURA, MARGEM = 595, 842, 36
+    CORPO, ENTRELINHA = 8, 10
+    LINHAS_POR_PAGINA = (ALTURA - 2 * MARGEM) // ENTRELINHA - 2
+
+    def __init__(self, caminho: str, titulo: str = ""):
+        self._provisorio = _Provisorio()
+        self._arquivo = open(self._provisorio.criar(caminho), 'wb')
+        self._titulo = titulo
+        self._deslocamentos: Dict[int, int] = {}
+        self._paginas: List[int] = []
+        self._proximo = 5  # 1: catálogo, 2: páginas, 3 e 4: fontes
+        self._linhas: List[Tuple[str, bool]] = []
+        self._cabecalho: List[Tuple[str, bool]] = []
+        self._larguras: Sequence[int] = ()
+        self._arquivo.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for numero, fonte in ((3, b"Courier"), (4, b"Courier-Bold")):
+            self._objeto(numero, b"<< /Type /Font /Subtype /Type1 /BaseFont /" + fonte
+                         + b" /Encoding /WinAnsiEncoding >>")
+
+    def _objeto(self, numero: int, conteudo: bytes):
+        self._deslocamentos[numero] = self._arquivo.tell()
+        self._arquivo.write(b"%d 0 obj\n" % numero + conteudo + b"\nendobj\n")
+
+    def _reservar(self) -> int:
+        self._proximo += 1
+        return self._proximo - 1
+
+    def _formatar(self, valores: Sequence) -> str:
+        partes = []
+        for valor, largura in zip(valores, self._larguras):
+            texto = _texto(valor)[:largura]
+            partes.append(texto.rjust(largura) if isinstance(valor, Decimal) else texto.ljust(largura))
+        return " ".join(partes).rstrip()
+
+    def planilha(self, nome: str, colunas: Sequence[str], larguras: Sequence[int] = ()):
+        # O id não cabe na largura da página
+        self._larguras = [largura for coluna, largura in zip(colunas, larguras) if coluna != "Id"]
+        if self._linhas:
+            self._fechar_pagina()
+        self._cabecalho = [(f"{self._titulo} - {nome}" if self._titulo else nome, True),
+                           (self._formatar(colunas), True)]
+
+    def linha(self, valores: Sequence):
+        if not self._linhas:
+            self._linhas.extend(self._cabecalho)
+        self._linhas.append((self._formatar(valores), False))
+        if len(self._linhas) >= self.LINHAS_POR_PAGINA:
+            self._fechar_pagina()
+
+    @staticmethod
+    def _literal(texto: str) -> bytes:
+        bruto = texto.encode('cp1252', 'replace')
+        return b"(" + bruto.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def _fechar_pagina(self):
+        numero_pagina = len(self._paginas) + 1
+        comandos = [b"BT /F1 %d Tf %d TL %d %d Td" % (self.CORPO, self.ENTRELINHA, self.MARGEM,
+                                                       self.ALTURA - self.MARGEM)]
+        negrito = False
+        for texto, destaque in self._linhas:
+            if destaque != negrito:
+                comandos.append(b"/F%d %d Tf" % (2 if destaque else 1, self.CORPO))
+                negrito = destaque
+            comandos.append(self._literal(texto) + b" Tj T*")
+        comandos.append(b"ET BT /F1 %d Tf %d %d Td %s Tj ET" % (
+            self.CORPO, self.LARGURA - self.MARGEM - 60, self.MARGEM // 2, self._literal(f"Página {numero_pagina}")))
+        fluxo = zlib.compress(b"\n".join(comandos))
+
+        conteudo = self._reservar()
+        self._objeto(conteudo, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(fluxo)
+                     + fluxo + b"\nendstream")
+        pagina = self._reservar()
+        self._objeto(pagina, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                             b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+                     % (self.LARGURA, self.ALTURA, conteudo))
+        self._paginas.append(pagina)
+        self._linhas = []
+
+    def fechar(self):
+        if self._linhas or not self._paginas:
+            if not self._linhas:
+                self._linhas.extend(self._cabecalho)
+            self._fechar_pagina()
+        self._objeto(2, b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                     % (b" ".join(b"%d 0 R" % pagina for pagina in self._paginas), len(self._paginas)))
+        self._objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        inicio_xref = self._arquivo.tell()
+        self._arquivo.write(b"xref\n0 %d\n0000000000 65535 f \n" % self._proximo)
+        for numero in range(1, self._proximo):
+            self._arquivo.write(b"%010d 00000 n \n" % self._deslocamentos[numero])
+        self._arquivo.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                            % (self._proximo, inicio_xref))
+        self._arquivo.close()
+        self._provisorio.confirmar()
+
+    def descartar(self):
+        self._arquivo.close()
+        self._provisorio.descartar()
+
+
+def criar_escritor(caminho: str, titulo: str = ""):
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao == '.csv':
+        return EscritorCSV(caminho)
+    if extensao == '.xlsx':
+        return EscritorXLSX(caminho)
+    if extensao == '.pdf':
+        return EscritorPDF(caminho, titulo)
+    raise ValueError(f"Formato de exportação desconhecido: '{extensao}'. Use {', '.join(FORMATOS)}.")
+
+
+# Conteúdo
+
+def _linha_venda(venda: Venda) -> tuple:
+    return (_data_hora(venda.data), venda.vendedor, venda.tipo_pagamento, venda.detalhes_pagamento,
+            venda.bandeira, venda.valor, venda.numero_boleta, "Sim" if venda.troca else "Não", venda.id)
+
+
+def linhas_resumo(por_vendedor: Dict[str, ResumoIncremental], geral: ResumoIncremental) -> Iterator[tuple]:
+    """
+    Seções do relatório detalhado (total, tipo de pagamento, bandeira, trocas)
+    por vendedor, em ordem alfabética, e por fim as de todas as vendas
+    """
+    secoes = [(vendedor, resumo) for vendedor, resumo in sorted(por_vendedor.items())] + [(TODOS, geral)]
+    for vendedor, resumo in secoes:
+        yield vendedor, "Total", f"{resumo.quantidade} venda(s)", resumo.total
+        for tipo, valor in sorted(resumo.por_tipo.items()):
+            yield vendedor, "Tipo de pagamento", tipo, valor
+        for bandeira, valor in sorted(resumo.por_bandeira.items()):
+            yield vendedor, "Bandeira", bandeira, valor
+        if resumo.quantidade_trocas:
+            yield vendedor, "Trocas", f"{resumo.quantidade_trocas} troca(s)", resumo.total_trocas
+
+
+def exportar(caminho: str, lotes: Iterable[Iterable[Venda]], total_lotes: Optional[int] = None,
+             titulo: str = "", progresso: Optional[Callable[[int, Optional[int]], None]] = None,
+             cancelar: Optional[threading.Event] = None) -> int:
+    """
+    Grava as vendas dos `lotes` e os totais em `caminho` (formato pela
+    extensão). `progresso(lotes_feitos, total_lotes)` é chamado a cada lote;
+    com `cancelar` ligado, para no próximo lote com `ExportacaoCancelada`.
+    Devolve a quantidade de vendas exportadas.
+    """
+    escritor = criar_escritor(caminho, titulo)
+    geral = ResumoIncremental()
+    por_vendedor: Dict[str, ResumoIncremental] = {}
+    try:
+        escritor.planilha("Vendas", COLUNAS_VENDAS, LARGURAS_VENDAS)
+        for feitos, lote in enumerate(lotes, 1):
+            for venda in lote:
+                escritor.linha(_linha_venda(venda))
+                geral.adicionar(venda)
+                resumo = por_vendedor.get(venda.vendedor)
+                if resumo is None:
+                    resumo = por_vendedor[venda.vendedor] = ResumoIncremental()
+                resumo.adicionar(venda)
+            if cancelar is not None and cancelar.is_set():
+                raise ExportacaoCancelada("Exportação cancelada.")
+            if progresso is not None:
+                progresso(feitos, total_lotes)
+
+        escritor.planilha("Resumo", COLUNAS_RESUMO, LARGURAS_RESUMO)
+        for linha in linhas_resumo(por_vendedor, geral):
+            escritor.linha(linha)
+    except BaseException:
+        escritor.descartar()
+        raise
+    escritor.fechar()
+    return geral.quantidade
@@ -0,0 +1,162 @@
+"""
+Fechamento do caixa no fim do dia.
+
+A conferência compara o que foi contado (dinheiro na gaveta, PIX no extrato,
+o total de cada terminal de cartão) com os totais do `ResumoIncremental`,
+sem percorrer as vendas. Ao fechar, o repositório congela o dia
+(`armazenamento.DiaFechado` nos arquivos, `DiaFechadoSqlite` no banco) e a
+conferência vai para
+`fechamento_AAAAMMDD.json` com o SHA-256 das vendas congeladas; alterações
+feitas depois disso entram no registro de correções do dia.
+
+As vendas em cartão não guardam o terminal, então os terminais são
+conferidos juntos: o contado da conta 'Cartão' é a soma deles.
+"""
+import os
+import json
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from agregados import ResumoIncremental
+from armazenamento import gravar_atomico
+
+VERSAO_FECHAMENTO = 1
+CONTA_DINHEIRO = "Dinheiro"
+CONTA_CARTAO = "Cartão"
+# Trocas não entram no caixa: ficam fora da conferência
+TIPO_TROCA = "Troca"
+ZERO = Decimal('0.00')
+
+
+@dataclass(frozen=True)
+class Conferencia:
+    conta: str
+    esperado: Decimal
+    contado: Decimal
+
+    @property
+    def diferenca(self) -> Decimal:
+        return self.contado - self.esperado
+
+
+def ler_valor_contado(texto: str) -> Decimal:
+    """'1.234,50', '1234.50' ou vazio (zero)"""
+    texto = (texto or "").strip().replace("R$", "").strip()
+    if not texto:
+        return ZERO
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = Decimal(texto).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Valor contado inválido: {texto!r}") from None
+    if valor < 0:
+        raise ValueError(f"Valor contado inválido: {texto!r}")
+    return valor
+
+
+def esperado_por_conta(resumo: ResumoIncremental) -> Dict[str, Decimal]:
+    """Totais do sistema por tipo de pagamento, a partir das chaves de `por_tipo`"""
+    contas = {CONTA_DINHEIRO: ZERO}
+    for chave, valor in resumo.por_tipo.items():
+        tipo = chave.split(" - ", 1)[0]
+        if tipo != TIPO_TROCA:
+            contas[tipo] = contas.get(tipo, ZERO) + valor
+    return contas
+
+
+def conferir(esperado: Dict[str, Decimal], contado: Dict[str, Decimal],
+             terminais: Optional[Dict[str, Decimal]] = None) -> List[Conferencia]:
+    """Uma linha por conta, Dinheiro primeiro; com `terminais`, o contado de 'Cartão' é a soma deles"""
+    contado = dict(contado)
+    if terminais:
+        contado[CONTA_CARTAO] = sum(terminais.values(), ZERO)
+    contas = sorted(set(esperado) | set(contado), key=lambda conta: (conta != CONTA_DINHEIRO, conta))
+    return [Conferencia(conta, esperado.get(conta, ZERO), contado.get(conta, ZERO)) for conta in contas]
+
+
+@dataclass
+class Fechamento:
+    dia: date
+    fechado_em: str
+    conferencias: List[Conferencia]
+    terminais: Dict[str, Decimal]
+    quantidade: int
+    total: Decimal
+    # SHA-256 das vendas congeladas (cabeçalho do `DiaFechado`)
+    sha256: str
+
+    @property
+    def diferenca(self) -> Decimal:
+        return sum((conferencia.diferenca for conferencia in self.conferencias), ZERO)
+
+    def to_dict(self) -> dict:
+        return {
+            'versao': VERSAO_FECHAMENTO,
+            'dia': self.dia.isoformat(),
+            'fechado_em': self.fechado_em,
+            'conferencias': [[c.conta, str(c.esperado), str(c.contado)] for c in self.conferencias],
+            'terminais': {terminal: str(valor) for terminal, valor in self.terminais.items()},
+            'quantidade': self.quantidade,
+            'total': str(self.total),
+            'sha256': self.sha256
+        }
+
+    @classmethod
+    def from_dict(cls, dados: dict) -> 'Fechamento':
+        if dados.get('versao') != VERSAO_FECHAMENTO:
+            raise ValueError(f"Versão de fechamento não suportada: {dados.get('versao')}")
+        return cls(
+            dia=date.fromisoformat(dados['dia']),
+            fechado_em=dados['fechado_em'],
+            conferencias=[Conferencia(conta, Decimal(esperado), Decimal(contado))
+                          for conta, esperado, contado in dados['conferencias']],
+            terminais={terminal: Decimal(valor) for terminal, valor in dados['terminais'].items()},
+            quantidade=dados['quantidade'],
+            total=Decimal(dados['total']),
+            sha256=dados['sha256']
+        )
+
+    def linhas(self) -> List[str]:
+        """Conferência em texto, para a janela e a linha de comando"""
+        linhas = [f"Fechamento de {self.dia.strftime('%d/%m/%Y')} em {self.fechado_em}",
+                  f"{self.quantidade} venda(s), total R$ {self.total:.2f}", ""]
+        linhas.extend(linhas_conferencia(self.conferencias))
+        if self.terminais:
+            linhas.extend(["", "Terminais:"])
+            linhas.extend(f"- {terminal}: R$ {valor:.2f}" for terminal, valor in self.terminais.items())
+        return linhas
+
+
+def linhas_conferencia(conferencias: List[Conferencia]) -> List[str]:
+    linhas = []
+    for conferencia in conferencias:
+        linhas.append(f"- {conferencia.conta}: sistema R$ {conferencia.esperado:.2f}, "
+                      f"contado R$ {conferencia.contado:.2f}, diferença R$ {conferencia.diferenca:+.2f}")
+    diferenca = sum((conferencia.diferenca for conferencia in conferencias), ZERO)
+    linhas.append(f"Diferença total: R$ {diferenca:+.2f}")
+    return linhas
+
+
+def arquivo_fechamento(pasta: str, dia: date) -> str:
+    return os.path.join(pasta, f"fechamento_{dia.strftime('%Y%m%d')}.json")
+
+
+def ler_fechamento(pasta: str, dia: date) -> Optional[Fechamento]:
+    """Fechamento gravado do dia, ou None se o dia ainda está aberto"""
+    try:
+        with open(arquivo_fechamento(pasta, dia), 'r', encoding='utf-8') as file:
+            return Fechamento.from_dict(json.load(file))
+    except FileNotFoundError:
+        return None
+
+
+def gravar_fechamento(pasta: str, fechamento: Fechamento):
+    """Grava a conferência uma única vez, somente leitura"""
+    caminho = arquivo_fechamento(pasta, fechamento.dia)
+    if os.path.exists(caminho):
+        raise ValueError(f"O caixa de {fechamento.dia.strftime('%d/%m/%Y')} já foi fechado.")
+    gravar_atomico(caminho, json.dumps(fechamento.to_dict(), ensure_ascii=False, indent=2).encode('utf-8'))
+    os.chmod(caminho, 0o444)
@@ -0,0 +1,237 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ALTURA_LINHA_PADRAO = 20
+
+
+class GradeVirtual(ttk.Frame):
+    """
+    Treeview virtualizada: só as linhas visíveis existem como itens no Tk.
+
+    A grade recebe a lista de itens (normalmente `SistemaCaixa.vendas`) e
+    mantém uma "visão" filtrada e ordenada com referências a esses itens. A
+    rolagem apenas troca os ~30 itens da janela visível, então o custo de
+    desenhar e rolar não depende do tamanho da lista.
+    """
+
+    def __init__(self, master, colunas: List[Tuple[str, int]],
+                 formatar: Callable[[Any], tuple],
+                 chaves_ordenacao: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 chave: Callable[[Any], str] = lambda item: str(id(item))):
+        super().__init__(master)
+        self._colunas = [coluna for coluna, _ in colunas]
+        self._formatar = formatar
+        self._chaves_ordenacao = chaves_ordenacao or {}
+        self._chave = chave
+
+        self._itens: Sequence = []
+        self._visao: List[Any] = []
+        self._filtro: Optional[Callable[[Any], bool]] = None
+        self._coluna_ordenada: Optional[str] = None
+        self._decrescente = False
+
+        self._inicio = 0
+        self._linhas = 1
+        self._visiveis: Dict[str, Any] = {}
+        self._selecionados: Dict[str, Any] = {}
+
+        self.tree = ttk.Treeview(self, columns=self._colunas, show='headings')
+        for coluna, largura in colunas:
+            self.tree.heading(coluna, text=coluna, command=lambda c=coluna: self.ordenar(c))
+            self.tree.column(coluna, width=largura, anchor='center')
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._rolar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', self._ao_redimensionar)
+        self.tree.bind('<<TreeviewSelect>>', self._ao_selecionar, add='+')
+        # Clique simples descarta a seleção que ficou fora da tela; com Ctrl/Shift ela é mantida
+        self.tree.bind('<Button-1>', lambda e: self._limpar_ocultos())
+        self.tree.bind('<Control-Button-1>', lambda e: None)
+        self.tree.bind('<Shift-Button-1>', lambda e: None)
+        self.tree.bind('<MouseWheel>', lambda e: self._rolar('scroll', -1 if e.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self._rolar('scroll', -1, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self._rolar('scroll', 1, 'units'))
+        self.tree.bind('<Up>', lambda e: self._mover_cursor(-1))
+        self.tree.bind('<Down>', lambda e: self._mover_cursor(1))
+        self.tree.bind('<Prior>', lambda e: self._rolar('scroll', -1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self._rolar('scroll', 1, 'pages'))
+
+    # Dados
+
+    def definir_itens(self, itens: Sequence):
+        """Associa a grade a uma nova lista de itens e redesenha"""
+        self._itens = itens
+        self._selecionados.clear()
+        self.atualizar()
+
+    def atualizar(self):
+        """Recalcula a visão (filtro + ordenação) a partir da lista de itens"""
+        visao = [item for item in self._itens if self._filtro(item)] if self._filtro else list(self._itens)
+        if self._coluna_ordenada is not None:
+            visao.sort(key=self._chave_ordenacao())
+        self._visao = visao
+        self._renderizar()
+
+    def adicionar(self, item):
+        """Inclui um item já acrescentado à lista, mantendo filtro e ordenação"""
+        if self._filtro and not self._filtro(item):
+            return
+        if self._coluna_ordenada is None:
+            self._visao.append(item)
+            # Sem ordenação o item entra no fim: rola até ele, como a Treeview fazia
+            self._inicio = max(0, len(self._visao) - self._linhas)
+        else:
+            bisect.insort_right(self._visao, item, key=self._chave_ordenacao())
+        self._renderizar()
+
+    def remover(self, *itens):
+        """Retira itens da visão (a remoção da lista é feita por quem chama)"""
+        for item in itens:
+            if not self._filtro or self._filtro(item):
+                self._visao.remove(item)
+            self._selecionados.pop(self._chave(item), None)
+        self._renderizar()
+
+    def substituir(self, antigo, novo):
+        """Troca um item pela sua nova versão, mantendo filtro e ordenação"""
+        try:
+            posicao = self._visao.index(antigo)
+        except ValueError:
+            posicao = None
+        visivel = not self._filtro or self._filtro(novo)
+
+        if posicao is not None and visivel and self._coluna_ordenada is None:
+            self._visao[posicao] = novo
+        else:
+            if posicao is not None:
+                del self._visao[posicao]
+            if visivel and self._coluna_ordenada is None:
+                self._visao.append(novo)
+            elif visivel:
+                bisect.insort_right(self._visao, novo, key=self._chave_ordenacao())
+
+        if self._selecionados.pop(self._chave(antigo), None) is not None:
+            self._selecionados[self._chave(novo)] = novo
+        self._renderizar()
+
+    def filtrar(self, filtro: Optional[Callable[[Any], bool]]):
+        """Aplica um filtro (ou remove, com None) sem recriar o widget"""
+        self._filtro = filtro
+        self._inicio = 0
+        self.atualizar()
+
+    def ordenar(self, coluna: str):
+        """Ordena pela coluna; clicar de novo no cabeçalho inverte a ordem"""
+        if self._coluna_ordenada == coluna:
+            self._decrescente = not self._decrescente
+        else:
+            self._coluna_ordenada = coluna
+            self._decrescente = False
+        for nome in self._colunas:
+            seta = (" ▼" if self._decrescente else " ▲") if nome == coluna else ""
+            self.tree.heading(nome, text=nome + seta)
+        self._inicio = 0
+        self.atualizar()
+
+    def _chave_ordenacao(self) -> Callable[[Any], Any]:
+        if self._coluna_ordenada in self._chaves_ordenacao:
+            return self._chaves_ordenacao[self._coluna_ordenada]
+        indice = self._colunas.index(self._coluna_ordenada)
+        return lambda item: self._formatar(item)[indice]
+
+    def _item_na_tela(self, posicao: int):
+        # A visão fica sempre em ordem crescente; a ordem decrescente é só na exibição
+        if self._decrescente:
+            return self._visao[len(self._visao) - 1 - posicao]
+        return self._visao[posicao]
+
+    def __len__(self):
+        return len(self._visao)
+
+    # Seleção
+
+    def selecao(self) -> List[Any]:
+        """Itens selecionados, inclusive os que estão fora da janela visível"""
+        return list(self._selecionados.values())
+
+    def _ao_selecionar(self, event=None):
+        selecionados = set(self.tree.selection())
+        for chave, item in self._visiveis.items():
+            if chave in selecionados:
+                self._selecionados[chave] = item
+            else:
+                self._selecionados.pop(chave, None)
+
+    def _limpar_ocultos(self):
+        self._selecionados = {chave: item for chave, item in self._selecionados.items() if chave in self._visiveis}
+
+    # Rolagem e desenho
+
+    def _ao_redimensionar(self, event):
+        altura_linha = int(ttk.Style().lookup('Treeview', 'rowheight') or ALTURA_LINHA_PADRAO)
+        # Desconta a linha do cabeçalho
+        linhas = max(1, event.height // altura_linha - 1)
+        if linhas != self._linhas:
+            self._linhas = linhas
+            self._renderizar()
+
+    def _rolar(self, *args):
+        maximo = max(0, len(self._visao) - self._linhas)
+        if args[0] == 'moveto':
+            inicio = int(float(args[1]) * len(self._visao))
+        elif args[0] == 'scroll':
+            passo = self._linhas if args[2] == 'pages' else 1
+            inicio = self._inicio + int(args[1]) * passo
+        else:
+            return
+        inicio = min(max(0, inicio), maximo)
+        if inicio != self._inicio:
+            self._inicio = inicio
+            self._renderizar()
+        return 'break'
+
+    def _mover_cursor(self, passo: int):
+        foco = self.tree.focus()
+        filhos = self.tree.get_children()
+        if not filhos:
+            return 'break'
+        posicao = filhos.index(foco) if foco in filhos else 0
+        destino = posicao + passo
+        if 0 <= destino < len(filhos):
+            alvo = filhos[destino]
+        else:
+            anterior = self._inicio
+            self._rolar('scroll', passo, 'units')
+            if self._inicio == anterior:
+                return 'break'
+            filhos = self.tree.get_children()
+            alvo = filhos[0] if passo < 0 else filhos[-1]
+        self._limpar_ocultos()
+        self.tree.focus(alvo)
+        self.tree.selection_set(alvo)
+        return 'break'
+
+    def _renderizar(self):
+        total = len(self._visao)
+        self._inicio = min(self._inicio, max(0, total - self._linhas))
+        fim = min(total, self._inicio + self._linhas)
+
+        self.tree.delete(*self.tree.get_children())
+        self._visiveis = {}
+        for posicao in range(self._inicio, fim):
+            item = self._item_na_tela(posicao)
+            chave = self._chave(item)
+            self._visiveis[chave] = item
+            self.tree.insert('', tk.END, iid=chave, values=self._formatar(item))
+
+        selecionados_visiveis = [chave for chave in self._visiveis if chave in self._selecionados]
+        self.tree.selection_set(selecionados_visiveis)
+
+        if total:
+            self.scrollbar.set(self._inicio / total, fim / total)
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,160 @@
+"""
+Gravação das alterações do caixa em segundo plano.
+
+A janela aplica cada venda em memória e entrega a alteração ao
+`GravadorAssincrono`, que grava em uma thread própria: a thread da
+interface não espera pelo fsync nem por um disco de rede lento. As
+alterações que chegam enquanto uma gravação está em andamento são
+agrupadas (`coalescer`) e gravadas de uma vez: inclusões viram um
+`adicionar_lote`, exclusões um `excluir_lote`, e uma venda incluída e
+excluída na mesma rajada nem chega ao disco.
+
+Uma alteração é ('add', venda), ('upd', venda) ou ('del', id). Cada
+rajada gravada entra em `instrumentacao.REGISTRO` como 'salvar_vendas'.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from armazenamento import VendaRepository
+from instrumentacao import medir
+
+LIMITE_FILA = 1000
+# Espera máxima por alterações na fila ao fechar o caixa
+TEMPO_ENCERRAR_S = 30.0
+
+
+def coalescer(alteracoes: List[Tuple[str, object]]) -> List[Tuple[str, object]]:
+    """Efeito líquido de uma sequência de alterações: no máximo uma por venda"""
+    efeitos: Dict[str, Tuple[str, object]] = {}
+    for op, valor in alteracoes:
+        id_venda = valor if op == 'del' else valor.id
+        anterior = efeitos.pop(id_venda, None)
+        if anterior is None:
+            efeitos[id_venda] = (op, valor)
+        elif anterior[0] == 'add':
+            # Ainda não está no disco: a versão nova é a que será incluída
+            if op != 'del':
+                efeitos[id_venda] = ('add', valor)
+        elif op == 'add':
+            # Excluída e incluída de novo com o mesmo id: substitui a gravada
+            efeitos[id_venda] = ('upd', valor)
+        else:
+            efeitos[id_venda] = (op, valor)
+    # Inclusões primeiro, na ordem em que chegaram, para manter a ordem das vendas
+    return ([efeito for efeito in efeitos.values() if efeito[0] == 'add'] +
+            [efeito for efeito in efeitos.values() if efeito[0] != 'add'])
+
+
+def aplicar_alteracoes(repositorio: VendaRepository, alteracoes: List[Tuple[str, object]]):
+    """Grava as alterações em ordem, em lote sempre que há várias seguidas do mesmo tipo"""
+    if repositorio.dia_fechado:
+        # O dia congelado não é regravado: as alterações viram correções auditadas
+        repositorio.corrigir(alteracoes)
+        return
+    inicio = 0
+    while inicio < len(alteracoes):
+        op = alteracoes[inicio][0]
+        fim = inicio
+        while fim < len(alteracoes) and alteracoes[fim][0] == op:
+            fim += 1
+        valores = [valor for _, valor in alteracoes[inicio:fim]]
+        if op == 'add':
+            repositorio.adicionar_lote(valores)
+        elif op == 'del':
+            repositorio.excluir_lote(valores)
+        else:
+            for venda in valores:
+                repositorio.atualizar(venda)
+        inicio = fim
+
+
+class GravadorAssincrono:
+    """
+    Fila limitada de alterações gravadas por uma thread de fundo com
+    `gravar(alteracoes)`. Quando a fila enche, `enfileirar` espera (o disco
+    está muito atrás). Falhas não interrompem o caixa: ficam em `erro` e
+    `falhas` para a interface mostrar.
+
+    Tarefas (`agendar`) são funções sem argumentos executadas depois das
+    alterações da mesma rajada; das tarefas com a mesma chave, só a última roda.
+    """
+
+    def __init__(self, gravar: Callable[[List[Tuple[str, object]]], None], limite: int = LIMITE_FILA):
+        self._gravar = gravar
+        self._fila: queue.Queue = queue.Queue(maxsize=limite)
+        self._condicao = threading.Condition()
+        self._pendentes = 0
+        self.erro: Optional[str] = None
+        self.falhas = 0
+        self.momento_erro: Optional[float] = None
+        self._thread = threading.Thread(target=self._executar, name="gravador", daemon=True)
+        self._thread.start()
+
+    def _colocar(self, item: tuple):
+        with self._condicao:
+            self._pendentes += 1
+        self._fila.put(item)
+
+    def enfileirar(self, alteracoes: List[Tuple[str, object]]):
+        self._colocar(('alteracoes', alteracoes))
+
+    def agendar(self, chave: str, tarefa: Callable[[], None]):
+        self._colocar(('tarefa', chave, tarefa))
+
+    @property
+    def pendentes(self) -> int:
+        """Itens enfileirados ou em gravação"""
+        with self._condicao:
+            return self._pendentes
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera tudo o que foi enfileirado chegar ao disco; False se o tempo acabou"""
+        with self._condicao:
+            return self._condicao.wait_for(lambda: self._pendentes == 0, timeout)
+
+    def encerrar(self, timeout: Optional[float] = TEMPO_ENCERRAR_S) -> bool:
+        """Grava o que falta e termina a thread; False se o tempo acabou antes"""
+        if not self._thread.is_alive():
+            return self.aguardar(0)
+        self._fila.put(None)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _retirar_rajada(self) -> Tuple[list, bool]:
+        """Bloqueia pelo primeiro item e leva junto tudo o que já está na fila"""
+        itens = [self._fila.get()]
+        while True:
+            try:
+                itens.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        fim = None in itens
+        return [item for item in itens if item is not None], fim
+
+    @medir('salvar_vendas')
+    def _gravar_rajada(self, alteracoes: List[Tuple[str, object]]):
+        """Grava a rajada já coalescida; a duração medida é a espera que saiu da janela"""
+        self._gravar(coalescer(alteracoes))
+
+    def _executar(self):
+        fim = False
+        while not fim:
+            itens, fim = self._retirar_rajada()
+            if not itens:
+                continue
+            alteracoes = [alteracao for item in itens if item[0] == 'alteracoes' for alteracao in item[1]]
+            tarefas = {item[1]: item[2] for item in itens if item[0] == 'tarefa'}
+            etapas = ([lambda: self._gravar_rajada(alteracoes)] if alteracoes else []) + list(tarefas.values())
+            for etapa in etapas:
+                try:
+                    etapa()
+                except Exception as e:
+                    with self._condicao:
+                        self.erro = str(e)
+                        self.falhas += 1
+                        self.momento_erro = time.time()
+            with self._condicao:
+                self._pendentes -= len(itens)
+                self._condicao.notify_all()
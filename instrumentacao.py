@@ -0,0 +1,196 @@
+"""
+Medição de latência das operações do caixa.
+
+`medir("nome")` decora uma função e registra quanto cada chamada levou num
+histograma rolante (últimos minutos) do registro global `REGISTRO`.
+Chamadas acima do limiar vão para um log rotativo. O painel da janela lê
+`REGISTRO.percentis()` e pode ligar uma captura do cProfile sob demanda.
+
+A gravação (gravacao.py) também é medida, então este módulo entra até no
+caixa_cli: cProfile, pstats e o log rotativo só são importados quando usados.
+"""
+import os
+import time
+import logging
+import functools
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+SUBBALDES = 64          # precisão relativa de ~1,5% (estilo HDR: log-linear)
+DURACAO_JANELA = 60     # segundos por fatia do histograma rolante
+QUANTIDADE_JANELAS = 5  # o histograma cobre os últimos 5 minutos
+PERCENTIS = (50, 95, 99)
+
+
+class HistogramaLatencia:
+    """
+    Histograma de latências em microssegundos com baldes log-lineares: até
+    2*SUBBALDES cada valor tem balde próprio; acima disso, cada potência de
+    dois é dividida em SUBBALDES baldes. Memória fixa e erro relativo limitado.
+    """
+
+    def __init__(self):
+        self.contagens: List[int] = []
+        self.total = 0
+        self.maximo = 0
+
+    @staticmethod
+    def _indice(valor: int) -> int:
+        if valor < 2 * SUBBALDES:
+            return valor
+        expoente = valor.bit_length() - SUBBALDES.bit_length()
+        return (expoente + 1) * SUBBALDES + (valor >> expoente) - SUBBALDES
+
+    @staticmethod
+    def _valor(indice: int) -> int:
+        """Valor representativo (meio) do balde"""
+        if indice < 2 * SUBBALDES:
+            return indice
+        expoente = indice // SUBBALDES - 1
+        inicio = (indice % SUBBALDES + SUBBALDES) << expoente
+        return inicio + (1 << expoente) // 2
+
+    def registrar(self, microssegundos: int):
+        indice = self._indice(max(0, microssegundos))
+        if indice >= len(self.contagens):
+            self.contagens.extend([0] * (indice + 1 - len(self.contagens)))
+        self.contagens[indice] += 1
+        self.total += 1
+        self.maximo = max(self.maximo, microssegundos)
+
+    def somar(self, outro: 'HistogramaLatencia'):
+        if len(outro.contagens) > len(self.contagens):
+            self.contagens.extend([0] * (len(outro.contagens) - len(self.contagens)))
+        for indice, contagem in enumerate(outro.contagens):
+            self.contagens[indice] += contagem
+        self.total += outro.total
+        self.maximo = max(self.maximo, outro.maximo)
+
+    def percentil(self, percentual: float) -> int:
+        if not self.total:
+            return 0
+        alvo = max(1, round(self.total * percentual / 100))
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return min(self._valor(indice), self.maximo)
+        return self.maximo
+
+
+class HistogramaRolante:
+    """Fatias de DURACAO_JANELA segundos; só as QUANTIDADE_JANELAS mais recentes contam"""
+
+    def __init__(self):
+        self._janelas: Deque[Tuple[int, HistogramaLatencia]] = deque(maxlen=QUANTIDADE_JANELAS)
+
+    def registrar(self, microssegundos: int, agora: Optional[float] = None):
+        inicio = int((agora if agora is not None else time.monotonic()) // DURACAO_JANELA)
+        if not self._janelas or self._janelas[-1][0] != inicio:
+            self._janelas.append((inicio, HistogramaLatencia()))
+        self._janelas[-1][1].registrar(microssegundos)
+
+    def consolidado(self, agora: Optional[float] = None) -> HistogramaLatencia:
+        atual = int((agora if agora is not None else time.monotonic()) // DURACAO_JANELA)
+        resultado = HistogramaLatencia()
+        for inicio, histograma in self._janelas:
+            if inicio > atual - QUANTIDADE_JANELAS:
+                resultado.somar(histograma)
+        return resultado
+
+
+class Instrumentacao:
+    def __init__(self):
+        self._histogramas: Dict[str, HistogramaRolante] = {}
+        self._trava = threading.Lock()
+        self.limiar_ms = 200
+        self.log_lento = logging.getLogger('caixa.lento')
+        self._perfil: Optional['cProfile.Profile'] = None
+
+    def configurar(self, arquivo_log: Optional[str], limiar_ms: float = 200,
+                   tamanho_maximo: int = 1024 * 1024, copias: int = 3):
+        """Define o limiar de lentidão e o arquivo rotativo do log de operações lentas"""
+        self.limiar_ms = limiar_ms
+        for handler in list(self.log_lento.handlers):
+            self.log_lento.removeHandler(handler)
+            handler.close()
+        if arquivo_log:
+            from logging.handlers import RotatingFileHandler
+            handler = RotatingFileHandler(arquivo_log, maxBytes=tamanho_maximo, backupCount=copias,
+                                          encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.log_lento.addHandler(handler)
+            self.log_lento.setLevel(logging.WARNING)
+            self.log_lento.propagate = False
+
+    def registrar(self, nome: str, segundos: float):
+        microssegundos = int(segundos * 1e6)
+        with self._trava:
+            self._histogramas.setdefault(nome, HistogramaRolante()).registrar(microssegundos)
+        if segundos * 1000 >= self.limiar_ms:
+            self.log_lento.warning("%s levou %.1f ms (thread %s)", nome, segundos * 1000,
+                                   threading.current_thread().name)
+
+    def percentis(self) -> Dict[str, dict]:
+        """Por operação: quantidade, p50/p95/p99 e máximo (ms) nos últimos minutos"""
+        with self._trava:
+            consolidados = {nome: rolante.consolidado() for nome, rolante in self._histogramas.items()}
+        resultado = {}
+        for nome, histograma in sorted(consolidados.items()):
+            if not histograma.total:
+                continue
+            resultado[nome] = {
+                'quantidade': histograma.total,
+                **{f'p{p}': histograma.percentil(p) / 1000 for p in PERCENTIS},
+                'maximo': histograma.maximo / 1000
+            }
+        return resultado
+
+    def zerar(self):
+        with self._trava:
+            self._histogramas.clear()
+
+    # cProfile sob demanda
+
+    @property
+    def perfilando(self) -> bool:
+        return self._perfil is not None
+
+    def iniciar_perfil(self):
+        """Liga o cProfile na thread atual (a da interface, onde roda o trabalho dos eventos)"""
+        if self._perfil is None:
+            import cProfile
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+
+    def parar_perfil(self, pasta: str = '.') -> str:
+        """Desliga a captura e grava perfil_*.prof e um resumo em texto; devolve o caminho do .prof"""
+        perfil, self._perfil = self._perfil, None
+        if perfil is None:
+            raise RuntimeError("Nenhuma captura de perfil em andamento")
+        perfil.disable()
+        import pstats
+        base = os.path.join(pasta, f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        perfil.dump_stats(base + '.prof')
+        with open(base + '.txt', 'w', encoding='utf-8') as file:
+            pstats.Stats(perfil, stream=file).sort_stats('cumulative').print_stats(40)
+        return base + '.prof'
+
+
+REGISTRO = Instrumentacao()
+
+
+def medir(nome: str):
+    """Decorador: registra a duração de cada chamada em `REGISTRO` com o nome dado"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                REGISTRO.registrar(nome, time.perf_counter() - inicio)
+        return medida
+    return decorador
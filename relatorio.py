@@ -0,0 +1,155 @@
+import queue
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vendas import Venda
+from agregados import chave_pagamento
+
+TAMANHO_BLOCO = 32 * 1024
+
+
+def agrupar_por_vendedor(vendas: Iterable[Venda]) -> Dict[str, List[Venda]]:
+    vendas_por_vendedor = {}
+    for venda in vendas:
+        vendas_por_vendedor.setdefault(venda.vendedor, []).append(venda)
+    return vendas_por_vendedor
+
+
+def _detalhes_venda(venda: Venda) -> Iterator[str]:
+    yield f"Data/Hora: {venda.data}\n"
+    yield f"Boleta Nº: {venda.numero_boleta}\n"
+    yield f"Pagamento: {venda.tipo_pagamento}\n"
+    if venda.detalhes_pagamento:
+        yield f"Detalhes: {venda.detalhes_pagamento}\n"
+    if venda.bandeira:
+        yield f"Bandeira: {venda.bandeira}\n"
+    yield f"Valor: R$ {venda.valor:.2f}\n"
+    yield f"Troca: {'Sim' if venda.troca else 'Não'}\n\n"
+
+
+def linhas_resumos(total_vendas: Decimal, resumo_pagamentos: dict,
+                   resumo_bandeiras: dict, trocas: List[Tuple[str, Decimal]]) -> Iterator[str]:
+    """Seções de totais de um vendedor: por tipo de pagamento, por bandeira e trocas (boleta, valor)"""
+    yield f"\nTOTAL DE VENDAS: R$ {total_vendas:.2f}\n\n"
+
+    yield "RESUMO POR TIPO DE PAGAMENTO:\n"
+    for tipo, valor in sorted(resumo_pagamentos.items()):
+        yield f"- {tipo}: R$ {valor:.2f}\n"
+
+    if resumo_bandeiras:
+        yield "\nRESUMO POR BANDEIRA:\n"
+        for bandeira, valor in sorted(resumo_bandeiras.items()):
+            yield f"- {bandeira}: R$ {valor:.2f}\n"
+
+    if trocas:
+        total_trocas = sum(valor for _, valor in trocas)
+        yield "\nTROCAS REALIZADAS:\n"
+        for numero_boleta, valor in trocas:
+            yield f"- Boleta {numero_boleta}: R$ {valor:.2f}\n"
+        yield f"\nTotal de Trocas: R$ {total_trocas:.2f}\n"
+
+
+def linhas_relatorio(vendas: Iterable[Venda]) -> Iterator[str]:
+    """Gera o texto do relatório detalhado, vendedor por vendedor"""
+    for vendedor, lista_vendas in agrupar_por_vendedor(vendas).items():
+        yield f"\nVendedor: {vendedor}\n"
+        yield "=" * 50 + "\n\n"
+
+        total_vendas = Decimal('0.00')
+        resumo_pagamentos = {}
+        resumo_bandeiras = {}
+        trocas = []
+
+        yield "DETALHAMENTO DAS VENDAS:\n\n"
+        for venda in lista_vendas:
+            total_vendas += venda.valor
+            chave = chave_pagamento(venda.tipo_pagamento, venda.detalhes_pagamento)
+            resumo_pagamentos[chave] = resumo_pagamentos.get(chave, Decimal('0.00')) + venda.valor
+            if venda.bandeira:
+                resumo_bandeiras[venda.bandeira] = resumo_bandeiras.get(venda.bandeira, Decimal('0.00')) + venda.valor
+            if venda.troca:
+                trocas.append((venda.numero_boleta, venda.valor))
+            yield from _detalhes_venda(venda)
+
+        yield from linhas_resumos(total_vendas, resumo_pagamentos, resumo_bandeiras, trocas)
+        yield "\n" + "-" * 50 + "\n"
+
+
+def em_blocos(linhas: Iterable[str], tamanho: int = TAMANHO_BLOCO) -> Iterator[str]:
+    """Agrupa as linhas em blocos de ~`tamanho` caracteres"""
+    bloco = []
+    acumulado = 0
+    for linha in linhas:
+        bloco.append(linha)
+        acumulado += len(linha)
+        if acumulado >= tamanho:
+            yield "".join(bloco)
+            bloco = []
+            acumulado = 0
+    if bloco:
+        yield "".join(bloco)
+
+
+def salvar_relatorio(linhas: Iterable[str], caminho: str):
+    """Grava o relatório em disco à medida que é gerado"""
+    with open(caminho, "w", encoding="utf-8") as file:
+        for bloco in em_blocos(linhas):
+            file.write(bloco)
+
+
+class ProdutorEmSegundoPlano:
+    """
+    Consome um gerador em uma thread e entrega os itens por uma fila limitada.
+
+    Quem está na thread da interface chama `coletar` periodicamente (por
+    exemplo com `after()`); `cancelar` interrompe a geração.
+    """
+
+    def __init__(self, gerador: Iterable, tamanho_fila: int = 8):
+        self._gerador = gerador
+        self._fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+        self._cancelado = threading.Event()
+        self._terminou = False
+        self.erro: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._produzir, daemon=True)
+        self._thread.start()
+
+    def _colocar(self, item) -> bool:
+        while not self._cancelado.is_set():
+            try:
+                self._fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produzir(self):
+        try:
+            for item in self._gerador:
+                if not self._colocar(item):
+                    return
+        except Exception as e:
+            self.erro = e
+        self._colocar(StopIteration)
+
+    def coletar(self, maximo: int = 4) -> Tuple[list, bool]:
+        """Retorna até `maximo` itens prontos e se a geração terminou"""
+        itens = []
+        while len(itens) < maximo and not self._terminou:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is StopIteration:
+                self._terminou = True
+            else:
+                itens.append(item)
+        return itens, self._terminou
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
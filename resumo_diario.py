@@ -0,0 +1,163 @@
+import os
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, Optional
+
+from vendas import Venda
+from agregados import chave_pagamento
+from armazenamento import VendaRepository, gravar_atomico
+from relatorio import linhas_resumos
+
+VERSAO_RESUMO = 1
+ZERO = Decimal('0.00')
+
+
+def _novo_vendedor() -> dict:
+    return {'total': ZERO, 'quantidade': 0, 'pagamentos': {}, 'bandeiras': {}, 'trocas': []}
+
+
+def resumir_dia(vendas: Iterable[Venda]) -> Dict[str, dict]:
+    """Totais de um dia por vendedor, com as mesmas seções do relatório detalhado"""
+    vendedores = {}
+    for venda in vendas:
+        resumo = vendedores.setdefault(venda.vendedor, _novo_vendedor())
+        resumo['total'] += venda.valor
+        resumo['quantidade'] += 1
+        chave = chave_pagamento(venda.tipo_pagamento, venda.detalhes_pagamento)
+        resumo['pagamentos'][chave] = resumo['pagamentos'].get(chave, ZERO) + venda.valor
+        if venda.bandeira:
+            resumo['bandeiras'][venda.bandeira] = resumo['bandeiras'].get(venda.bandeira, ZERO) + venda.valor
+        if venda.troca:
+            resumo['trocas'].append((venda.numero_boleta, venda.valor))
+    return vendedores
+
+
+def somar_resumos(destino: Dict[str, dict], origem: Dict[str, dict]):
+    """Acumula em `destino` os totais por vendedor de `origem`"""
+    for vendedor, resumo in origem.items():
+        acumulado = destino.setdefault(vendedor, _novo_vendedor())
+        acumulado['total'] += resumo['total']
+        acumulado['quantidade'] += resumo['quantidade']
+        for campo in ('pagamentos', 'bandeiras'):
+            for chave, valor in resumo[campo].items():
+                acumulado[campo][chave] = acumulado[campo].get(chave, ZERO) + valor
+        acumulado['trocas'].extend(resumo['trocas'])
+
+
+def _serializar(vendedores: Dict[str, dict]) -> dict:
+    return {
+        vendedor: {
+            'total': str(resumo['total']),
+            'quantidade': resumo['quantidade'],
+            'pagamentos': {chave: str(valor) for chave, valor in resumo['pagamentos'].items()},
+            'bandeiras': {chave: str(valor) for chave, valor in resumo['bandeiras'].items()},
+            'trocas': [[boleta, str(valor)] for boleta, valor in resumo['trocas']]
+        }
+        for vendedor, resumo in vendedores.items()
+    }
+
+
+def _desserializar(dados: dict) -> Dict[str, dict]:
+    return {
+        vendedor: {
+            'total': Decimal(resumo['total']),
+            'quantidade': resumo['quantidade'],
+            'pagamentos': {chave: Decimal(valor) for chave, valor in resumo['pagamentos'].items()},
+            'bandeiras': {chave: Decimal(valor) for chave, valor in resumo['bandeiras'].items()},
+            'trocas': [(boleta, Decimal(valor)) for boleta, valor in resumo['trocas']]
+        }
+        for vendedor, resumo in dados.items()
+    }
+
+
+class ResumosDiarios:
+    """
+    Índice de resumos pré-agregados, um arquivo `resumo_AAAAMMDD.json` por dia.
+
+    Cada resumo guarda a assinatura do dia no repositório no momento em que
+    foi gerado. Se o dia for reaberto e alterado a assinatura muda e só o
+    resumo daquele dia é refeito; consultas por período leem apenas os N
+    resumos, sem abrir as vendas.
+    """
+
+    def __init__(self, repositorio: VendaRepository, pasta: str = '.'):
+        self.repositorio = repositorio
+        self.pasta = pasta
+
+    def arquivo_resumo(self, dia: date) -> str:
+        return os.path.join(self.pasta, f"resumo_{dia.strftime('%Y%m%d')}.json")
+
+    def _ler(self, dia: date, assinatura: str) -> Optional[Dict[str, dict]]:
+        try:
+            with open(self.arquivo_resumo(dia), 'r', encoding='utf-8') as file:
+                dados = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if dados.get('versao') != VERSAO_RESUMO or dados.get('assinatura') != assinatura:
+            return None
+        return _desserializar(dados['vendedores'])
+
+    def fechar_dia(self, dia: date) -> Dict[str, dict]:
+        """Gera (ou refaz) o resumo do dia a partir das vendas gravadas"""
+        assinatura = self.repositorio.assinatura_dia(dia)
+        vendedores = resumir_dia(self.repositorio.buscar(dia, dia))
+        conteudo = {
+            'versao': VERSAO_RESUMO,
+            'dia': dia.isoformat(),
+            'assinatura': assinatura,
+            'vendedores': _serializar(vendedores)
+        }
+        gravar_atomico(self.arquivo_resumo(dia), json.dumps(conteudo, ensure_ascii=False).encode('utf-8'))
+        return vendedores
+
+    def obter(self, dia: date) -> Dict[str, dict]:
+        """Resumo do dia, refeito somente se as vendas mudaram desde a última geração"""
+        vendedores = self._ler(dia, self.repositorio.assinatura_dia(dia))
+        if vendedores is None:
+            vendedores = self.fechar_dia(dia)
+        return vendedores
+
+    def periodo(self, inicio: date, fim: date, vendas_do_dia: Optional[Iterable[Venda]] = None) -> Dict[str, dict]:
+        """
+        Totais por vendedor no período. O dia corrente do caixa ainda está
+        aberto: se `vendas_do_dia` for informado, ele é resumido em memória
+        em vez de gerar arquivo de resumo.
+        """
+        consolidado = {}
+        dia_aberto = self.repositorio.dia if vendas_do_dia is not None else None
+        for dia in self.repositorio.dias(inicio, fim):
+            if dia != dia_aberto:
+                somar_resumos(consolidado, self.obter(dia))
+        if dia_aberto is not None and inicio <= dia_aberto <= fim:
+            somar_resumos(consolidado, resumir_dia(vendas_do_dia))
+        return consolidado
+
+
+def linhas_relatorio_periodo(inicio: date, fim: date, consolidado: Dict[str, dict]) -> Iterator[str]:
+    """Relatório do período com as seções por vendedor, tipo de pagamento e bandeira"""
+    yield f"RELATÓRIO DO PERÍODO {inicio.strftime('%d/%m/%Y')} A {fim.strftime('%d/%m/%Y')}\n"
+    if not consolidado:
+        yield "\nNenhuma venda registrada no período.\n"
+        return
+
+    geral = {}
+    for vendedor, resumo in sorted(consolidado.items()):
+        somar_resumos(geral, {'geral': resumo})
+        yield f"\nVendedor: {vendedor}\n"
+        yield "=" * 50 + "\n"
+        yield f"Quantidade de vendas: {resumo['quantidade']}\n"
+        yield from linhas_resumos(resumo['total'], resumo['pagamentos'], resumo['bandeiras'], resumo['trocas'])
+        yield "\n" + "-" * 50 + "\n"
+
+    resumo = geral['geral']
+    yield "\nTODOS OS VENDEDORES\n"
+    yield "=" * 50 + "\n"
+    yield f"Quantidade de vendas: {resumo['quantidade']}\n"
+    yield from linhas_resumos(resumo['total'], resumo['pagamentos'], resumo['bandeiras'], resumo['trocas'])
+
+
+def relatorio_periodo(resumos: ResumosDiarios, inicio: date, fim: date,
+                      vendas_do_dia: Optional[Iterable[Venda]] = None) -> Iterator[str]:
+    """Consolida os resumos e gera o texto; tudo acontece ao consumir o gerador"""
+    yield from linhas_relatorio_periodo(inicio, fim, resumos.periodo(inicio, fim, vendas_do_dia))
@@ -0,0 +1,347 @@
+"""
+Sincronização entre os caixas da loja.
+
+Um servidor asyncio (TCP em localhost) recebe as alterações de cada caixa e
+mantém a visão consolidada do dia; cada caixa usa `ClienteSincronizacao`,
+que guarda as alterações num arquivo de pendências e as envia em lotes
+quando o servidor está acessível.
+
+Protocolo: uma requisição JSON por linha, uma resposta JSON por linha.
+
+    {"op": "enviar", "terminal": "caixa-1", "alteracoes": [
+        {"op": "add", "dia": "2024-03-15", "venda": {...}},
+        {"op": "upd", "dia": "2024-03-15", "venda": {...}},
+        {"op": "del", "dia": "2024-03-15", "id": "01H..."}]}
+    -> {"ok": true, "aplicadas": 2, "ignoradas": 1}
+
+    {"op": "alteracoes", "dia": "2024-03-15", "desde": 120, "epoca": "01H..."}
+    -> {"ok": true, "epoca": "01H...", "versao": 135, "completo": false, "alteracoes": [...]}
+
+    {"op": "resumo", "dia": "2024-03-15"}
+    -> {"ok": true, "versao": 135, "resumo": {...}}
+
+As alterações usam as mesmas operações do journal. O id estável da venda
+torna o envio idempotente: um 'add' com id já conhecido é ignorado, então
+o cliente pode reenviar um lote cuja resposta se perdeu.
+
+O histórico numerado só existe na memória do servidor e é refeito a partir
+das vendas gravadas quando ele reinicia, recomeçando a numeração. Cada
+histórico tem uma época (um ULID novo a cada carga do dia): se o cliente
+informa outra época, ou uma versão que o servidor não tem, a resposta traz o
+histórico inteiro com "completo": true e o cliente refaz o dia do zero.
+"""
+import os
+import json
+import socket
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from caixa import Caixa, ConfigManager
+from vendas import Venda, gerar_id
+from armazenamento import gravar_atomico
+
+PORTA_PADRAO = 8765
+TAMANHO_LOTE = 200
+LIMITE_LINHA = 16 * 1024 * 1024
+
+
+def _resumo_serializavel(resumo: dict) -> dict:
+    return {
+        campo: ({chave: str(valor) for chave, valor in conteudo.items()} if isinstance(conteudo, dict)
+                else str(conteudo) if isinstance(conteudo, Decimal) else conteudo)
+        for campo, conteudo in resumo.items()
+    }
+
+
+def resumo_de_json(dados: dict) -> dict:
+    """Reconstrói o dicionário de `agregados.resumir` recebido do servidor"""
+    return {
+        campo: ({chave: Decimal(valor) for chave, valor in conteudo.items()} if isinstance(conteudo, dict)
+                else Decimal(conteudo) if isinstance(conteudo, str) else conteudo)
+        for campo, conteudo in dados.items()
+    }
+
+
+class _DiaSincronizado:
+    """Vendas consolidadas de um dia no servidor e o histórico numerado de alterações"""
+
+    def __init__(self, caixa: Caixa):
+        self.caixa = caixa
+        # Muda sempre que o histórico é refeito (servidor reiniciado)
+        self.epoca = gerar_id()
+        # Quem pede alterações 'desde' N recebe historico[N:]
+        self.historico: List[dict] = [{'op': 'add', 'venda': venda.to_dict()} for venda in caixa.vendas]
+
+    def aplicar(self, alteracoes: List[dict]) -> int:
+        """Aplica as alterações na ordem recebida; devolve quantas tiveram efeito"""
+        aplicadas = 0
+        novas: Dict[str, Venda] = {}
+
+        def gravar_novas():
+            if novas:
+                self.caixa.adicionar_lote(list(novas.values()))
+                novas.clear()
+
+        for alteracao in alteracoes:
+            op = alteracao['op']
+            if op in ('add', 'upd'):
+                venda = Venda.from_dict(alteracao['venda'])
+                if venda.id in novas:
+                    gravar_novas()
+                conhecida = venda.id in self.caixa.vendas
+                if op == 'add' and conhecida:
+                    continue
+                if conhecida:
+                    gravar_novas()
+                    self.caixa.atualizar(venda)
+                else:
+                    # Alteração de venda que o servidor não viu entra como inclusão
+                    novas[venda.id] = venda
+                    op = 'add'
+                self.historico.append({'op': op, 'venda': venda.to_dict()})
+            elif op == 'del':
+                gravar_novas()
+                if alteracao['id'] not in self.caixa.vendas:
+                    continue
+                self.caixa.excluir([alteracao['id']])
+                self.historico.append({'op': 'del', 'id': alteracao['id']})
+            else:
+                raise ValueError(f"Operação desconhecida: {op}")
+            aplicadas += 1
+        gravar_novas()
+        return aplicadas
+
+
+class ServidorSincronizacao:
+    """Servidor da loja: grava as vendas de todos os caixas na sua própria pasta"""
+
+    def __init__(self, pasta: str = '.', config=None):
+        self.pasta = pasta
+        self.config = config or ConfigManager()
+        self._dias: Dict[date, _DiaSincronizado] = {}
+        self._servidor: Optional[asyncio.AbstractServer] = None
+
+    def _dia(self, texto: str) -> _DiaSincronizado:
+        dia = date.fromisoformat(texto)
+        if dia not in self._dias:
+            caixa = Caixa(self.config, self.pasta, dia)
+            caixa.carregar()
+            self._dias[dia] = _DiaSincronizado(caixa)
+        return self._dias[dia]
+
+    def processar(self, requisicao: dict) -> dict:
+        op = requisicao.get('op')
+        if op == 'enviar':
+            por_dia: Dict[str, List[dict]] = {}
+            for alteracao in requisicao['alteracoes']:
+                por_dia.setdefault(alteracao['dia'], []).append(alteracao)
+            total = sum(len(alteracoes) for alteracoes in por_dia.values())
+            aplicadas = sum(self._dia(dia).aplicar(alteracoes) for dia, alteracoes in por_dia.items())
+            return {'ok': True, 'aplicadas': aplicadas, 'ignoradas': total - aplicadas}
+        if op == 'alteracoes':
+            dia = self._dia(requisicao['dia'])
+            desde = requisicao.get('desde', 0)
+            # Versão de outro histórico: a numeração recomeçou, o cliente precisa de tudo
+            completo = requisicao.get('epoca', dia.epoca) != dia.epoca or desde > len(dia.historico)
+            if completo:
+                desde = 0
+            return {'ok': True, 'epoca': dia.epoca, 'versao': len(dia.historico), 'completo': completo,
+                    'alteracoes': dia.historico[desde:]}
+        if op == 'resumo':
+            dia = self._dia(requisicao['dia'])
+            return {'ok': True, 'versao': len(dia.historico),
+                    'resumo': _resumo_serializavel(dia.caixa.resumo.como_dict())}
+        raise ValueError(f"Operação desconhecida: {op}")
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    # Tudo roda na thread do loop: as requisições são aplicadas uma de cada vez
+                    resposta = self.processar(json.loads(linha))
+                except Exception as e:
+                    resposta = {'ok': False, 'erro': str(e)}
+                writer.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def iniciar(self, host: str = '127.0.0.1', porta: int = PORTA_PADRAO) -> tuple:
+        """Começa a aceitar conexões; devolve (host, porta) efetivos (porta 0 escolhe uma livre)"""
+        self._servidor = await asyncio.start_server(self._atender, host, porta, limit=LIMITE_LINHA)
+        return self._servidor.sockets[0].getsockname()[:2]
+
+    async def encerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        for dia in self._dias.values():
+            dia.caixa.fechar()
+        self._dias.clear()
+
+    def executar(self, host: str = '127.0.0.1', porta: int = PORTA_PADRAO):
+        """Atende até Ctrl+C"""
+        async def principal():
+            endereco = await self.iniciar(host, porta)
+            print(f"Servidor de sincronização em {endereco[0]}:{endereco[1]}, pasta '{self.pasta}'")
+            try:
+                await self._servidor.serve_forever()
+            finally:
+                await self.encerrar()
+
+        try:
+            asyncio.run(principal())
+        except KeyboardInterrupt:
+            pass
+
+
+def separar_endereco(endereco: str) -> tuple:
+    host, _, porta = endereco.rpartition(':')
+    return (host or '127.0.0.1'), int(porta or PORTA_PADRAO)
+
+
+class ClienteSincronizacao:
+    """
+    Lado do caixa. `registrar` só grava a alteração no arquivo de pendências
+    (não depende da rede); `enviar_pendentes` despacha em lotes e retira do
+    arquivo o que o servidor confirmou. Com `iniciar`, uma thread tenta
+    enviar e atualiza `resumo_loja` a cada `intervalo` segundos.
+    """
+
+    def __init__(self, endereco: str, terminal: str, pasta: str = '.',
+                 tamanho_lote: int = TAMANHO_LOTE, timeout: float = 5.0):
+        self.endereco = separar_endereco(endereco)
+        self.terminal = terminal
+        self.tamanho_lote = tamanho_lote
+        self.timeout = timeout
+        self.arquivo_pendentes = os.path.join(pasta, f"sincronizacao_{terminal}.pendentes.jsonl")
+
+        self.online = False
+        self.resumo_loja: Optional[dict] = None
+        self._trava = threading.Lock()
+        self._envio = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pendentes: List[dict] = self._ler_pendentes()
+        # Época do histórico do servidor vista na última consulta de cada dia
+        self._epocas: Dict[date, str] = {}
+
+    def _ler_pendentes(self) -> List[dict]:
+        pendentes = []
+        if os.path.exists(self.arquivo_pendentes):
+            with open(self.arquivo_pendentes, 'r', encoding='utf-8') as file:
+                for linha in file:
+                    try:
+                        pendentes.append(json.loads(linha))
+                    except ValueError:
+                        # Última linha incompleta (queda durante a gravação)
+                        break
+        return pendentes
+
+    @property
+    def quantidade_pendente(self) -> int:
+        with self._trava:
+            return len(self._pendentes)
+
+    def registrar(self, dia: date, alteracoes: List[dict]):
+        """Guarda alterações ('add'/'upd' com 'venda', 'del' com 'id') para envio, com um único fsync"""
+        alteracoes = [dict(alteracao, dia=dia.isoformat()) for alteracao in alteracoes]
+        conteudo = "".join(json.dumps(alteracao, ensure_ascii=False) + '\n' for alteracao in alteracoes)
+        with self._trava:
+            with open(self.arquivo_pendentes, 'a', encoding='utf-8') as file:
+                file.write(conteudo)
+                file.flush()
+                os.fsync(file.fileno())
+            self._pendentes.extend(alteracoes)
+
+    def _descartar_enviadas(self, quantidade: int):
+        with self._trava:
+            del self._pendentes[:quantidade]
+            conteudo = "".join(json.dumps(alteracao, ensure_ascii=False) + '\n' for alteracao in self._pendentes)
+            gravar_atomico(self.arquivo_pendentes, conteudo.encode('utf-8'))
+
+    def _conectar(self) -> socket.socket:
+        return socket.create_connection(self.endereco, timeout=self.timeout)
+
+    @staticmethod
+    def _requisitar(conexao: socket.socket, arquivo, requisicao: dict) -> dict:
+        conexao.sendall(json.dumps(requisicao, ensure_ascii=False).encode('utf-8') + b'\n')
+        linha = arquivo.readline()
+        if not linha:
+            raise ConnectionError("Servidor encerrou a conexão")
+        resposta = json.loads(linha)
+        if not resposta.get('ok'):
+            raise RuntimeError(resposta.get('erro', 'erro desconhecido no servidor'))
+        return resposta
+
+    def _sessao(self, requisicoes):
+        """Abre uma conexão e executa `requisicoes(requisitar)`"""
+        with self._conectar() as conexao, conexao.makefile('rb') as arquivo:
+            return requisicoes(lambda requisicao: self._requisitar(conexao, arquivo, requisicao))
+
+    def enviar_pendentes(self) -> int:
+        """Envia tudo o que está pendente; devolve quantas alterações foram confirmadas"""
+        def enviar(requisitar):
+            enviadas = 0
+            while True:
+                with self._trava:
+                    lote = self._pendentes[:self.tamanho_lote]
+                if not lote:
+                    return enviadas
+                requisitar({'op': 'enviar', 'terminal': self.terminal, 'alteracoes': lote})
+                self._descartar_enviadas(len(lote))
+                enviadas += len(lote)
+
+        with self._envio:
+            if not self.quantidade_pendente:
+                return 0
+            return self._sessao(enviar)
+
+    def resumo(self, dia: date) -> dict:
+        """Totais consolidados da loja no dia (mesmo formato de `agregados.resumir`)"""
+        resposta = self._sessao(lambda requisitar: requisitar({'op': 'resumo', 'dia': dia.isoformat()}))
+        return resumo_de_json(resposta['resumo'])
+
+    def alteracoes(self, dia: date, desde: int = 0) -> tuple:
+        """
+        (versão, alterações, completo) do dia a partir da versão `desde`,
+        vindas de todos os caixas. Com `completo`, o servidor reiniciou e as
+        alterações são o histórico inteiro: o dia deve ser refeito a partir delas.
+        """
+        requisicao = {'op': 'alteracoes', 'dia': dia.isoformat(), 'desde': desde}
+        if dia in self._epocas:
+            requisicao['epoca'] = self._epocas[dia]
+        resposta = self._sessao(lambda requisitar: requisitar(requisicao))
+        self._epocas[dia] = resposta['epoca']
+        return resposta['versao'], resposta['alteracoes'], resposta['completo']
+
+    def sincronizar(self, dia: date):
+        try:
+            self.enviar_pendentes()
+            self.resumo_loja = self.resumo(dia)
+            self.online = True
+        except (OSError, ValueError, RuntimeError):
+            self.online = False
+
+    def iniciar(self, dia_atual, intervalo: float = 5.0):
+        """Sincroniza em segundo plano; `dia_atual()` informa o dia do resumo da loja"""
+        def executar():
+            while not self._parar.is_set():
+                self.sincronizar(dia_atual())
+                self._parar.wait(intervalo)
+
+        self._thread = threading.Thread(target=executar, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout)
@@ -1,101 +1,101 @@
-import os
 from datetime import datetime
-from decimal import Decimal
-import json
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+import time
+import threading
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import caixa
+from caixa import Caixa, ConfigManager, ErroPersistencia, rotulo_pagamento, validar_dados_venda
+from vendas import ColecaoVendas, Venda
+from agregados import ResumoIncremental
+from grade import GradeVirtual
+from relatorio import ProdutorEmSegundoPlano, em_blocos, linhas_relatorio, salvar_relatorio
+from resumo_diario import ResumosDiarios, relatorio_periodo
+from armazenamento import VendaRepository
+from sincronizacao import ClienteSincronizacao
+from busca import contar_facetas, interpretar_valor
+from instrumentacao import REGISTRO, medir
+from gravacao import TEMPO_ENCERRAR_S
+from exportacao import ExportacaoCancelada, exportar, lotes_da_lista, lotes_do_periodo
+from fechamento import CONTA_CARTAO, ler_valor_contado, linhas_conferencia
 
 # Configurações básicas de fonte
 FONT_TITLE = ("Arial", 20, "bold")
 FONT_LABEL = ("Arial", 12)
 FONT_ENTRY = ("Arial", 12)
-
-class ConfigManager:
-    def __init__(self):
-        self.config = {'database.path': 'austral.db'}
-    def get(self, key, default=None):
-        return self.config.get(key, default)
-
-@dataclass
-class Venda:
-    """
-    Representa uma venda individual com todos os seus detalhes.
-    """
-    vendedor: str
-    tipo_pagamento: str
-    detalhes_pagamento: str
-    bandeira: str
-    valor: Decimal
-    numero_boleta: str
-    troca: bool
-    data: str = None
-
-    def __post_init__(self):
-        if self.data is None:
-            self.data = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        self.valor = Decimal(str(self.valor)).quantize(Decimal('0.01'))
-
-    def to_dict(self) -> dict:
-        return {
-            'vendedor': self.vendedor,
-            'tipo_pagamento': self.tipo_pagamento,
-            'detalhes_pagamento': self.detalhes_pagamento,
-            'bandeira': self.bandeira,
-            'valor': str(self.valor),
-            'numero_boleta': self.numero_boleta,
-            'troca': self.troca,
-            'data': self.data
-        }
-
-    @classmethod
-    def from_dict(cls, data: dict) -> 'Venda':
-        return cls(
-            vendedor=data['vendedor'],
-            tipo_pagamento=data['tipo_pagamento'],
-            detalhes_pagamento=data['detalhes_pagamento'],
-            bandeira=data['bandeira'],
-            valor=Decimal(data['valor']),
-            numero_boleta=data['numero_boleta'],
-            troca=data['troca'],
-            data=data['data']
-        )
+# Frequência com que o painel mostra os totais da loja recebidos do servidor
+INTERVALO_LOJA_MS = 5000
+# Painel de desempenho (Alt+P): atualização dos percentis e duração da captura do cProfile
+INTERVALO_PAINEL_MS = 1000
+DURACAO_PERFIL_S = 10
+# Indicador da gravação em segundo plano e espera pelo disco ao fechar a janela
+INTERVALO_GRAVACAO_MS = 250
 
 class SistemaCaixa:
     """Sistema de gerenciamento de vendas com interface gráfica"""
 
-    VENDEDORES = ["João", "Maria", "Pedro", "Ana"]
-    PAGAMENTOS_COMPLETOS = [
-        "Dinheiro", "PIX", "Troca",
-        "Visa - Débito", "Visa - Crédito",
-        "Mastercard - Débito", "Mastercard - Crédito",
-        "Elo - Débito", "Elo - Crédito",
-        "American Express - Débito", "American Express - Crédito",
-        "Hipercard - Débito", "Hipercard - Crédito"
-    ]
-    OBSERVACOES_OPCOES = [
-        "PDV", "POS Rede", "POS PagSeguro",
-        "POS Getnet", "Link Rede", "Outro"
-    ]
+    VENDEDORES = caixa.VENDEDORES
+    PAGAMENTOS_COMPLETOS = caixa.PAGAMENTOS_COMPLETOS
+    OBSERVACOES_OPCOES = caixa.OBSERVACOES_OPCOES
+    FILTRO_TODOS = "Todos"
 
     def __init__(self, master: tk.Tk):
         self.master = master
         self.master.title("Sistema de Caixa")
         self.master.geometry("900x600")
         self.config = ConfigManager()
-        # Define arquivo de backup com base na data atual
-        self.ARQUIVO_BACKUP = f"vendas_{datetime.now().strftime('%Y%m%d')}.json"
-        self.vendas: List[Venda] = []
-        self.carregar_vendas()  # Carrega vendas do arquivo do dia se existir
+        REGISTRO.configurar(self.config.get('instrumentacao.log_lento'),
+                            self.config.get('instrumentacao.limiar_ms'))
+        self.sincronizacao: Optional[ClienteSincronizacao] = None
+        if self.config.get('sincronizacao.servidor'):
+            self.sincronizacao = ClienteSincronizacao(self.config.get('sincronizacao.servidor'),
+                                                      self.config.get('sincronizacao.terminal'))
+        # Grava em segundo plano: um disco lento não trava a janela depois de cada venda
+        self.caixa = Caixa(self.config, sincronizacao=self.sincronizacao, gravacao_assincrona=True)
+        self._linhas_resumo: List[str] = []
+        self.grade: Optional[GradeVirtual] = None
+        # Vendas registradas enquanto o dia ainda está sendo lido (gravadas ao fim da carga)
+        self._carregando = False
+        self._vendas_em_espera: List[Venda] = []
+        # Mensagem da falha de carga: as vendas em espera ficam só em memória até o caixa ser reaberto
+        self._falha_carga: Optional[str] = None
 
         self.selected_item = None
         self.selected_id = None
 
+        # A janela é desenhada primeiro; as vendas do dia chegam depois
         self._criar_interface()
         self._configurar_atalhos()
+        self._iniciar_carga()
         self.atualizar_resumo()
+        self._atualizar_status_gravacao()
+        self.master.protocol("WM_DELETE_WINDOW", self.ao_fechar)
+        if self.caixa.catalogo.aviso:
+            messagebox.showwarning("Formas de Pagamento", self.caixa.catalogo.aviso)
+        if self.sincronizacao is not None:
+            self.sincronizacao.iniciar(lambda: self.caixa.dia)
+            self.master.after(INTERVALO_LOJA_MS, self._atualizar_resumo_loja)
+
+    # Estado do caixa (regras e persistência ficam em caixa.py)
+
+    @property
+    def vendas(self) -> ColecaoVendas:
+        return self.caixa.vendas
+
+    @property
+    def resumo(self) -> ResumoIncremental:
+        return self.caixa.resumo
+
+    @property
+    def repositorio(self) -> VendaRepository:
+        return self.caixa.repositorio
+
+    @property
+    def resumos_diarios(self) -> ResumosDiarios:
+        return self.caixa.resumos_diarios
 
     def _criar_interface(self):
         self._criar_frame_principal()
@@ -115,7 +115,7 @@ class SistemaCaixa:
 
         campos = [
             ("Vendedor:", "vendedor_cb", self.VENDEDORES, False),
-            ("Pagamento:", "pagamento_cb", self.PAGAMENTOS_COMPLETOS, False),
+            ("Pagamento:", "pagamento_cb", self.caixa.catalogo.rotulos, False),
             ("Observações:", "observacoes_cb", self.OBSERVACOES_OPCOES, True),
             ("Valor:", "valor_entry", None, False),
             ("Nº Boleta/Recibo:", "boleta_entry", None, False)
@@ -159,7 +159,10 @@ class SistemaCaixa:
         botoes = [
             ("Adicionar Venda (Alt+A)", self.adicionar_venda),
             ("Excluir Venda (Alt+E)", self.excluir_venda),
-            ("Gerar Relatório (Alt+R)", self.gerar_relatorio)
+            ("Gerar Relatório (Alt+R)", self.gerar_relatorio),
+            ("Relatório por Período (Alt+T)", self.gerar_relatorio_periodo),
+            ("Buscar (Alt+B)", self.abrir_busca),
+            ("Fechar Caixa (Alt+F)", self.abrir_fechamento)
         ]
 
         for texto, comando in botoes:
@@ -173,27 +176,57 @@ class SistemaCaixa:
         frame_vendas = ttk.Frame(frame_inferior)
         frame_vendas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        self._criar_filtros(frame_vendas)
+
+        self.grade = self._criar_grade_vendas(frame_vendas)
+        self.grade.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.grade.definir_itens(self.vendas)
+        self.tree = self.grade.tree
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_select, add='+')
+        self.tree.bind('<Double-1>', self.on_double_click)
+        self.tree.bind('<Delete>', lambda e: self.excluir_venda())
+
+    def _criar_grade_vendas(self, parent) -> GradeVirtual:
         colunas = [
             ("Vendedor", 100), ("Tipo", 100), ("Detalhes", 150),
             ("Bandeira", 100), ("Valor", 100), ("Boleta", 100),
             ("Troca", 60), ("Data", 150)
         ]
+        chaves_ordenacao = {
+            "Valor": lambda venda: venda.valor,
+            "Troca": lambda venda: venda.troca,
+            # dd/mm/aaaa hh:mm:ss -> aaaammdd hh:mm:ss
+            "Data": lambda venda: venda.data[6:10] + venda.data[3:5] + venda.data[:2] + venda.data[10:]
+        }
+        return GradeVirtual(parent, colunas, self._valores_treeview, chaves_ordenacao, chave=lambda venda: venda.id)
 
-        self.tree = ttk.Treeview(frame_vendas, columns=[col[0] for col in colunas], show='headings')
-
-        for col, width in colunas:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=width, anchor='center')
+    def _criar_filtros(self, parent):
+        frame_filtros = ttk.Frame(parent)
+        frame_filtros.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
 
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        ctk.CTkLabel(frame_filtros, text="Filtrar vendedor:").pack(side=tk.LEFT, padx=5)
+        self.filtro_vendedor_cb = ctk.CTkOptionMenu(
+            frame_filtros, values=[self.FILTRO_TODOS] + self.VENDEDORES,
+            command=lambda _: self._aplicar_filtros()
+        )
+        self.filtro_vendedor_cb.pack(side=tk.LEFT, padx=5)
 
-        scrollbar = ttk.Scrollbar(frame_vendas, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        ctk.CTkLabel(frame_filtros, text="Pagamento:").pack(side=tk.LEFT, padx=5)
+        self.filtro_tipo_cb = ctk.CTkOptionMenu(
+            frame_filtros, values=[self.FILTRO_TODOS, "Dinheiro", "PIX", "Troca", "Cartão"],
+            command=lambda _: self._aplicar_filtros()
+        )
+        self.filtro_tipo_cb.pack(side=tk.LEFT, padx=5)
 
-        self.tree.bind('<<TreeviewSelect>>', self.on_select)
-        self.tree.bind('<Double-1>', self.on_double_click)
-        self.tree.bind('<Delete>', lambda e: self.excluir_venda())
+    def _aplicar_filtros(self):
+        vendedor = self.filtro_vendedor_cb.get()
+        tipo = self.filtro_tipo_cb.get()
+        if vendedor == self.FILTRO_TODOS and tipo == self.FILTRO_TODOS:
+            self.grade.filtrar(None)
+            return
+        self.grade.filtrar(lambda venda: (vendedor in (self.FILTRO_TODOS, venda.vendedor)
+                                          and tipo in (self.FILTRO_TODOS, venda.tipo_pagamento)))
 
     def _criar_resumo(self):
         frame_resumo = ctk.CTkFrame(self.main_frame)
@@ -204,14 +237,25 @@ class SistemaCaixa:
         self.resumo_text = ctk.CTkTextbox(frame_resumo, width=300)
         self.resumo_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
+        # Situação da gravação em segundo plano; falhas aparecem aqui, sem diálogo
+        self.status_gravacao = ttk.Label(frame_resumo, text="", wraplength=300)
+        self.status_gravacao.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=(0, 5))
+
     def _configurar_atalhos(self):
         atalhos = {
             '<Alt-a>': self.adicionar_venda,
             '<Alt-e>': self.excluir_venda,
-            '<Alt-r>': self.gerar_relatorio
+            '<Alt-r>': self.gerar_relatorio,
+            '<Alt-t>': self.gerar_relatorio_periodo,
+            '<Alt-b>': self.abrir_busca,
+            '<Alt-f>': self.abrir_fechamento,
+            # Sem botão: painel de latências para diagnóstico
+            '<Alt-p>': self.abrir_painel_desempenho
         }
         for atalho, comando in atalhos.items():
             self.master.bind_all(atalho, lambda e, cmd=comando: cmd())
+        # Esc cancela a edição de uma venda
+        self.master.bind_all('<Escape>', lambda e: self.limpar_campos())
 
     def adicionar_venda(self):
         try:
@@ -219,71 +263,69 @@ class SistemaCaixa:
             if not dados_venda:
                 return
 
-            venda = Venda(**dados_venda)
-            self.vendas.append(venda)
-            self._adicionar_venda_treeview(venda)
-            self.atualizar_resumo()
-            self.salvar_vendas()
-            self.limpar_campos()
+            if self.selected_id is not None:
+                if self._aguardando_carga():
+                    return
+                self._salvar_edicao(dados_venda)
+                return
+
+            repetidas = self.vendas.por_boleta(dados_venda['numero_boleta'])
+            if repetidas and not messagebox.askyesno(
+                    "Confirmação",
+                    f"Já existe venda com a boleta {dados_venda['numero_boleta']}. Registrar mesmo assim?"):
+                return
+
+            if self._incluir_venda(Venda(**dados_venda)):
+                return
 
             messagebox.showinfo("Sucesso", "Venda registrada com sucesso!")
         except ValueError as e:
             messagebox.showerror("Erro", str(e))
 
-    def _coletar_dados_venda(self) -> Optional[Dict]:
-        vendedor = self.vendedor_cb.get()
-        pagamento_escolhido = self.pagamento_cb.get()
+    @medir('adicionar_venda')
+    def _incluir_venda(self, venda: Venda) -> bool:
+        """Parte medida de `adicionar_venda`, sem as caixas de diálogo; devolve True se a gravação falhou"""
+        if self._carregando or self._falha_carga is not None:
+            # Só em memória por enquanto: o repositório está ocupado com a leitura do dia (ou ela falhou)
+            self.vendas.adicionar(venda)
+            self.resumo.adicionar(venda)
+            self._vendas_em_espera.append(venda)
+            erro = False
+        else:
+            erro = self._registrar(self.caixa.adicionar, venda)
+        self._adicionar_venda_treeview(venda)
+        self.atualizar_resumo()
+        self.limpar_campos()
+        return erro
+
+    def _salvar_edicao(self, dados_venda: Dict):
+        anterior = self.vendas.obter(self.selected_id)
+        venda = Venda(**dados_venda, data=anterior.data, id=anterior.id)
+        erro = self._registrar(self.caixa.atualizar, venda)
+        self.grade.substituir(anterior, venda)
+        self.atualizar_resumo()
+        self.limpar_campos()
+        if erro:
+            return
 
-        if not vendedor or not pagamento_escolhido:
-            messagebox.showerror("Erro", "Selecione o vendedor e o tipo de pagamento.")
-            return None
+        messagebox.showinfo("Sucesso", "Venda atualizada com sucesso!")
 
+    def _coletar_dados_venda(self) -> Optional[Dict]:
         try:
-            valor = Decimal(self.valor_entry.get().replace(',', '.'))
-            # Permitir valor zero para "Troca"
-            if pagamento_escolhido != "Troca" and valor <= 0:
-                raise ValueError
-        except:
-            if pagamento_escolhido == "Troca":
-                # Para "Troca", se houver erro na conversão, assumimos valor zero
-                valor = Decimal('0.00')
-            else:
-                messagebox.showerror("Erro", "Valor inválido. Digite um número válido maior que zero.")
-                return None
-
-        tipo_pagamento, bandeira, detalhes_pagamento, troca = self._processar_pagamento(pagamento_escolhido)
-
-        numero_boleta = self.boleta_entry.get().strip()
-        if not numero_boleta:
-            messagebox.showerror("Erro", "Número da Boleta/Recibo é obrigatório.")
+            return validar_dados_venda(
+                self.vendedor_cb.get(),
+                self.pagamento_cb.get(),
+                self.valor_entry.get(),
+                self.boleta_entry.get(),
+                self.observacoes_cb.get(),
+                self.caixa.catalogo
+            )
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e))
             return None
 
-        return {
-            'vendedor': vendedor,
-            'tipo_pagamento': tipo_pagamento,
-            'detalhes_pagamento': detalhes_pagamento or self.observacoes_cb.get(),
-            'bandeira': bandeira,
-            'valor': valor,
-            'numero_boleta': numero_boleta,
-            'troca': troca
-        }
-
-    def _processar_pagamento(self, pagamento_escolhido: str) -> tuple:
-        if pagamento_escolhido == "Dinheiro":
-            return "Dinheiro", "", "", False
-        elif pagamento_escolhido == "PIX":
-            return "PIX", "", "", False
-        elif pagamento_escolhido == "Troca":
-            return "Troca", "", "", True
-        else:
-            partes = pagamento_escolhido.split(" - ")
-            if len(partes) == 2:
-                return "Cartão", partes[0], partes[1], False
-            else:
-                return pagamento_escolhido, "", "", False
-
-    def _adicionar_venda_treeview(self, venda: Venda):
-        self.tree.insert('', tk.END, values=(
+    def _valores_treeview(self, venda: Venda) -> tuple:
+        return (
             venda.vendedor,
             venda.tipo_pagamento,
             venda.detalhes_pagamento,
@@ -292,205 +334,674 @@ class SistemaCaixa:
             venda.numero_boleta,
             "Sim" if venda.troca else "Não",
             venda.data
-        ))
+        )
+
+    def _adicionar_venda_treeview(self, venda: Venda):
+        self.grade.adicionar(venda)
 
     def excluir_venda(self):
-        selected_item = self.tree.selection()
-        if not selected_item:
+        if self._aguardando_carga():
+            return
+        selecionadas = self.grade.selecao()
+        if not selecionadas:
             messagebox.showerror("Erro", "Nenhuma venda selecionada para excluir.")
             return
 
-        if messagebox.askyesno("Confirmação", "Deseja excluir a venda selecionada?"):
-            index = self.tree.index(selected_item)
-            self.tree.delete(selected_item)
-            del self.vendas[index]
+        if len(selecionadas) == 1:
+            pergunta = "Deseja excluir a venda selecionada?"
+        else:
+            pergunta = f"Deseja excluir as {len(selecionadas)} vendas selecionadas?"
+
+        if messagebox.askyesno("Confirmação", pergunta):
+            ids = [venda.id for venda in selecionadas]
+            self._registrar(self.caixa.excluir, ids)
+            self.grade.remover(*selecionadas)
             self.atualizar_resumo()
-            self.salvar_vendas()
+            if self.selected_id in ids:
+                self.limpar_campos()
 
     def limpar_campos(self):
         self.vendedor_cb.set(self.VENDEDORES[0])
-        self.pagamento_cb.set(self.PAGAMENTOS_COMPLETOS[0])
+        self.pagamento_cb.set(self.caixa.catalogo.rotulos[0])
         self.observacoes_cb.set(self.OBSERVACOES_OPCOES[0])
         self.valor_entry.delete(0, tk.END)
         self.boleta_entry.delete(0, tk.END)
+        self.selected_id = None
         self.vendedor_cb.focus_set()
 
+    def _preencher_campos(self, venda: Venda):
+        """Carrega uma venda nos campos de entrada para edição"""
+        self.pagamento_cb.set(rotulo_pagamento(venda, self.caixa.catalogo))
+        if venda.tipo_pagamento != "Cartão" and venda.detalhes_pagamento:
+            self.observacoes_cb.set(venda.detalhes_pagamento)
+        self.vendedor_cb.set(venda.vendedor)
+        self.valor_entry.delete(0, tk.END)
+        self.valor_entry.insert(0, f"{venda.valor:.2f}".replace('.', ','))
+        self.boleta_entry.delete(0, tk.END)
+        self.boleta_entry.insert(0, venda.numero_boleta)
+        self.selected_id = venda.id
+        self.valor_entry.focus_set()
+
     def gerar_relatorio(self):
+        if self._aguardando_carga():
+            return
         if not self.vendas:
             messagebox.showinfo("Relatório", "Nenhuma venda registrada.")
             return
 
+        # Cópia da lista: o relatório reflete as vendas do momento em que foi aberto
+        vendas = list(self.vendas)
+        self._abrir_janela_relatorio("Relatório Detalhado", lambda: linhas_relatorio(vendas), 'gerar_relatorio',
+                                     lambda: lotes_da_lista(vendas))
+
+    def gerar_relatorio_periodo(self):
+        if self._aguardando_carga():
+            return
+        janela = ctk.CTkToplevel(self.master)
+        janela.title("Relatório por Período")
+        janela.geometry("320x160")
+
+        hoje = datetime.now().date()
+        campos = {}
+        for linha, (rotulo, valor) in enumerate([("De (dd/mm/aaaa):", hoje.replace(day=1)), ("Até (dd/mm/aaaa):", hoje)]):
+            ctk.CTkLabel(janela, text=rotulo).grid(row=linha, column=0, sticky=tk.W, padx=5, pady=5)
+            entry = ctk.CTkEntry(janela)
+            entry.insert(0, valor.strftime("%d/%m/%Y"))
+            entry.grid(row=linha, column=1, sticky=tk.EW, padx=5, pady=5)
+            campos[linha] = entry
+
+        def gerar():
+            try:
+                inicio = datetime.strptime(campos[0].get().strip(), "%d/%m/%Y").date()
+                fim = datetime.strptime(campos[1].get().strip(), "%d/%m/%Y").date()
+            except ValueError:
+                messagebox.showerror("Erro", "Data inválida. Use o formato dd/mm/aaaa.", parent=janela)
+                return
+            if fim < inicio:
+                messagebox.showerror("Erro", "A data final é anterior à inicial.", parent=janela)
+                return
+            janela.destroy()
+            # O dia corrente ainda está aberto: entra pelas vendas em memória
+            vendas_do_dia = list(self.vendas)
+            self._abrir_janela_relatorio(
+                "Relatório por Período",
+                lambda: relatorio_periodo(self.resumos_diarios, inicio, fim, vendas_do_dia),
+                'gerar_relatorio_periodo',
+                lambda: lotes_do_periodo(self.repositorio, inicio, fim, vendas_do_dia)
+            )
+
+        ctk.CTkButton(janela, text="Gerar", command=gerar).grid(row=2, column=0, columnspan=2, pady=10)
+        campos[1].bind("<Return>", lambda e: gerar())
+        janela.columnconfigure(1, weight=1)
+
+    def abrir_busca(self):
+        """Busca por texto e valor em todas as vendas gravadas, com filtros por vendedor e pagamento"""
+        janela = ctk.CTkToplevel(self.master)
+        janela.title("Buscar Vendas")
+        janela.geometry("900x500")
+
+        frame_campos = ctk.CTkFrame(janela)
+        frame_campos.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+        ctk.CTkLabel(frame_campos, text="Texto:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        texto_entry = ctk.CTkEntry(frame_campos)
+        texto_entry.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=2)
+        ctk.CTkLabel(frame_campos, text="Valor (ex.: 99,90 ± 0,10):").grid(row=0, column=2, sticky=tk.W, padx=5, pady=2)
+        valor_entry = ctk.CTkEntry(frame_campos, width=140)
+        valor_entry.grid(row=0, column=3, sticky=tk.W, padx=5, pady=2)
+        ctk.CTkLabel(frame_campos, text="Vendedor:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=2)
+        vendedor_cb = ctk.CTkOptionMenu(frame_campos, values=[self.FILTRO_TODOS] + self.VENDEDORES)
+        vendedor_cb.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+        ctk.CTkLabel(frame_campos, text="Pagamento:").grid(row=1, column=2, sticky=tk.W, padx=5, pady=2)
+        tipo_cb = ctk.CTkOptionMenu(frame_campos, values=[self.FILTRO_TODOS, "Dinheiro", "PIX", "Troca", "Cartão"])
+        tipo_cb.grid(row=1, column=3, sticky=tk.W, padx=5, pady=2)
+        frame_campos.columnconfigure(1, weight=1)
+
+        frame_resultados = ttk.Frame(janela)
+        frame_resultados.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=5)
+        grade = self._criar_grade_vendas(frame_resultados)
+        grade.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        status_label = ttk.Label(janela, text="")
+        status_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+
+        estado = {'thread': None}
+
+        def buscar():
+            if estado['thread'] is not None:
+                return
+            try:
+                valor, tolerancia = interpretar_valor(valor_entry.get())
+            except ValueError as e:
+                messagebox.showerror("Erro", str(e), parent=janela)
+                return
+            facetas = {
+                'vendedor': None if vendedor_cb.get() == self.FILTRO_TODOS else vendedor_cb.get(),
+                'tipo_pagamento': None if tipo_cb.get() == self.FILTRO_TODOS else tipo_cb.get()
+            }
+            resultado = {}
+
+            def executar():
+                # Na primeira busca os índices dos dias fechados são lidos (ou montados) aqui
+                try:
+                    inicio = time.perf_counter()
+                    resultado['vendas'] = self.caixa.busca.buscar(texto_entry.get(), valor, tolerancia, **facetas)
+                    resultado['duracao'] = time.perf_counter() - inicio
+                except Exception as e:
+                    resultado['erro'] = e
+
+            status_label.configure(text="Buscando...")
+            estado['thread'] = threading.Thread(target=executar, daemon=True)
+            estado['thread'].start()
+            aguardar(resultado)
+
+        def aguardar(resultado: dict):
+            if not janela.winfo_exists():
+                return
+            if estado['thread'].is_alive():
+                janela.after(15, aguardar, resultado)
+                return
+            estado['thread'] = None
+            if 'erro' in resultado:
+                status_label.configure(text=f"Erro na busca: {resultado['erro']}")
+                return
+            vendas = resultado['vendas']
+            grade.definir_itens(vendas)
+            contagens = contar_facetas(vendas)
+            partes = [f"{len(vendas)} venda(s) em {resultado['duracao'] * 1000:.0f} ms"]
+            for campo, rotulo in (('vendedor', "Vendedor"), ('bandeira', "Bandeira")):
+                if contagens[campo]:
+                    partes.append(f"{rotulo}: " + ", ".join(
+                        f"{chave} ({quantidade})" for chave, quantidade in sorted(contagens[campo].items())))
+            status_label.configure(text="  |  ".join(partes))
+
+        ctk.CTkButton(frame_campos, text="Buscar", command=buscar).grid(row=0, column=4, rowspan=2, padx=5, pady=2)
+        for entry in (texto_entry, valor_entry):
+            entry.bind("<Return>", lambda e: buscar())
+        texto_entry.focus_set()
+
+    def abrir_fechamento(self):
+        """Conferência do fim do dia: valores contados por conta e por terminal contra os totais do sistema"""
+        if self._aguardando_carga():
+            return
+        if self.caixa.fechamento is not None:
+            messagebox.showinfo("Fechamento", "\n".join(self.caixa.fechamento.linhas()))
+            return
+        janela = ctk.CTkToplevel(self.master)
+        janela.title("Fechar Caixa")
+        janela.geometry("620x560")
+
+        frame_campos = ctk.CTkFrame(janela)
+        frame_campos.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+        entradas_contas: Dict[str, ctk.CTkEntry] = {}
+        entradas_terminais: Dict[str, ctk.CTkEntry] = {}
+        linha = 0
+        ctk.CTkLabel(frame_campos, text="Contado por forma de pagamento:").grid(
+            row=linha, column=0, columnspan=3, sticky=tk.W, padx=5, pady=2)
+        for conferencia in self.caixa.conferir({}):
+            if conferencia.conta == CONTA_CARTAO:
+                continue
+            linha += 1
+            ctk.CTkLabel(frame_campos, text=f"{conferencia.conta}:").grid(
+                row=linha, column=0, sticky=tk.W, padx=5, pady=2)
+            entradas_contas[conferencia.conta] = ctk.CTkEntry(frame_campos)
+            entradas_contas[conferencia.conta].grid(row=linha, column=1, sticky=tk.EW, padx=5, pady=2)
+            ctk.CTkLabel(frame_campos, text=f"sistema R$ {conferencia.esperado:.2f}").grid(
+                row=linha, column=2, sticky=tk.W, padx=5, pady=2)
+        linha += 1
+        ctk.CTkLabel(frame_campos, text="Total de cartão por terminal:").grid(
+            row=linha, column=0, columnspan=3, sticky=tk.W, padx=5, pady=(10, 2))
+        for terminal in self.OBSERVACOES_OPCOES:
+            linha += 1
+            ctk.CTkLabel(frame_campos, text=f"{terminal}:").grid(row=linha, column=0, sticky=tk.W, padx=5, pady=2)
+            entradas_terminais[terminal] = ctk.CTkEntry(frame_campos)
+            entradas_terminais[terminal].grid(row=linha, column=1, sticky=tk.EW, padx=5, pady=2)
+        frame_campos.columnconfigure(1, weight=1)
+
+        conferencia_label = ttk.Label(janela, text="", justify=tk.LEFT, font=("Courier", 10))
+        conferencia_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+
+        def coletar() -> tuple:
+            contado = {conta: ler_valor_contado(entry.get()) for conta, entry in entradas_contas.items()}
+            terminais = {terminal: ler_valor_contado(entry.get())
+                         for terminal, entry in entradas_terminais.items() if entry.get().strip()}
+            return contado, terminais
+
+        def atualizar_conferencia():
+            # Só os totais incrementais: a conferência é refeita a cada tecla sem percorrer as vendas
+            try:
+                conferencias = self.caixa.conferir(*coletar())
+            except ValueError as e:
+                conferencia_label.configure(text=str(e))
+                return
+            conferencia_label.configure(text="\n".join(linhas_conferencia(conferencias)))
+
+        def fechar_dia():
+            try:
+                contado, terminais = coletar()
+            except ValueError as e:
+                messagebox.showerror("Erro", str(e), parent=janela)
+                return
+            if not messagebox.askyesno(
+                    "Fechar Caixa",
+                    "Depois do fechamento as vendas do dia ficam congeladas e qualquer alteração "
+                    "é registrada como correção. Fechar o caixa?", parent=janela):
+                return
+            try:
+                fechamento = self.caixa.fechar_dia(contado, terminais)
+            except (ValueError, ErroPersistencia, OSError) as e:
+                messagebox.showerror("Erro", f"Erro ao fechar o caixa: {str(e)}", parent=janela)
+                return
+            janela.destroy()
+            self.atualizar_resumo()
+            messagebox.showinfo("Fechamento", "\n".join(fechamento.linhas()))
+
+        for entry in list(entradas_contas.values()) + list(entradas_terminais.values()):
+            entry.bind("<KeyRelease>", lambda e: atualizar_conferencia())
+        ttk.Button(janela, text="Fechar o Dia", command=fechar_dia).pack(side=tk.TOP, pady=10)
+        atualizar_conferencia()
+        if entradas_contas:
+            next(iter(entradas_contas.values())).focus_set()
+
+    def _abrir_janela_relatorio(self, titulo: str, gerar_linhas: Callable[[], Iterator[str]], operacao: str,
+                                gerar_lotes: Optional[Callable[[], Tuple[Iterator[List[Venda]], int]]] = None):
+        """
+        Abre a janela de relatório e preenche o texto em segundo plano.
+        `gerar_linhas` cria um novo gerador a cada chamada (exibição e gravação).
+        O tempo até o último bloco é registrado como `operacao` na instrumentação.
+        Com `gerar_lotes` (veja exportacao.py), a janela também exporta as vendas.
+        """
+        inicio = time.perf_counter()
         relatorio_window = ctk.CTkToplevel(self.master)
-        relatorio_window.title("Relatório Detalhado")
+        relatorio_window.title(titulo)
         relatorio_window.geometry("800x600")
 
         text_area = ctk.CTkTextbox(relatorio_window, wrap="word", font=FONT_ENTRY)
         text_area.pack(expand=True, fill='both', padx=10, pady=10)
 
-        vendas_por_vendedor = self._agrupar_vendas_por_vendedor()
-        self._gerar_conteudo_relatorio(text_area, vendas_por_vendedor)
-
         frame_botoes = ttk.Frame(relatorio_window)
         frame_botoes.pack(pady=5)
 
-        ttk.Button(
+        status_label = ttk.Label(frame_botoes, text="Gerando relatório...")
+        status_label.pack(side=tk.LEFT, padx=5)
+
+        produtor = ProdutorEmSegundoPlano(em_blocos(gerar_linhas()))
+
+        btn_salvar = ttk.Button(
             frame_botoes,
             text="Salvar Relatório",
-            command=lambda: self._salvar_relatorio(text_area.get("1.0", tk.END))
-        ).pack(side=tk.LEFT, padx=5)
+            command=lambda: self._salvar_relatorio(gerar_linhas)
+        )
+        btn_salvar.pack(side=tk.LEFT, padx=5)
+
+        if gerar_lotes is not None:
+            ttk.Button(
+                frame_botoes,
+                text="Exportar...",
+                command=lambda: self._exportar_relatorio(relatorio_window, titulo, gerar_lotes)
+            ).pack(side=tk.LEFT, padx=5)
+
+        btn_cancelar = ttk.Button(frame_botoes, text="Cancelar", command=produtor.cancelar)
+        btn_cancelar.pack(side=tk.LEFT, padx=5)
+
+        def fechar():
+            produtor.cancelar()
+            relatorio_window.destroy()
 
         ttk.Button(
             frame_botoes,
             text="Fechar",
-            command=relatorio_window.destroy
+            command=fechar
         ).pack(side=tk.LEFT, padx=5)
+        relatorio_window.protocol("WM_DELETE_WINDOW", fechar)
 
-    def _agrupar_vendas_por_vendedor(self) -> Dict[str, List[Venda]]:
-        vendas_por_vendedor = {}
-        for venda in self.vendas:
-            vendas_por_vendedor.setdefault(venda.vendedor, []).append(venda)
-        return vendas_por_vendedor
-
-    def _gerar_conteudo_relatorio(self, text_area: ctk.CTkTextbox, vendas_por_vendedor: Dict[str, List[Venda]]):
-        for vendedor, lista_vendas in vendas_por_vendedor.items():
-            text_area.insert(tk.END, f"\nVendedor: {vendedor}\n")
-            text_area.insert(tk.END, "="*50 + "\n\n")
-
-            total_vendas = Decimal('0.00')
-            resumo_pagamentos = {}
-            resumo_bandeiras = {}
-            trocas = []
-
-            text_area.insert(tk.END, "DETALHAMENTO DAS VENDAS:\n\n")
-            for venda in lista_vendas:
-                total_vendas += venda.valor
-                self._atualizar_resumos(venda, resumo_pagamentos, resumo_bandeiras, trocas)
-                self._inserir_detalhes_venda(text_area, venda)
-
-            self._inserir_resumos(text_area, total_vendas, resumo_pagamentos, resumo_bandeiras, trocas)
-            text_area.insert(tk.END, "\n" + "-"*50 + "\n")
-
-    def _atualizar_resumos(self, venda: Venda, resumo_pagamentos: dict, resumo_bandeiras: dict, trocas: list):
-        key_pagamento = venda.tipo_pagamento
-        if venda.detalhes_pagamento and venda.tipo_pagamento not in ["Dinheiro", "PIX", "Troca"]:
-            key_pagamento += f" - {venda.detalhes_pagamento}"
-
-        resumo_pagamentos[key_pagamento] = resumo_pagamentos.get(key_pagamento, Decimal('0.00')) + venda.valor
-
-        if venda.bandeira:
-            resumo_bandeiras[venda.bandeira] = resumo_bandeiras.get(venda.bandeira, Decimal('0.00')) + venda.valor
-
-        if venda.troca:
-            trocas.append(venda)
-
-    def _inserir_detalhes_venda(self, text_area: ctk.CTkTextbox, venda: Venda):
-        text_area.insert(tk.END, f"Data/Hora: {venda.data}\n")
-        text_area.insert(tk.END, f"Boleta Nº: {venda.numero_boleta}\n")
-        text_area.insert(tk.END, f"Pagamento: {venda.tipo_pagamento}\n")
-        
-        if venda.detalhes_pagamento:
-            text_area.insert(tk.END, f"Detalhes: {venda.detalhes_pagamento}\n")
-        if venda.bandeira:
-            text_area.insert(tk.END, f"Bandeira: {venda.bandeira}\n")
-            
-        text_area.insert(tk.END, f"Valor: R$ {venda.valor:.2f}\n")
-        text_area.insert(tk.END, f"Troca: {'Sim' if venda.troca else 'Não'}\n\n")
-
-    def _inserir_resumos(self, text_area: ctk.CTkTextbox, total_vendas: Decimal, 
-                         resumo_pagamentos: dict, resumo_bandeiras: dict, trocas: list):
-        text_area.insert(tk.END, f"\nTOTAL DE VENDAS: R$ {total_vendas:.2f}\n\n")
-        
-        text_area.insert(tk.END, "RESUMO POR TIPO DE PAGAMENTO:\n")
-        for tipo, valor in sorted(resumo_pagamentos.items()):
-            text_area.insert(tk.END, f"- {tipo}: R$ {valor:.2f}\n")
-
-        if resumo_bandeiras:
-            text_area.insert(tk.END, "\nRESUMO POR BANDEIRA:\n")
-            for bandeira, valor in sorted(resumo_bandeiras.items()):
-                text_area.insert(tk.END, f"- {bandeira}: R$ {valor:.2f}\n")
-
-        if trocas:
-            total_trocas = sum(troca.valor for troca in trocas)
-            text_area.insert(tk.END, "\nTROCAS REALIZADAS:\n")
-            for troca in trocas:
-                text_area.insert(tk.END, f"- Boleta {troca.numero_boleta}: R$ {troca.valor:.2f}\n")
-            text_area.insert(tk.END, f"\nTotal de Trocas: R$ {total_trocas:.2f}\n")
-
-    def _salvar_relatorio(self, conteudo: str):
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            nome_arquivo = f"relatorio_{timestamp}.txt"
-            with open(nome_arquivo, "w", encoding="utf-8") as file:
-                file.write(conteudo)
-            messagebox.showinfo("Sucesso", f"Relatório salvo como '{nome_arquivo}'")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao salvar relatório: {str(e)}")
+        medida = (operacao, inicio)
+        self._receber_relatorio(relatorio_window, text_area, status_label, btn_cancelar, produtor, medida)
 
-    def atualizar_resumo(self):
-        self.resumo_text.configure(state='normal')
-        self.resumo_text.delete("1.0", tk.END)
+    def _receber_relatorio(self, janela, text_area: ctk.CTkTextbox, status_label: ttk.Label,
+                           btn_cancelar: ttk.Button, produtor: ProdutorEmSegundoPlano, medida: tuple):
+        """Insere na caixa de texto os blocos já gerados e reagenda a si mesmo até o fim"""
+        if not janela.winfo_exists():
+            return
+        if produtor.cancelado:
+            status_label.configure(text="Geração cancelada.")
+            btn_cancelar.configure(state='disabled')
+            return
 
-        if not self.vendas:
-            self.resumo_text.insert(tk.END, "Nenhuma venda registrada.\n")
-            self.resumo_text.configure(state='disabled')
+        blocos, terminou = produtor.coletar()
+        for bloco in blocos:
+            text_area.insert(tk.END, bloco)
+
+        if terminou:
+            btn_cancelar.configure(state='disabled')
+            if produtor.erro is not None:
+                status_label.configure(text=f"Erro ao gerar relatório: {produtor.erro}")
+            else:
+                operacao, inicio = medida
+                REGISTRO.registrar(operacao, time.perf_counter() - inicio)
+                status_label.configure(text="Relatório concluído.")
+            return
+        janela.after(15, self._receber_relatorio, janela, text_area, status_label, btn_cancelar, produtor, medida)
+
+    def _salvar_relatorio(self, gerar_linhas: Callable[[], Iterator[str]]):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        nome_arquivo = f"relatorio_{timestamp}.txt"
+        resultado = {}
+
+        def gravar():
+            try:
+                salvar_relatorio(gerar_linhas(), nome_arquivo)
+            except Exception as e:
+                resultado['erro'] = e
+
+        thread = threading.Thread(target=gravar, daemon=True)
+        thread.start()
+
+        def aguardar():
+            if thread.is_alive():
+                self.master.after(50, aguardar)
+            elif 'erro' in resultado:
+                messagebox.showerror("Erro", f"Erro ao salvar relatório: {str(resultado['erro'])}")
+            else:
+                messagebox.showinfo("Sucesso", f"Relatório salvo como '{nome_arquivo}'")
+
+        aguardar()
+
+    def _exportar_relatorio(self, janela, titulo: str, gerar_lotes: Callable[[], Tuple[Iterator[List[Venda]], int]]):
+        """Exporta para CSV, XLSX ou PDF em segundo plano, com barra de progresso e cancelamento"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        caminho = filedialog.asksaveasfilename(
+            parent=janela,
+            title="Exportar Relatório",
+            initialfile=f"relatorio_{timestamp}.xlsx",
+            defaultextension=".xlsx",
+            filetypes=[("Planilha Excel", "*.xlsx"), ("CSV", "*.csv"), ("PDF", "*.pdf")]
+        )
+        if not caminho:
             return
 
-        total_geral = Decimal('0.00')
-        resumo_por_tipo = {}
-        resumo_por_bandeira = {}
-        trocas = []
+        progresso_window = ctk.CTkToplevel(janela)
+        progresso_window.title("Exportando")
+        progresso_window.geometry("360x120")
+        barra = ttk.Progressbar(progresso_window, mode='determinate', maximum=1)
+        barra.pack(fill=tk.X, padx=10, pady=10)
+        status_label = ttk.Label(progresso_window, text="Preparando...")
+        status_label.pack(padx=10)
+        cancelar = threading.Event()
+        ttk.Button(progresso_window, text="Cancelar", command=cancelar.set).pack(pady=5)
+        progresso_window.protocol("WM_DELETE_WINDOW", cancelar.set)
+
+        # Escrito pela thread de exportação, lido pelo `after` abaixo
+        estado = {'feitos': 0, 'total': 0}
+
+        def progresso(feitos: int, total: Optional[int]):
+            estado['feitos'], estado['total'] = feitos, total or 0
+
+        def executar():
+            try:
+                lotes, total = gerar_lotes()
+                estado['total'] = total
+                estado['quantidade'] = exportar(caminho, lotes, total, titulo, progresso, cancelar)
+            except Exception as e:
+                estado['erro'] = e
+
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+
+        def aguardar():
+            if thread.is_alive():
+                if progresso_window.winfo_exists():
+                    barra.configure(maximum=max(estado['total'], 1), value=estado['feitos'])
+                    status_label.configure(text=f"{estado['feitos']} de {estado['total']} lote(s)"
+                                           + (" - cancelando..." if cancelar.is_set() else ""))
+                self.master.after(100, aguardar)
+                return
+            if progresso_window.winfo_exists():
+                progresso_window.destroy()
+            erro = estado.get('erro')
+            if isinstance(erro, ExportacaoCancelada):
+                messagebox.showinfo("Exportação", "Exportação cancelada; nenhum arquivo foi gravado.")
+            elif erro is not None:
+                messagebox.showerror("Erro", f"Erro ao exportar relatório: {str(erro)}")
+            else:
+                messagebox.showinfo("Sucesso", f"{estado['quantidade']} venda(s) exportada(s) para '{caminho}'")
 
-        for venda in self.vendas:
-            self._atualizar_resumos(venda, resumo_por_tipo, resumo_por_bandeira, trocas)
-            total_geral += venda.valor
+        aguardar()
 
-        self._inserir_resumo_geral(total_geral, resumo_por_tipo, resumo_por_bandeira, trocas)
+    @medir('atualizar_resumo')
+    def atualizar_resumo(self):
+        """Atualiza o painel de resumo reescrevendo apenas as linhas que mudaram"""
+        linhas = (self.resumo.linhas() + self.caixa.linhas_liquido() + self.caixa.linhas_fechamento()
+                  + self._linhas_loja())
+        if self._carregando:
+            linhas = ["Carregando vendas do dia...", ""] + linhas
+        elif self._falha_carga is not None:
+            linhas = ["Vendas do dia não carregadas: as novas ficam só em memória.", ""] + linhas
+        if self.caixa.catalogo.aviso:
+            linhas = [self.caixa.catalogo.aviso, ""] + linhas
+        self.resumo_text.configure(state='normal')
+
+        # Aplica as diferenças de trás para frente para não deslocar os índices
+        opcodes = SequenceMatcher(None, self._linhas_resumo, linhas, autojunk=False).get_opcodes()
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag == 'equal':
+                continue
+            self.resumo_text.delete(f"{i1 + 1}.0", f"{i2 + 1}.0")
+            if j1 < j2:
+                self.resumo_text.insert(f"{i1 + 1}.0", "".join(linha + "\n" for linha in linhas[j1:j2]))
+
+        self._linhas_resumo = linhas
         self.resumo_text.configure(state='disabled')
 
-    def _inserir_resumo_geral(self, total_geral: Decimal, resumo_por_tipo: dict, 
-                              resumo_por_bandeira: dict, trocas: list):
-        self.resumo_text.insert(tk.END, f"Total Geral: R$ {total_geral:.2f}\n\n")
-        
-        self.resumo_text.insert(tk.END, "Por Tipo de Pagamento:\n")
-        for tipo, valor in sorted(resumo_por_tipo.items()):
-            self.resumo_text.insert(tk.END, f"- {tipo}: R$ {valor:.2f}\n")
-
-        if resumo_por_bandeira:
-            self.resumo_text.insert(tk.END, "\nPor Bandeira:\n")
-            for bandeira, valor in sorted(resumo_por_bandeira.items()):
-                self.resumo_text.insert(tk.END, f"- {bandeira}: R$ {valor:.2f}\n")
-
-        if trocas:
-            total_trocas = sum(troca.valor for troca in trocas)
-            self.resumo_text.insert(tk.END, f"\nTotal de Trocas: R$ {total_trocas:.2f}\n")
-
-    def carregar_vendas(self):
-        """Carrega vendas salvas do arquivo de backup do dia atual, se existir"""
+    def _linhas_loja(self) -> List[str]:
+        """Totais de todos os caixas, quando a sincronização está ligada"""
+        if self.sincronizacao is None:
+            return []
+        resumo = self.sincronizacao.resumo_loja
+        if not self.sincronizacao.online or resumo is None:
+            return ["", f"Loja: sem conexão ({self.sincronizacao.quantidade_pendente} pendentes)"]
+        return ["", "Loja (todos os caixas):", f"Total: R$ {resumo['total']:.2f} em {resumo['quantidade']} vendas"]
+
+    def _atualizar_resumo_loja(self):
+        self.atualizar_resumo()
+        self.master.after(INTERVALO_LOJA_MS, self._atualizar_resumo_loja)
+
+    def _iniciar_carga(self):
+        """Lê o dia numa thread, depois que a janela e os campos já foram desenhados"""
+        self._carregando = True
+        resultado = {}
+
+        def iniciar():
+            inicio = time.perf_counter()
+            thread = threading.Thread(target=self._ler_dia, args=(resultado,), daemon=True)
+            thread.start()
+            self.master.after(15, self._concluir_carga, thread, resultado, inicio)
+
+        self.master.after_idle(iniciar)
+
+    def _ler_dia(self, resultado: dict):
+        """Parte da carga que roda na thread: lê as vendas e soma os totais, sem tocar na janela"""
         try:
-            if os.path.exists(self.ARQUIVO_BACKUP):
-                with open(self.ARQUIVO_BACKUP, 'r', encoding='utf-8') as file:
-                    dados = json.load(file)
-                    self.vendas = [Venda.from_dict(venda_dict) for venda_dict in dados]
-                    # Carregar vendas na Treeview
-                    for venda in self.vendas:
-                        self._adicionar_venda_treeview(venda)
+            vendas = self.caixa.ler()
+            resultado['vendas'] = (vendas, ResumoIncremental(vendas, self.caixa.catalogo))
         except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar vendas: {str(e)}")
+            resultado['erro'] = e
 
-    def salvar_vendas(self):
-        """Salva as vendas no arquivo de backup do dia atual"""
+    def _concluir_carga(self, thread: threading.Thread, resultado: dict, inicio: float):
+        if thread.is_alive():
+            self.master.after(15, self._concluir_carga, thread, resultado, inicio)
+            return
+        self._assumir_carga(resultado, inicio)
+
+    def _assumir_carga(self, resultado: dict, inicio: float):
+        """De volta à thread da janela: assume as vendas lidas e grava as registradas durante a carga"""
+        self._carregando = False
+        if 'erro' in resultado:
+            # Nada é gravado: o journal ou o JSON seguiriam sem as vendas que não foram lidas
+            self._falha_carga = str(resultado['erro'])
+            messagebox.showerror(
+                "Erro", f"Erro ao carregar vendas: {self._falha_carga}\n"
+                        f"As vendas registradas agora ficam só em memória; ao fechar o caixa, vão para "
+                        f"um arquivo de recuperação gravado no dia na próxima carga que der certo.")
+            self.grade.definir_itens(self.vendas)
+            self.atualizar_resumo()
+            return
+        self.caixa.carregar(*resultado['vendas'])
+        REGISTRO.registrar('carregar_vendas', time.perf_counter() - inicio)
+        espera, self._vendas_em_espera = self._vendas_em_espera, []
+        if espera:
+            self._registrar(self.caixa.adicionar_lote, espera)
+        # Dias antigos vão para os arquivos mensais na thread de gravação; falhas aparecem no status
+        self.caixa.gravador.agendar('arquivar', self.caixa.arquivar_fechados)
+        self.grade.definir_itens(self.vendas)
+        self.atualizar_resumo()
+
+    def _aguardando_carga(self) -> bool:
+        """Avisa e devolve True enquanto as vendas do dia ainda estão sendo lidas"""
+        if self._falha_carga is not None:
+            messagebox.showerror("Erro", f"As vendas do dia não foram carregadas ({self._falha_carga}).\n"
+                                         f"Feche e abra o caixa de novo para editar, excluir ou fechar o dia.")
+            return True
+        if self._carregando:
+            messagebox.showinfo("Aguarde", "As vendas do dia ainda estão sendo carregadas.")
+        return self._carregando
+
+    def _atualizar_status_gravacao(self):
+        """Mostra pendências e falhas da gravação em segundo plano (sem caixas de diálogo)"""
+        gravador = self.caixa.gravador
+        if gravador.erro is not None:
+            momento = datetime.fromtimestamp(gravador.momento_erro).strftime('%H:%M:%S')
+            texto = f"Falha ao gravar ({gravador.falhas}x, última às {momento}): {gravador.erro}"
+            self.status_gravacao.configure(text=texto, foreground='red')
+        elif gravador.pendentes:
+            self.status_gravacao.configure(text="Gravando...", foreground='')
+        else:
+            self.status_gravacao.configure(text="Vendas gravadas.", foreground='')
+        self.master.after(INTERVALO_GRAVACAO_MS, self._atualizar_status_gravacao)
+
+    def ao_fechar(self):
+        """Fecha a janela só depois que a carga terminou e a fila de gravação chegou ao disco"""
+        if self._carregando:
+            # As vendas registradas durante a carga ainda não foram entregues ao gravador
+            self.master.after(INTERVALO_GRAVACAO_MS, self.ao_fechar)
+            return
+        if self._falha_carga is not None and self._vendas_em_espera and not self._salvar_pendentes():
+            return
+        self.master.protocol("WM_DELETE_WINDOW", lambda: None)
+        self._aguardar_fechamento(time.monotonic() + TEMPO_ENCERRAR_S)
+
+    def _salvar_pendentes(self) -> bool:
+        """Guarda as vendas registradas depois de uma carga que falhou; False se o fechamento foi cancelado"""
         try:
-            dados = [venda.to_dict() for venda in self.vendas]
-            with open(self.ARQUIVO_BACKUP, 'w', encoding='utf-8') as file:
-                json.dump(dados, file, ensure_ascii=False, indent=2)
+            # Nunca nos arquivos do dia, que não foram lidos: a próxima carga que der certo as grava
+            caminho = self.caixa.salvar_recuperacao(self._vendas_em_espera)
+            messagebox.showinfo("Atenção", f"{len(self._vendas_em_espera)} venda(s) registradas sem a carga do dia "
+                                           f"foram salvas em '{caminho}' e voltam na próxima abertura.")
+            return True
         except Exception as e:
+            return messagebox.askyesno(
+                "Erro", f"Erro ao salvar vendas: {str(e)}\nFechar mesmo assim? As vendas registradas serão perdidas.")
+
+    def _aguardar_fechamento(self, prazo: float):
+        gravador = self.caixa.gravador
+        if gravador.pendentes and time.monotonic() < prazo:
+            self.status_gravacao.configure(text=f"Fechando: gravando {gravador.pendentes} alteração(ões)...")
+            self.master.after(INTERVALO_GRAVACAO_MS // 5, self._aguardar_fechamento, prazo)
+            return
+        if gravador.pendentes or gravador.erro is not None:
+            # Nem tudo chegou ao repositório: a memória vai para o arquivo de recuperação,
+            # que a próxima carga grava no dia (o JSON do dia seria ignorado pelo journal)
+            try:
+                caminho = self.caixa.salvar_recuperacao(list(self.vendas))
+                messagebox.showwarning(
+                    "Atenção", f"Nem todas as alterações foram gravadas ({gravador.erro or 'tempo esgotado'}).\n"
+                               f"As vendas do dia foram salvas em '{caminho}' e voltam na próxima abertura.")
+            except Exception as e:
+                if not messagebox.askyesno(
+                        "Erro", f"Erro ao salvar vendas: {str(e)}\nFechar mesmo assim? As alterações não gravadas serão perdidas."):
+                    self.master.protocol("WM_DELETE_WINDOW", self.ao_fechar)
+                    return
+        if self.sincronizacao is not None:
+            self.sincronizacao.parar()
+        # Com o prazo esgotado, não espera de novo: o backup acima já tem as vendas
+        self.caixa.fechar(timeout=0 if gravador.pendentes else None)
+        self.master.destroy()
+
+    def abrir_painel_desempenho(self):
+        """Percentis de latência das operações medidas e captura do cProfile sob demanda"""
+        janela = ctk.CTkToplevel(self.master)
+        janela.title("Desempenho")
+        janela.geometry("560x300")
+
+        texto = ctk.CTkTextbox(janela, font=("Courier", 12))
+        texto.pack(expand=True, fill='both', padx=10, pady=10)
+
+        frame_botoes = ttk.Frame(janela)
+        frame_botoes.pack(pady=5)
+        status_label = ttk.Label(frame_botoes, text="")
+        status_label.pack(side=tk.LEFT, padx=5)
+
+        def capturar():
+            if REGISTRO.perfilando:
+                return
+            REGISTRO.iniciar_perfil()
+            status_label.configure(text=f"Capturando perfil ({DURACAO_PERFIL_S} s)...")
+            # Agendado na janela principal: a captura termina mesmo se o painel for fechado
+            self.master.after(DURACAO_PERFIL_S * 1000, terminar_captura)
+
+        def terminar_captura():
+            try:
+                caminho = REGISTRO.parar_perfil()
+            except OSError as e:
+                messagebox.showerror("Erro", f"Erro ao gravar perfil: {str(e)}")
+                return
+            if janela.winfo_exists():
+                status_label.configure(text=f"Perfil salvo em '{caminho}'")
+
+        def verificar_totais():
+            # Os totais do painel de resumo, mantidos venda a venda, contra uma soma do zero
+            divergencias = self.resumo.verificar(self.vendas)
+            if divergencias:
+                status_label.configure(text=f"{len(divergencias)} divergência(s) nos totais")
+                messagebox.showwarning("Totais", "\n".join(divergencias), parent=janela)
+            else:
+                status_label.configure(text=f"Totais conferidos ({len(self.vendas)} vendas)")
+
+        ttk.Button(frame_botoes, text=f"Capturar perfil ({DURACAO_PERFIL_S} s)", command=capturar).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_botoes, text="Verificar totais", command=verificar_totais).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_botoes, text="Zerar", command=REGISTRO.zerar).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_botoes, text="Fechar", command=janela.destroy).pack(side=tk.LEFT, padx=5)
+
+        def atualizar():
+            if not janela.winfo_exists():
+                return
+            linhas = [f"{'Operação':26s}{'n':>7s}{'p50':>9s}{'p95':>9s}{'p99':>9s}{'máx':>9s}  (ms)"]
+            for nome, medidas in REGISTRO.percentis().items():
+                linhas.append(f"{nome:26s}{medidas['quantidade']:7d}{medidas['p50']:9.1f}{medidas['p95']:9.1f}"
+                              f"{medidas['p99']:9.1f}{medidas['maximo']:9.1f}")
+            texto.configure(state='normal')
+            texto.delete("1.0", tk.END)
+            texto.insert("1.0", "\n".join(linhas))
+            texto.configure(state='disabled')
+            janela.after(INTERVALO_PAINEL_MS, atualizar)
+
+        atualizar()
+
+    def _registrar(self, operacao: Callable, *args) -> bool:
+        """Aplica a operação no caixa; devolve True se a gravação falhou"""
+        try:
+            operacao(*args)
+            return False
+        except ErroPersistencia as e:
             messagebox.showerror("Erro", f"Erro ao salvar vendas: {str(e)}")
+            return True
 
     def on_select(self, event):
-        pass
+        selecionadas = self.grade.selecao()
+        self.selected_item = selecionadas[0] if len(selecionadas) == 1 else None
 
     def on_double_click(self, event):
-        pass
+        iid = self.tree.identify_row(event.y)
+        if iid and iid in self.vendas:
+            self._preencher_campos(self.vendas.obter(iid))
 
 if __name__ == "__main__":
     ctk.set_appearance_mode("System")
@@ -0,0 +1,64 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from vendas import ColecaoVendas, Venda
+from agregados import ResumoIncremental, resumir
+
+
+def _venda_aleatoria(aleatorio: random.Random, id_venda: str = None) -> Venda:
+    tipo = aleatorio.choice(["Dinheiro", "PIX", "Cartão", "Cartão", "Troca"])
+    cartao = tipo == "Cartão"
+    return Venda(
+        vendedor=aleatorio.choice(["João", "Maria", "Pedro", "Ana"]),
+        tipo_pagamento=tipo,
+        detalhes_pagamento=aleatorio.choice(["Débito", "Crédito"]) if cartao else aleatorio.choice(["", "PDV"]),
+        bandeira=aleatorio.choice(["Visa", "Mastercard", "Elo"]) if cartao else "",
+        valor=f"{aleatorio.randint(0, 99999) / 100:.2f}",
+        numero_boleta=str(aleatorio.randint(1, 50)),
+        troca=tipo == "Troca",
+        data="15/03/2024 10:00:00",
+        id=id_venda
+    )
+
+
+@pytest.mark.parametrize('semente', range(20))
+def test_sequencias_aleatorias_batem_com_recalculo(semente):
+    aleatorio = random.Random(semente)
+    vendas = ColecaoVendas()
+    resumo = ResumoIncremental()
+    for _ in range(300):
+        operacao = aleatorio.random()
+        if not len(vendas) or operacao < 0.5:
+            venda = _venda_aleatoria(aleatorio)
+            vendas.adicionar(venda)
+            resumo.adicionar(venda)
+        elif operacao < 0.75:
+            alvo = aleatorio.choice(list(vendas))
+            nova = _venda_aleatoria(aleatorio, alvo.id)
+            resumo.remover(vendas.substituir(nova))
+            resumo.adicionar(nova)
+        else:
+            resumo.remover(vendas.remover(aleatorio.choice(list(vendas)).id))
+        assert resumo.verificar(vendas) == []
+    assert resumo.como_dict() == resumir(vendas)
+
+
+def test_excluir_tudo_zera_as_chaves():
+    aleatorio = random.Random(7)
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(50)]
+    resumo = ResumoIncremental(vendas)
+    for venda in vendas:
+        resumo.remover(venda)
+    assert resumo.verificar([]) == []
+    assert resumo.total == Decimal('0.00')
+    assert resumo.por_tipo == {} and resumo.por_bandeira == {} and resumo.por_vendedor == {}
+
+
+def test_verificar_aponta_divergencia():
+    venda = _venda_aleatoria(random.Random(1))
+    resumo = ResumoIncremental([venda])
+    resumo.total += Decimal('0.01')
+    divergencias = resumo.verificar([venda])
+    assert len(divergencias) == 1 and divergencias[0].startswith("total:")
@@ -0,0 +1,123 @@
+import os
+import random
+from decimal import Decimal
+
+import pytest
+
+from caixa import Caixa, ErroPersistencia
+from vendas import Venda
+from armazenamento import JournalVendaRepository, JsonVendaRepository, exportar_json
+
+from test_agregados import _venda_aleatoria
+
+
+def test_journal_com_snapshot_ilegivel_nao_recebe_gravacoes(tmp_path):
+    aleatorio = random.Random(5)
+    repositorio = JournalVendaRepository(str(tmp_path), compactar_a_cada=10)
+    repositorio.carregar()
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(15)]
+    repositorio.adicionar_lote(vendas)
+    repositorio.fechar()
+    with open(repositorio.arquivo_journal, 'rb') as file:
+        journal = file.read()
+    with open(repositorio.arquivo_snapshot, 'r+b') as file:
+        file.truncate(20)
+
+    reaberto = JournalVendaRepository(str(tmp_path), compactar_a_cada=10)
+    with pytest.raises(ValueError):
+        reaberto.carregar()
+    # Com o seq de volta a zero, estas vendas seriam ignoradas na próxima carga
+    with pytest.raises(OSError):
+        reaberto.adicionar(_venda_aleatoria(aleatorio))
+    with pytest.raises(OSError):
+        reaberto.compactar()
+    with open(repositorio.arquivo_journal, 'rb') as file:
+        assert file.read() == journal
+
+
+def test_caixa_sem_carga_transforma_a_recusa_em_erro_de_persistencia(tmp_path):
+    aleatorio = random.Random(6)
+    caixa = Caixa(pasta=str(tmp_path))
+    with pytest.raises(ErroPersistencia):
+        caixa.adicionar(_venda_aleatoria(aleatorio))
+
+
+def test_json_ilegivel_nao_e_sobrescrito(tmp_path):
+    aleatorio = random.Random(7)
+    repositorio = JsonVendaRepository(str(tmp_path))
+    exportar_json([_venda_aleatoria(aleatorio) for _ in range(3)], repositorio.arquivo_json)
+    with open(repositorio.arquivo_json, 'ab') as file:
+        file.write(b'{')
+    with open(repositorio.arquivo_json, 'rb') as file:
+        conteudo = file.read()
+
+    with pytest.raises(ValueError):
+        repositorio.carregar()
+    with pytest.raises(OSError):
+        repositorio.adicionar(_venda_aleatoria(aleatorio))
+    with open(repositorio.arquivo_json, 'rb') as file:
+        assert file.read() == conteudo
+
+    exportar_json([], repositorio.arquivo_json)
+    repositorio.carregar()
+    repositorio.adicionar(_venda_aleatoria(aleatorio))
+    assert len(JsonVendaRepository(str(tmp_path)).carregar()) == 1
+
+
+def test_arquivo_de_recuperacao_e_gravado_no_dia_na_proxima_carga(tmp_path):
+    aleatorio = random.Random(9)
+    caixa = Caixa(pasta=str(tmp_path))
+    caixa.carregar()
+    gravadas = [_venda_aleatoria(aleatorio) for _ in range(10)]
+    caixa.adicionar_lote(gravadas)
+    caixa.fechar()
+    # Memória no fechamento com a gravação atrasada: uma venda nova e uma editada
+    nova = _venda_aleatoria(aleatorio)
+    editada = Venda.from_dict({**gravadas[3].to_dict(), 'valor': '1.23'})
+    caminho = caixa.salvar_recuperacao(gravadas[:3] + [editada] + gravadas[4:] + [nova])
+    # O compactar do journal regrava o JSON do dia, mas não o arquivo de recuperação
+    assert caminho != caixa.repositorio.arquivo_json
+
+    reaberto = Caixa(pasta=str(tmp_path))
+    reaberto.carregar()
+    reaberto.fechar()
+    assert not os.path.exists(caminho)
+    for caixa_lido in (reaberto, Caixa(pasta=str(tmp_path))):
+        caixa_lido.carregar()
+        assert len(caixa_lido.vendas) == 11
+        assert caixa_lido.vendas.obter(nova.id).to_dict() == nova.to_dict()
+        assert caixa_lido.vendas.obter(editada.id).valor == Decimal('1.23')
+        caixa_lido.fechar()
+
+
+def test_vendas_de_uma_carga_que_falhou_voltam_na_proxima_carga(tmp_path):
+    aleatorio = random.Random(10)
+    caixa = Caixa(pasta=str(tmp_path))
+    caixa.carregar()
+    caixa.adicionar_lote([_venda_aleatoria(aleatorio) for _ in range(5)])
+    caixa.repositorio.compactar()
+    caixa.fechar()
+    snapshot = caixa.repositorio.arquivo_snapshot
+    with open(snapshot, 'rb') as file:
+        legivel = file.read()
+    with open(snapshot, 'wb') as file:
+        file.write(legivel[:20])
+
+    # A janela guarda as vendas registradas durante a falha no arquivo de recuperação
+    falhou = Caixa(pasta=str(tmp_path))
+    with pytest.raises(ValueError):
+        falhou.carregar()
+    pendentes = [_venda_aleatoria(aleatorio) for _ in range(2)]
+    caminho = falhou.salvar_recuperacao(pendentes)
+    with pytest.raises(ValueError):
+        Caixa(pasta=str(tmp_path)).carregar()
+    assert os.path.exists(caminho)
+
+    with open(snapshot, 'wb') as file:
+        file.write(legivel)
+    recuperado = Caixa(pasta=str(tmp_path))
+    recuperado.carregar()
+    recuperado.fechar()
+    assert not os.path.exists(caminho)
+    assert len(recuperado.vendas) == 7
+    assert {venda.id for venda in pendentes} <= {venda.id for venda in Caixa(pasta=str(tmp_path)).ler()}
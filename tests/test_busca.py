@@ -0,0 +1,46 @@
+import random
+import threading
+from datetime import timedelta
+
+from caixa import Caixa
+from armazenamento import arquivo_do_dia, exportar_json
+
+from test_agregados import _venda_aleatoria
+
+
+def test_indexar_o_historico_nao_segura_o_caixa(tmp_path):
+    aleatorio = random.Random(11)
+    caixa = Caixa(pasta=str(tmp_path))
+    ontem = caixa.dia - timedelta(days=1)
+    antigas = [_venda_aleatoria(aleatorio) for _ in range(20)]
+    exportar_json(antigas, arquivo_do_dia(str(tmp_path), ontem))
+    caixa.carregar()
+    caixa.busca.buscar(inicio=caixa.dia, fim=caixa.dia)
+
+    iniciou, liberar = threading.Event(), threading.Event()
+    buscar_dia = caixa.repositorio.buscar
+
+    def buscar_devagar(inicio, fim, **filtros):
+        iniciou.set()
+        liberar.wait(5)
+        return buscar_dia(inicio, fim, **filtros)
+
+    caixa.repositorio.buscar = buscar_devagar
+    resultado = []
+    busca = threading.Thread(target=lambda: resultado.extend(caixa.busca.buscar(antigas[0].vendedor)))
+    busca.start()
+    assert iniciou.wait(5)
+
+    # Enquanto o dia de ontem é indexado, a venda nova entra no índice do dia aberto
+    nova = _venda_aleatoria(aleatorio)
+    nova.vendedor = antigas[0].vendedor
+    registro = threading.Thread(target=caixa.adicionar, args=(nova,))
+    registro.start()
+    registro.join(2)
+    assert not registro.is_alive()
+
+    liberar.set()
+    busca.join(5)
+    assert {venda.id for venda in antigas if venda.vendedor == nova.vendedor} <= {venda.id for venda in resultado}
+    assert nova.id in {venda.id for venda in caixa.busca.buscar(nova.vendedor)}
+    caixa.fechar()
@@ -0,0 +1,97 @@
+import os
+import sys
+import random
+import subprocess
+
+import caixa_cli
+from caixa import Caixa
+from agregados import ResumoIncremental
+
+from test_agregados import _venda_aleatoria
+
+
+def test_resumo_verificar(tmp_path, capsys):
+    aleatorio = random.Random(3)
+    caixa = Caixa(pasta=str(tmp_path))
+    caixa.carregar()
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(30)]
+    for venda in vendas:
+        venda.data = caixa.dia.strftime("%d/%m/%Y 10:00:00")
+    caixa.adicionar_lote(vendas)
+    caixa.excluir([vendas[0].id])
+    caixa.fechar()
+
+    assert caixa_cli.main(['--pasta', str(tmp_path), 'resumo', '--verificar']) == 0
+    saida = capsys.readouterr().out
+    assert "Quantidade de vendas: 29" in saida
+    assert "Totais incrementais conferidos" in saida
+
+
+def test_resumo_verificar_acha_erro_na_exclusao(tmp_path, capsys, monkeypatch):
+    aleatorio = random.Random(4)
+    caixa = Caixa(pasta=str(tmp_path))
+    caixa.carregar()
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(10)]
+    for venda in vendas:
+        venda.data = caixa.dia.strftime("%d/%m/%Y 10:00:00")
+    caixa.adicionar_lote(vendas)
+    caixa.fechar()
+
+    # Erro que só aparece depois de edições e exclusões, nunca numa soma do zero
+    remover = ResumoIncremental.remover
+
+    def remover_sem_trocas(resumo, venda):
+        remover(resumo, venda)
+        if venda.troca:
+            resumo.total_trocas += venda.valor
+
+    monkeypatch.setattr(ResumoIncremental, 'remover', remover_sem_trocas)
+    assert caixa_cli.main(['--pasta', str(tmp_path), 'resumo', '--verificar']) == 1
+    assert "DIVERGÊNCIA: edição: total_trocas" in capsys.readouterr().out
+
+
+def test_modulos_de_um_subcomando_nao_carregam_no_inicio():
+    # Processo novo: nesta sessão do pytest outros testes já importaram esses módulos
+    codigo = ("import sys, caixa_cli; caixa_cli.criar_parser(); "
+              "print(' '.join(m for m in ('sincronizacao', 'exportacao', 'conciliacao', 'asyncio', 'zipfile') "
+              "if m in sys.modules))")
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == ""
+
+
+def test_padroes_escritos_na_ajuda():
+    from conciliacao import JANELA_PADRAO
+    from sincronizacao import PORTA_PADRAO
+    ajuda = caixa_cli.criar_parser()._subparsers._group_actions[0].choices
+    assert f"(padrão: {JANELA_PADRAO // 60})" in ajuda['conciliar'].format_help()
+    assert f"(padrão: {PORTA_PADRAO})" in ajuda['servidor'].format_help()
+
+
+def test_consultas_nao_gravam_no_journal_da_janela(tmp_path, capsys):
+    aleatorio = random.Random(12)
+    caixa = Caixa(pasta=str(tmp_path))
+    caixa.carregar()
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(10)]
+    for venda in vendas:
+        venda.data = caixa.dia.strftime("%d/%m/%Y 10:00:00")
+    caixa.adicionar_lote(vendas)
+    caixa.fechar()
+    # A janela está no meio de uma gravação: o fim do journal ainda não tem o '\n'
+    journal = caixa.repositorio.arquivo_journal
+    with open(journal, 'ab') as file:
+        file.write(b'0000abcd {"op":"add"')
+    with open(journal, 'rb') as file:
+        conteudo = file.read()
+    arquivos = sorted(os.listdir(tmp_path))
+
+    pasta = ['--pasta', str(tmp_path)]
+    assert caixa_cli.main(pasta + ['resumo']) == 0
+    assert "Quantidade de vendas: 10" in capsys.readouterr().out
+    assert caixa_cli.main(pasta + ['relatorio']) == 0
+    assert caixa_cli.main(pasta + ['buscar', vendas[0].vendedor]) == 0
+    assert caixa_cli.main(pasta + ['fechar', '--simular']) == 0
+    with open(journal, 'rb') as file:
+        assert file.read() == conteudo
+    assert not os.path.exists(caixa.repositorio.arquivo_snapshot)
+    assert [nome for nome in sorted(os.listdir(tmp_path)) if not nome.startswith('busca_')] == arquivos
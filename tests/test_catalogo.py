@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from vendas import ColecaoVendas, Venda
+from agregados import ResumoIncremental, resumir
+from caixa import Caixa
+from catalogo import METODOS_PADRAO, CatalogoPagamentos
+
+from test_agregados import _venda_aleatoria
+
+# Boleto não tem modalidade: com observação, o catálogo o reconhece mas a chave do resumo é outra
+CATALOGO = CatalogoPagamentos(METODOS_PADRAO + [{'tipo': "Boleto", 'taxa': "0.01", 'adquirente': "Banco"}])
+
+
+def _venda_do_catalogo(aleatorio: random.Random, id_venda: str = None) -> Venda:
+    venda = _venda_aleatoria(aleatorio, id_venda)
+    if aleatorio.random() < 0.3:
+        venda.tipo_pagamento = aleatorio.choice(["Boleto", "Cheque"])
+        venda.bandeira = ""
+        venda.troca = False
+    return venda
+
+
+@pytest.mark.parametrize('semente', range(10))
+def test_totais_por_id_do_metodo_batem_com_recalculo(semente):
+    aleatorio = random.Random(semente)
+    vendas = ColecaoVendas()
+    resumo = ResumoIncremental(catalogo=CATALOGO)
+    for _ in range(300):
+        operacao = aleatorio.random()
+        if not len(vendas) or operacao < 0.5:
+            venda = next(CATALOGO.identificar_todas([_venda_do_catalogo(aleatorio)]))
+            vendas.adicionar(venda)
+            resumo.adicionar(venda)
+        elif operacao < 0.75:
+            alvo = aleatorio.choice(list(vendas))
+            nova = next(CATALOGO.identificar_todas([_venda_do_catalogo(aleatorio, alvo.id)]))
+            resumo.remover(vendas.substituir(nova))
+            resumo.adicionar(nova)
+        else:
+            resumo.remover(vendas.remover(aleatorio.choice(list(vendas)).id))
+        assert resumo.verificar(vendas) == []
+    assert resumo.como_dict() == resumir(vendas)
+    assert "Boleto - PDV" in resumo.por_tipo and "Cheque" in resumo.por_tipo
+
+
+def test_arquivo_de_pagamentos_invalido_usa_o_catalogo_padrao(tmp_path):
+    (tmp_path / "pagamentos.json").write_text('[{"tipo": "Dinheiro"},', encoding='utf-8')
+    caixa = Caixa(pasta=str(tmp_path))
+    assert caixa.catalogo.rotulos == CatalogoPagamentos().rotulos
+    assert "pagamentos.json" in caixa.catalogo.aviso
+    caixa.carregar()
+    caixa.adicionar(_venda_aleatoria(random.Random(3)))
+    caixa.fechar()
+    assert CatalogoPagamentos().aviso is None
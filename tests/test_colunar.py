@@ -0,0 +1,74 @@
+import random
+from datetime import date
+
+import pytest
+
+import colunar
+from agregados import resumir
+from colunar import VendasColunares
+
+from test_agregados import _venda_aleatoria
+
+
+def test_resumir_igual_ao_recalculo():
+    aleatorio = random.Random(11)
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(500)]
+    for indice, venda in enumerate(vendas):
+        venda.data = f"{1 + indice % 28:02d}/03/2024 {8 + indice % 12:02d}:30:00"
+    colunas = VendasColunares(vendas)
+    assert colunas.resumir() == resumir(vendas)
+    assert colunas.resumir(date(2024, 3, 5), date(2024, 3, 9)) == resumir(
+        venda for venda in vendas if "05/03/2024" <= venda.data[:10] <= "09/03/2024")
+    assert [linha.id for linha in colunas] == [venda.id for venda in vendas]
+
+
+def test_mais_de_65535_detalhes_distintos():
+    aleatorio = random.Random(5)
+    modelo = _venda_aleatoria(aleatorio)
+    colunas = VendasColunares()
+    for numero in range(70000):
+        modelo.detalhes_pagamento = f"obs {numero}"
+        colunas.adicionar(modelo)
+    assert len(colunas.categorias['detalhes_pagamento']) == 70000
+    assert colunas[-1].detalhes_pagamento == "obs 69999"
+    assert sum(colunas.soma_por('detalhes_pagamento').values()) == modelo.valor * 70000
+
+
+def test_mesmo_resultado_sem_numpy(monkeypatch):
+    aleatorio = random.Random(2)
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(200)]
+    colunas = VendasColunares(vendas)
+    monkeypatch.setattr(colunar, 'np', None)
+    assert colunas.resumir() == resumir(vendas)
+
+
+def test_numpy_e_python_puro_dao_o_mesmo_resultado(monkeypatch):
+    pytest.importorskip("numpy")
+    aleatorio = random.Random(17)
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(3000)]
+    for indice, venda in enumerate(vendas):
+        venda.data = f"{1 + indice % 28:02d}/03/2024 {8 + indice % 12:02d}:30:00"
+    # Mais de 8 vendas por byte do bitmap de trocas e um tamanho que não é múltiplo de 8
+    vendas = vendas[:2997]
+    colunas = VendasColunares(vendas)
+    vendedores = colunas.categorias['vendedor']
+    periodos = [(None, None), (date(2024, 3, 5), date(2024, 3, 9)), (date(2024, 3, 20), None),
+                (None, date(2024, 3, 1)), (date(2024, 4, 1), date(2024, 4, 30))]
+
+    def calcular():
+        resultados = []
+        for inicio, fim in periodos:
+            faixa = colunas._faixa(inicio, fim)
+            resultados.append((
+                colunas.resumir(inicio, fim),
+                {coluna: colunas.soma_por(coluna, inicio, fim) for coluna in colunas.categorias},
+                colunas._somar_codigos(colunas.codigos['vendedor'], len(vendedores), faixa, somente_trocas=True),
+            ))
+        return resultados
+
+    com_numpy = calcular()
+    monkeypatch.setattr(colunar, 'np', None)
+    assert calcular() == com_numpy
+    assert com_numpy[0][0] == resumir(vendas)
+    assert com_numpy[1][0] == resumir(venda for venda in vendas if "05/03/2024" <= venda.data[:10] <= "09/03/2024")
+    assert com_numpy[0][0]['quantidade_trocas'] > 0
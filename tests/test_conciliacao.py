@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from vendas import Venda
+from conciliacao import IndiceLiquidacoes, centavos, conciliar, ler_liquidacoes, linhas_conciliacao
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'conciliacao')
+ARQUIVOS = [
+    ("POS Rede", 'rede.csv'),
+    ("POS PagSeguro", 'pagseguro.csv'),
+    ("POS Getnet", 'getnet.csv'),
+    ("Link Rede", 'link_rede.csv'),
+]
+
+
+def _cartao(boleta: str, bandeira: str, modalidade: str, valor: str, hora: str) -> Venda:
+    return Venda("Ana", "Cartão", modalidade, bandeira, valor, boleta, False, data=f"15/03/2024 {hora}")
+
+
+def _vendas() -> list:
+    return [
+        # Rede
+        _cartao("1", "Mastercard", "Crédito", "1234.56", "10:00:00"),
+        _cartao("2", "Visa", "Débito", "50.00", "10:18:00"),
+        _cartao("3", "Visa", "Débito", "50.00", "10:19:00"),      # lançada em dobro
+        _cartao("4", "Elo", "Crédito", "200.00", "11:04:00"),     # adquirente pagou 199,90
+        _cartao("5", "Visa", "Crédito", "30.00", "13:00:00"),     # sem liquidação
+        # PagSeguro
+        _cartao("6", "Visa", "Débito", "25.90", "09:15:00"),
+        _cartao("7", "Mastercard", "Crédito", "1234.50", "09:39:00"),
+        _cartao("8", "Hipercard", "Crédito", "1234.00", "09:58:00"),
+        # Getnet
+        _cartao("9", "Visa", "Débito", "10.00", "14:00:00"),
+        _cartao("10", "Elo", "Crédito", "50.00", "14:28:00"),    # adquirente pagou 55,00
+        # Link Rede
+        _cartao("11", "Mastercard", "Crédito", "300.00", "15:58:30"),
+        _cartao("12", "Visa", "Débito", "45.00", "16:09:00"),
+        Venda("Ana", "Dinheiro", "", "", "99.00", "13", False, data="15/03/2024 12:00:00"),
+    ]
+
+
+def _indice() -> IndiceLiquidacoes:
+    indice = IndiceLiquidacoes()
+    for adquirente, nome in ARQUIVOS:
+        indice.carregar(os.path.join(FIXTURES, nome), adquirente)
+    return indice
+
+
+@pytest.mark.parametrize('adquirente, nome, validas, erros', [
+    ("POS Rede", 'rede.csv', 4, [(6, "Bandeira desconhecida: 'DINERS'")]),
+    ("POS PagSeguro", 'pagseguro.csv', 3, []),
+    ("POS Getnet", 'getnet.csv', 2, [(4, "Linha incompleta")]),
+    ("Link Rede", 'link_rede.csv', 2, []),
+])
+def test_leitura_por_adquirente(adquirente, nome, validas, erros):
+    encontrados = []
+    liquidacoes = list(ler_liquidacoes(os.path.join(FIXTURES, nome), adquirente, encontrados))
+    assert len(liquidacoes) == validas
+    assert encontrados == erros
+    assert all(liquidacao.adquirente == adquirente for liquidacao in liquidacoes)
+
+
+def test_formatos_de_cada_adquirente():
+    rede = list(ler_liquidacoes(os.path.join(FIXTURES, 'rede.csv'), "POS Rede"))
+    assert (rede[0].bandeira, rede[0].modalidade, rede[0].valor_centavos) == ("Mastercard", "Crédito", 123456)
+    assert rede[3].bandeira == "American Express"
+
+    pagseguro = list(ler_liquidacoes(os.path.join(FIXTURES, 'pagseguro.csv'), "POS PagSeguro"))
+    assert [liquidacao.valor_centavos for liquidacao in pagseguro] == [2590, 123450, 123400]
+    assert pagseguro[0].bandeira == "Visa"  # VISA ELECTRON
+
+    getnet = list(ler_liquidacoes(os.path.join(FIXTURES, 'getnet.csv'), "POS Getnet"))
+    # Data e hora na mesma coluna
+    assert getnet[1].momento - getnet[0].momento == 30 * 60
+    assert getnet[0].codigo == "A00001"
+
+
+def test_conciliacao_com_todas_as_adquirentes():
+    indice = _indice()
+    resultado = conciliar(_vendas(), indice)
+
+    conciliadas = sorted((venda.numero_boleta for venda, _ in resultado.conciliadas), key=int)
+    assert conciliadas == ["1", "2", "6", "7", "8", "9", "11", "12"]
+    assert [(venda.numero_boleta, liquidacao.codigo) for venda, liquidacao in resultado.duplicadas] == [("3", "1002")]
+    divergentes = {venda.numero_boleta: liquidacao.valor_centavos for venda, liquidacao in resultado.valor_divergente}
+    assert divergentes == {"4": 19990, "10": 5500}
+    assert [venda.numero_boleta for venda in resultado.sem_liquidacao] == ["5"]
+    assert [liquidacao.codigo for liquidacao in resultado.liquidacoes_sem_venda] == ["1004"]
+    assert resultado.invalidas == []
+
+
+def test_fora_da_janela_nao_concilia():
+    indice = IndiceLiquidacoes(janela=60)
+    indice.carregar(os.path.join(FIXTURES, 'link_rede.csv'), "Link Rede")
+    resultado = conciliar([_cartao("11", "Mastercard", "Crédito", "300.00", "15:58:30")], indice)
+    assert resultado.conciliadas == []
+    assert len(resultado.sem_liquidacao) == 1
+
+
+def test_relatorio_lista_pendencias_e_linhas_ignoradas():
+    indice = _indice()
+    texto = "".join(linhas_conciliacao(conciliar(_vendas(), indice), indice.erros))
+    assert "Conciliadas: 8\n" in texto
+    assert "Duplicadas: 1\n" in texto
+    assert "Valor divergente: 2\n" in texto
+    assert "linha 6: Bandeira desconhecida: 'DINERS'" in texto
+    assert "linha 4: Linha incompleta" in texto
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ("R$ 1.234,56", 123456),
+    ("1234.56", 123456),
+    ("1234,56", 123456),
+    ("1.234", 123400),
+    ("1.234.567", 123456700),
+    ("1,234.56", 123456),
+    ("12.3", 1230),
+    ("1,5", 150),
+    ("-10,00", -1000),
+    ("R$\xa0 99,90 ", 9990),
+])
+def test_centavos(texto, esperado):
+    assert centavos(texto) == esperado
+
+
+@pytest.mark.parametrize('texto', ["", "abc", "1,234", "0.123", "12,345", "NaN", "1.2.3"])
+def test_centavos_invalidos(texto):
+    with pytest.raises(ValueError):
+        centavos(texto)
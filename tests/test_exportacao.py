@@ -0,0 +1,126 @@
+import os
+import re
+import csv
+import random
+import threading
+import zipfile
+from decimal import Decimal
+from xml.etree import ElementTree
+
+import pytest
+
+from exportacao import EscritorXLSX, ExportacaoCancelada, exportar, lotes_da_lista
+
+from test_agregados import _venda_aleatoria
+
+XLSX = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def _vendas(quantidade: int, semente: int = 13) -> list:
+    aleatorio = random.Random(semente)
+    return [_venda_aleatoria(aleatorio) for _ in range(quantidade)]
+
+
+def test_partes_do_xlsx_sao_xml_valido(tmp_path):
+    vendas = _vendas(30)
+    vendas[0].numero_boleta = 'A&B <"1">'
+    vendas[1].vendedor = "Zé\x07"
+    caminho = str(tmp_path / "vendas.xlsx")
+    assert exportar(caminho, lotes_da_lista(vendas, 7)[0]) == 30
+
+    with zipfile.ZipFile(caminho) as arquivo:
+        nomes = arquivo.namelist()
+        assert {"[Content_Types].xml", "_rels/.rels", "xl/workbook.xml", "xl/_rels/workbook.xml.rels",
+                "xl/styles.xml", "xl/worksheets/sheet1.xml", "xl/worksheets/sheet2.xml"} <= set(nomes)
+        for nome in nomes:
+            ElementTree.fromstring(arquivo.read(nome))
+        planilha = ElementTree.fromstring(arquivo.read("xl/worksheets/sheet1.xml"))
+    textos = [t.text for t in planilha.iter(f'{XLSX}t')]
+    assert 'A&B <"1">' in textos and "Zé" in textos
+
+
+def test_xlsx_continua_em_outra_planilha_no_limite_de_linhas(tmp_path, monkeypatch):
+    monkeypatch.setattr(EscritorXLSX, 'LIMITE_LINHAS', 5)
+    caminho = str(tmp_path / "vendas.xlsx")
+    exportar(caminho, lotes_da_lista(_vendas(12), 5)[0])
+
+    with zipfile.ZipFile(caminho) as arquivo:
+        livro = ElementTree.fromstring(arquivo.read("xl/workbook.xml"))
+        nomes = [planilha.get('name') for planilha in livro.iter(f'{XLSX}sheet')]
+        # O resumo também passa do limite e continua em "Resumo (2)", "Resumo (3)"...
+        assert nomes[:4] == ["Vendas", "Vendas (2)", "Vendas (3)", "Resumo"]
+        assert all(nome == f"Resumo ({parte})" for parte, nome in enumerate(nomes[4:], 2))
+        dados = 0
+        for numero in range(1, 4):
+            linhas = list(ElementTree.fromstring(arquivo.read(f"xl/worksheets/sheet{numero}.xml")).iter(f'{XLSX}row'))
+            assert len(linhas) <= 5
+            assert [linha.get('r') for linha in linhas] == [str(r) for r in range(1, len(linhas) + 1)]
+            # Cada parte repete o cabeçalho
+            assert linhas[0].find(f'{XLSX}c').find(f'{XLSX}is').find(f'{XLSX}t').text == "Data/Hora"
+            dados += len(linhas) - 1
+        assert dados == 12
+
+
+@pytest.mark.parametrize('extensao', ['.csv', '.xlsx', '.pdf'])
+def test_cancelar_ou_falhar_nao_deixa_arquivo(tmp_path, extensao):
+    caminho = str(tmp_path / f"vendas{extensao}")
+    cancelar = threading.Event()
+    cancelar.set()
+    with pytest.raises(ExportacaoCancelada):
+        exportar(caminho, lotes_da_lista(_vendas(20), 5)[0], cancelar=cancelar)
+
+    def lotes_com_erro():
+        yield _vendas(5)
+        raise OSError("disco cheio")
+
+    with pytest.raises(OSError):
+        exportar(caminho, lotes_com_erro())
+    assert os.listdir(tmp_path) == []
+
+
+def test_resumo_csv_tem_os_totais_por_vendedor_e_gerais(tmp_path):
+    vendas = _vendas(40)
+    # Vendedor com o mesmo nome do rótulo da seção geral não some do resumo
+    for venda in vendas[:5]:
+        venda.vendedor = "Todos"
+    caminho = str(tmp_path / "vendas.csv")
+    exportar(caminho, lotes_da_lista(vendas, 10)[0])
+
+    with open(str(tmp_path / "vendas_resumo.csv"), newline='', encoding='utf-8-sig') as file:
+        linhas = list(csv.reader(file, delimiter=';'))
+    assert linhas[0] == ["Vendedor", "Seção", "Item", "Valor"]
+    totais = [linha for linha in linhas[1:] if linha[1] == "Total"]
+    esperados = {}
+    for venda in vendas:
+        esperados[venda.vendedor] = esperados.get(venda.vendedor, Decimal('0')) + venda.valor
+    assert [linha[0] for linha in totais] == sorted(esperados) + ["Todos"]
+    for linha, vendedor in zip(totais, sorted(esperados)):
+        assert Decimal(linha[3].replace(',', '.')) == esperados[vendedor]
+    assert totais[-1][2] == "40 venda(s)"
+    assert Decimal(totais[-1][3].replace(',', '.')) == sum(venda.valor for venda in vendas)
+
+    with open(caminho, newline='', encoding='utf-8-sig') as file:
+        assert sum(1 for _ in csv.reader(file, delimiter=';')) == 41
+
+
+def test_tabela_xref_do_pdf_aponta_para_os_objetos(tmp_path):
+    caminho = str(tmp_path / "vendas.pdf")
+    exportar(caminho, lotes_da_lista(_vendas(200), 50)[0], titulo="Vendas (teste)")
+    with open(caminho, 'rb') as file:
+        conteudo = file.read()
+
+    assert conteudo.startswith(b"%PDF-1.4") and conteudo.endswith(b"%%EOF\n")
+    inicio_xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", conteudo).group(1))
+    assert conteudo[inicio_xref:].startswith(b"xref\n")
+    cabecalho, _, resto = conteudo[inicio_xref + 5:].partition(b"\n")
+    primeiro, quantidade = map(int, cabecalho.split())
+    assert primeiro == 0
+    entradas = resto.split(b"\n")[:quantidade]
+    assert entradas[0] == b"0000000000 65535 f "
+    for numero, entrada in enumerate(entradas[1:], 1):
+        assert len(entrada) == 19 and entrada.endswith(b" 00000 n ")
+        deslocamento = int(entrada[:10])
+        assert conteudo[deslocamento:].startswith(b"%d 0 obj\n" % numero)
+    assert int(re.search(rb"/Size (\d+)", conteudo).group(1)) == quantidade
+    # 200 vendas mais o resumo não cabem numa página de 77 linhas
+    assert int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", conteudo).group(1)) >= 3
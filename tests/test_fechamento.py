@@ -0,0 +1,112 @@
+import random
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+import caixa_cli
+from caixa import Caixa, ConfigManager
+from armazenamento import SqliteVendaRepository
+
+from test_agregados import _venda_aleatoria
+
+
+def _config(backend: str) -> ConfigManager:
+    config = ConfigManager()
+    config.config['vendas.armazenamento'] = backend
+    return config
+
+
+def _caixa_com_vendas(pasta, config, quantidade: int = 20) -> Caixa:
+    aleatorio = random.Random(4)
+    caixa = Caixa(config, str(pasta))
+    caixa.carregar()
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(quantidade)]
+    for venda in vendas:
+        venda.data = caixa.dia.strftime("%d/%m/%Y 10:00:00")
+    caixa.adicionar_lote(vendas)
+    return caixa
+
+
+@pytest.mark.parametrize('backend', ['journal', 'json', 'sqlite'])
+def test_fechar_e_corrigir(tmp_path, backend, capsys):
+    config = _config(backend)
+    caixa = _caixa_com_vendas(tmp_path, config)
+    fechamento = caixa.fechar_dia({'Dinheiro': Decimal('0')})
+    assert caixa.repositorio.dia_fechado
+    assert fechamento.quantidade == 20
+
+    vendas = list(caixa.vendas)
+    corrigida = _venda_aleatoria(random.Random(9), vendas[1].id)
+    corrigida.data = vendas[1].data
+    caixa.atualizar(corrigida)
+    caixa.excluir([vendas[0].id])
+    with pytest.raises(ValueError):
+        caixa.fechar_dia({})
+    caixa.fechar()
+
+    reaberto = Caixa(config, str(tmp_path))
+    reaberto.carregar()
+    assert reaberto.fechamento is not None
+    assert [venda.to_dict() for venda in reaberto.vendas] == [venda.to_dict() for venda in caixa.vendas]
+    fechado = reaberto.repositorio.fechado_do_dia(reaberto.dia)
+    assert fechado.verificar() == []
+    assert [registro['op'] for registro in fechado.ajustes()] == ['upd', 'del']
+    reaberto.fechar()
+
+    assert caixa_cli.auditar(reaberto.dia, config, str(tmp_path)) == 0
+    saida = capsys.readouterr().out
+    assert "Correções depois do fechamento: 2" in saida
+    assert "Vendas congeladas e correções conferidas." in saida
+
+
+def test_sqlite_recusa_alterar_o_dia_fechado(tmp_path):
+    config = _config('sqlite')
+    caixa = _caixa_com_vendas(tmp_path, config)
+    caixa.fechar_dia({})
+    caixa.excluir([next(iter(caixa.vendas)).id])
+    conexao = caixa.repositorio.conexao
+    for comando in ("UPDATE ajustes SET registro = '{}'", "DELETE FROM ajustes",
+                    "UPDATE dias_fechados SET quantidade = 0", "DELETE FROM dias_fechados"):
+        with pytest.raises(sqlite3.DatabaseError):
+            with conexao:
+                conexao.execute(comando)
+    fechado = caixa.repositorio.fechado_do_dia(caixa.dia)
+    assert fechado.verificar() == []
+
+    # Alteração feita direto na tabela, sem passar pelas correções
+    with conexao:
+        conexao.execute("UPDATE vendas SET valor_centavos = valor_centavos + 1 WHERE id = (SELECT MAX(id) FROM vendas)")
+    assert fechado.verificar() == ["vendas: a tabela não é o dia congelado com as correções"]
+    assert caixa_cli.auditar(caixa.dia, config, str(tmp_path)) == 1
+    caixa.fechar()
+
+
+def test_sqlite_migra_banco_da_versao_anterior(tmp_path):
+    # Banco da versão 2: sem as tabelas do fechamento
+    repositorio = SqliteVendaRepository(str(tmp_path / 'austral.db'))
+    repositorio.conexao.executescript("DROP TABLE dias_fechados; DROP TABLE ajustes; PRAGMA user_version = 2;")
+    repositorio.fechar()
+    caixa = _caixa_com_vendas(tmp_path, _config('sqlite'), 3)
+    assert caixa.fechar_dia({}).quantidade == 3
+    caixa.fechar()
+
+
+def test_migracao_nao_regrava_dia_fechado_no_banco(tmp_path, capsys):
+    # O dia foi fechado e corrigido no banco; os arquivos da pasta ainda têm a versão antiga
+    arquivos = _caixa_com_vendas(tmp_path, _config('journal'), 5)
+    arquivos.fechar()
+    caixa = _caixa_com_vendas(tmp_path, _config('sqlite'), 3)
+    caixa.fechar_dia({})
+    caixa.excluir([next(iter(caixa.vendas)).id])
+    caixa.fechar()
+
+    assert caixa_cli.main(['--pasta', str(tmp_path), 'migrar']) == 0
+    assert "já fechado" in capsys.readouterr().err
+    reaberto = Caixa(_config('sqlite'), str(tmp_path))
+    reaberto.carregar()
+    assert len(reaberto.vendas) == 2
+    assert reaberto.repositorio.fechado_do_dia(reaberto.dia).verificar() == []
+    with pytest.raises(ValueError):
+        reaberto.repositorio.substituir_dia(reaberto.dia, [])
+    reaberto.fechar()
@@ -0,0 +1,21 @@
+import random
+
+from gravacao import GravadorAssincrono
+from instrumentacao import REGISTRO
+
+from test_agregados import _venda_aleatoria
+
+
+def test_cada_rajada_gravada_entra_como_salvar_vendas():
+    aleatorio = random.Random(8)
+    gravadas = []
+    REGISTRO.zerar()
+    gravador = GravadorAssincrono(gravadas.append)
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(5)]
+    for venda in vendas:
+        gravador.enfileirar([('add', venda)])
+    gravador.enfileirar([('del', vendas[0].id)])
+    assert gravador.encerrar(5)
+
+    # Quantas rajadas depende de quando a thread retirou os itens da fila
+    assert gravadas and REGISTRO.percentis()['salvar_vendas']['quantidade'] == len(gravadas)
@@ -0,0 +1,77 @@
+import random
+from datetime import date
+
+from sincronizacao import ClienteSincronizacao, ServidorSincronizacao
+
+from test_agregados import _venda_aleatoria
+
+DIA = date(2024, 3, 15)
+
+
+def _cliente(pasta, servidor: ServidorSincronizacao, terminal: str) -> ClienteSincronizacao:
+    cliente = ClienteSincronizacao('127.0.0.1:1', terminal, str(pasta))
+    # Sem rede: cada requisição vai direto para o servidor
+    cliente._sessao = lambda requisicoes: requisicoes(servidor.processar)
+    return cliente
+
+
+def _encerrar(servidor: ServidorSincronizacao):
+    for dia in servidor._dias.values():
+        dia.caixa.fechar()
+
+
+def _vendas(aleatorio: random.Random, quantidade: int) -> list:
+    vendas = [_venda_aleatoria(aleatorio) for _ in range(quantidade)]
+    for venda in vendas:
+        venda.data = DIA.strftime("%d/%m/%Y 10:00:00")
+    return vendas
+
+
+def test_alteracoes_incrementais(tmp_path):
+    (tmp_path / 'servidor').mkdir()
+    servidor = ServidorSincronizacao(str(tmp_path / 'servidor'))
+    cliente = _cliente(tmp_path, servidor, 'caixa-1')
+    vendas = _vendas(random.Random(1), 5)
+    cliente.registrar(DIA, [{'op': 'add', 'venda': venda.to_dict()} for venda in vendas])
+    assert cliente.enviar_pendentes() == 5
+
+    versao, alteracoes, completo = cliente.alteracoes(DIA)
+    assert (versao, len(alteracoes), completo) == (5, 5, False)
+    cliente.registrar(DIA, [{'op': 'del', 'id': vendas[0].id}])
+    cliente.enviar_pendentes()
+    versao, alteracoes, completo = cliente.alteracoes(DIA, versao)
+    assert (versao, alteracoes, completo) == (6, [{'op': 'del', 'id': vendas[0].id}], False)
+    _encerrar(servidor)
+
+
+def test_servidor_reiniciado_manda_o_historico_inteiro(tmp_path):
+    pasta = tmp_path / 'servidor'
+    pasta.mkdir()
+    aleatorio = random.Random(2)
+    servidor = ServidorSincronizacao(str(pasta))
+    cliente = _cliente(tmp_path, servidor, 'caixa-1')
+    vendas = _vendas(aleatorio, 10)
+    cliente.registrar(DIA, [{'op': 'add', 'venda': venda.to_dict()} for venda in vendas])
+    cliente.registrar(DIA, [{'op': 'del', 'id': venda.id} for venda in vendas[:6]])
+    cliente.enviar_pendentes()
+    versao, _, _ = cliente.alteracoes(DIA)
+    assert versao == 16
+    _encerrar(servidor)
+
+    # Refeito das 4 vendas gravadas: a numeração recomeça abaixo da versão do cliente
+    reiniciado = ServidorSincronizacao(str(pasta))
+    cliente._sessao = lambda requisicoes: requisicoes(reiniciado.processar)
+    novas = _vendas(aleatorio, 2)
+    cliente.registrar(DIA, [{'op': 'add', 'venda': venda.to_dict()} for venda in novas])
+    cliente.enviar_pendentes()
+    versao, alteracoes, completo = cliente.alteracoes(DIA, versao)
+    assert completo
+    assert versao == 6
+    assert {alteracao['venda']['id'] for alteracao in alteracoes} == {venda.id for venda in vendas[6:] + novas}
+
+    # Mesmo com uma versão antiga que o novo histórico tem, a época diferente obriga a refazer
+    outro = _cliente(tmp_path, reiniciado, 'caixa-2')
+    outro._epocas[DIA] = 'epoca-anterior'
+    assert outro.alteracoes(DIA, 3)[2]
+    assert cliente.alteracoes(DIA, versao) == (6, [], False)
+    _encerrar(reiniciado)
@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from datetime import datetime
+from decimal import Decimal
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+ALFABETO_ULID = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+_ultimo_ulid = [0, 0]
+_trava_ulid = threading.Lock()
+
+
+def gerar_id() -> str:
+    """
+    Gera um ULID: 48 bits de timestamp em ms + 80 bits aleatórios, em base32.
+    Dentro do mesmo milissegundo a parte aleatória é incrementada, então os
+    ids gerados por um processo são únicos e crescentes.
+    """
+    with _trava_ulid:
+        agora = int(time.time() * 1000)
+        if agora <= _ultimo_ulid[0]:
+            agora = _ultimo_ulid[0]
+            aleatorio = _ultimo_ulid[1] + 1
+        else:
+            aleatorio = int.from_bytes(os.urandom(10), 'big')
+        _ultimo_ulid[0], _ultimo_ulid[1] = agora, aleatorio
+
+    numero = (agora << 80) | (aleatorio & ((1 << 80) - 1))
+    caracteres = []
+    for _ in range(26):
+        numero, resto = divmod(numero, 32)
+        caracteres.append(ALFABETO_ULID[resto])
+    return ''.join(reversed(caracteres))
+
+
+@dataclass(eq=False)
+class Venda:
+    """
+    Representa uma venda individual com todos os seus detalhes.
+
+    `id` identifica a venda de forma estável (entre execuções e entre
+    caixas); duas instâncias só são iguais se forem o mesmo objeto.
+    """
+    vendedor: str
+    tipo_pagamento: str
+    detalhes_pagamento: str
+    bandeira: str
+    valor: Decimal
+    numero_boleta: str
+    troca: bool
+    data: str = None
+    id: str = None
+    # Índice no catálogo de pagamentos do caixa; só em memória, não é gravado
+    metodo: Optional[int] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.data is None:
+            self.data = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        if self.id is None:
+            self.id = gerar_id()
+        self.valor = Decimal(str(self.valor)).quantize(Decimal('0.01'))
+
+    def to_dict(self) -> dict:
+        return {
+            'vendedor': self.vendedor,
+            'tipo_pagamento': self.tipo_pagamento,
+            'detalhes_pagamento': self.detalhes_pagamento,
+            'bandeira': self.bandeira,
+            'valor': str(self.valor),
+            'numero_boleta': self.numero_boleta,
+            'troca': self.troca,
+            'data': self.data,
+            'id': self.id
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Venda':
+        valor = data['valor']
+        if isinstance(valor, str) and valor[-3:-2] == '.' and data.get('data') and data.get('id'):
+            # Registro gravado por to_dict: valor já tem duas casas, data e id presentes.
+            # Pula o __post_init__ (quantize e relógio), que domina o tempo da carga do dia.
+            venda = cls.__new__(cls)
+            venda.__dict__.update(
+                vendedor=data['vendedor'],
+                tipo_pagamento=data['tipo_pagamento'],
+                detalhes_pagamento=data['detalhes_pagamento'],
+                bandeira=data['bandeira'],
+                valor=Decimal(valor),
+                numero_boleta=data['numero_boleta'],
+                troca=data['troca'],
+                data=data['data'],
+                id=data['id'],
+                metodo=None
+            )
+            return venda
+        return cls(
+            vendedor=data['vendedor'],
+            tipo_pagamento=data['tipo_pagamento'],
+            detalhes_pagamento=data['detalhes_pagamento'],
+            bandeira=data['bandeira'],
+            valor=Decimal(data['valor']),
+            numero_boleta=data['numero_boleta'],
+            troca=data['troca'],
+            data=data['data'],
+            # Arquivos antigos não têm id: um novo é gerado e gravado na próxima compactação
+            id=data.get('id')
+        )
+
+
+class ColecaoVendas:
+    """
+    Vendas em ordem de registro, indexadas por id e por número de boleta.
+
+    Inclusão, exclusão, substituição e as duas buscas custam O(1).
+    """
+
+    def __init__(self, vendas: Iterable[Venda] = ()):
+        self._por_id: Dict[str, Venda] = {}
+        self._por_boleta: Dict[str, Dict[str, Venda]] = {}
+        for venda in vendas:
+            self.adicionar(venda)
+
+    def adicionar(self, venda: Venda):
+        if venda.id in self._por_id:
+            raise ValueError(f"Venda {venda.id} já registrada")
+        self._por_id[venda.id] = venda
+        self._por_boleta.setdefault(venda.numero_boleta, {})[venda.id] = venda
+
+    def remover(self, id_venda: str) -> Venda:
+        venda = self._por_id.pop(id_venda)
+        mesma_boleta = self._por_boleta[venda.numero_boleta]
+        del mesma_boleta[id_venda]
+        if not mesma_boleta:
+            del self._por_boleta[venda.numero_boleta]
+        return venda
+
+    def substituir(self, venda: Venda) -> Venda:
+        """Troca a venda de mesmo id mantendo a posição; devolve a versão anterior"""
+        anterior = self._por_id[venda.id]
+        del self._por_boleta[anterior.numero_boleta][venda.id]
+        if not self._por_boleta[anterior.numero_boleta]:
+            del self._por_boleta[anterior.numero_boleta]
+        self._por_id[venda.id] = venda
+        self._por_boleta.setdefault(venda.numero_boleta, {})[venda.id] = venda
+        return anterior
+
+    def obter(self, id_venda: str) -> Venda:
+        return self._por_id[id_venda]
+
+    def por_boleta(self, numero_boleta: str) -> List[Venda]:
+        return list(self._por_boleta.get(numero_boleta, {}).values())
+
+    def __contains__(self, id_venda: str) -> bool:
+        return id_venda in self._por_id
+
+    def __iter__(self) -> Iterator[Venda]:
+        return iter(self._por_id.values())
+
+    def __len__(self) -> int:
+        return len(self._por_id)